@@ -2,6 +2,7 @@ import os
 import json
 import time
 from config import Config
+from cassette import get_cassette
 try:
     import anthropic
 except ImportError:
@@ -29,17 +30,107 @@ class APIHandler:
         # Note: Claude support removed - using Groq as primary model
             
         if Config.OPENAI_API_KEY and openai:
-            self.openai_client = openai.OpenAI(api_key=Config.OPENAI_API_KEY)
+            self.openai_client = openai.OpenAI(api_key=Config.OPENAI_API_KEY, base_url=Config.OPENAI_BASE_URL)
             
         if Config.GEMINI_API_KEY and genai:
             genai.configure(api_key=Config.GEMINI_API_KEY)
             self.gemini_configured = True
 
+        # Record / replay of provider calls (None unless CASSETTE_MODE is set)
+        self.cassette = get_cassette()
+
     def generate_response(self, prompt, model_service="claude", system_prompt=""):
         """
         Generates a response from the specified model service.
         Returns a tuple: (response_text, input_tokens, output_tokens, error_msg)
         """
+        if self.cassette is None or model_service == "mock":
+            return self._generate_response_live(prompt, model_service, system_prompt)
+
+        def live():
+            text, input_tokens, output_tokens, error_msg = self._generate_response_live(prompt, model_service, system_prompt)
+            if error_msg:
+                raise RuntimeError(error_msg)  # errors are returned, never recorded
+            return {"text": text, "input_tokens": input_tokens, "output_tokens": output_tokens}, None
+
+        model_names = {"claude": Config.GROQ_MODEL_NAME, "groq": Config.GROQ_MODEL_NAME,
+                       "openai": Config.OPENAI_MODEL_NAME, "gemini": Config.GEMINI_MODEL_NAME}
+        request = {
+            "service": model_service,
+            "model": model_names.get(model_service),
+            "system_prompt": system_prompt,
+            "prompt": prompt,
+            "max_tokens": Config.MAX_TOKENS,
+        }
+        try:
+            response, _ = self.cassette.replay_or_record("llm", request, live, usage_keys=("input_tokens", "output_tokens"))
+        except Exception as e:
+            return "", 0, 0, str(e)
+        return response["text"], response["input_tokens"], response["output_tokens"], None
+
+    def generate_response_stream(self, prompt, model_service="groq", system_prompt="", usage=None):
+        """
+        Yields the response text as the model streams it (Groq / OpenAI).
+        Other services, and cassette record / replay, yield the whole response
+        at once. When the generator ends, `usage` holds {"input_tokens",
+        "output_tokens", "error"}; counts are estimated (~4 chars per token)
+        when the stream is closed before the provider reports them.
+        """
+        usage = {} if usage is None else usage
+        usage.update(input_tokens=0, output_tokens=0, error=None)
+        client, model = self._stream_client(model_service)
+        if client is None or self.cassette is not None:
+            text, usage["input_tokens"], usage["output_tokens"], usage["error"] = self.generate_response(
+                prompt, model_service=model_service, system_prompt=system_prompt)
+            if text:
+                yield text
+            return
+
+        kwargs = {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            "max_tokens": Config.MAX_TOKENS,
+            "stream": True,
+        }
+        if model_service == "openai":
+            kwargs["stream_options"] = {"include_usage": True}  # Groq reports it in x_groq instead
+        chars = 0
+        stream = None
+        try:
+            stream = client.chat.completions.create(**kwargs)
+            for chunk in stream:
+                reported = getattr(chunk, "usage", None) or getattr(getattr(chunk, "x_groq", None), "usage", None)
+                if reported:
+                    usage["input_tokens"] = reported.prompt_tokens
+                    usage["output_tokens"] = reported.completion_tokens
+                if chunk.choices and chunk.choices[0].delta.content:
+                    chars += len(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            usage["error"] = str(e)
+        finally:
+            if stream is not None:
+                stream.close()
+            if not usage["input_tokens"]:
+                usage["input_tokens"] = max(1, (len(system_prompt) + len(prompt)) // 4)
+                usage["output_tokens"] = max(1, chars // 4) if chars else 0
+
+    def _stream_client(self, model_service):
+        """(client, model) for services that can stream here, else (None, None)."""
+        if model_service in ("claude", "groq"):
+            if not Groq or not Config.GROQ_API_KEY:
+                return None, None
+            if not getattr(self, 'groq_client', None):
+                self.groq_client = Groq(api_key=Config.GROQ_API_KEY, base_url=Config.GROQ_BASE_URL)
+            return self.groq_client, Config.GROQ_MODEL_NAME
+        if model_service == "openai" and self.openai_client:
+            return self.openai_client, Config.OPENAI_MODEL_NAME
+        return None, None
+
+    def _generate_response_live(self, prompt, model_service, system_prompt):
         response_text = ""
         input_tokens = 0
         output_tokens = 0
@@ -52,7 +143,7 @@ class APIHandler:
                     return "", 0, 0, "Claude not available and Groq API key missing."
                 
                 if not getattr(self, 'groq_client', None):
-                    self.groq_client = Groq(api_key=Config.GROQ_API_KEY)
+                    self.groq_client = Groq(api_key=Config.GROQ_API_KEY, base_url=Config.GROQ_BASE_URL)
 
                 chat_completion = self.groq_client.chat.completions.create(
                     messages=[
@@ -71,7 +162,7 @@ class APIHandler:
                     return "", 0, 0, "Groq API key missing or SDK not installed."
                 
                 if not getattr(self, 'groq_client', None):
-                    self.groq_client = Groq(api_key=Config.GROQ_API_KEY)
+                    self.groq_client = Groq(api_key=Config.GROQ_API_KEY, base_url=Config.GROQ_BASE_URL)
 
                 chat_completion = self.groq_client.chat.completions.create(
                     messages=[
@@ -1,15 +1,42 @@
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import Flask, Request, render_template, request, jsonify, send_from_directory, g, Response, stream_with_context
 from flask_cors import CORS
 from chatbot import Chatbot
 from config import Config
-from stt_handler import STTHandler
+from stt_handler import STTHandler, RecordingTooLongError, STTBusyError
 from tts_handler import TTSHandler
+from metrics import REGISTRY, HTTP_LATENCY, LLM_LATENCY
+from tracing import start_span, span
+from profiler import SamplingProfiler, MemoryTracker, ProfilerBusyError
+from stats_stream import broadcaster, TooManySubscribersError
+from report_jobs import ReportJobQueue
+from log_aggregator import aggregate_file
+from stt_stream import StreamingTranscriber, SAMPLE_RATES
+from tts_cache import TTSCache, PREWARM_PHRASES
+from tts_pipeline import TTSPipeline
 import os
 import uuid
 import time
+import json
+import base64
+import hmac
+import tempfile
+import threading
+try:
+    from flask_sock import Sock
+except ImportError:
+    Sock = None
+
+class SpooledRequest(Request):
+    """Uploads are buffered in memory and only spill to (system temp) disk above UPLOAD_SPOOL_BYTES."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=Config.UPLOAD_SPOOL_BYTES)
 
 app = Flask(__name__)
+app.request_class = SpooledRequest
 CORS(app)
+# WebSocket routes (streaming transcription); optional dependency
+sock = Sock(app) if Sock else None
 
 # Initialize Chatbot
 bot = Chatbot()
@@ -17,9 +44,18 @@ bot = Chatbot()
 stt = STTHandler()
 tts = TTSHandler()
 
+# On-demand profiling (admin only)
+profiler = SamplingProfiler()
+memory_tracker = MemoryTracker()
+
+# Background PDF reports (process pool, cached by log content hash)
+report_jobs = ReportJobQueue()
+
 # Ensure audio directory exists
 AUDIO_DIR = os.path.join("..", "frontend", "public", "audio")
 os.makedirs(AUDIO_DIR, exist_ok=True)
+# Repeated phrases are synthesized once and served from here via /audio/
+tts.cache = TTSCache(os.path.join(AUDIO_DIR, "tts_cache")) if Config.TTS_CACHE else None
 
 # Frontend build (Vite)
 FRONTEND_DIST = os.path.abspath(os.path.join("..", "frontend", "dist"))
@@ -28,16 +64,65 @@ FRONTEND_DIST = os.path.abspath(os.path.join("..", "frontend", "dist"))
 VOICE_LOG_PATH = os.path.join("logs", "voice_costs.csv")
 
 def log_voice_cost(kind, cost, duration_seconds=0, character_count=0, service=""):
-    os.makedirs("logs", exist_ok=True)
+    os.makedirs(os.path.dirname(VOICE_LOG_PATH) or ".", exist_ok=True)
     is_new = not os.path.exists(VOICE_LOG_PATH)
     with open(VOICE_LOG_PATH, "a", encoding="utf-8") as f:
         if is_new:
             f.write("timestamp,kind,cost,duration_seconds,character_count,service\n")
         f.write(f"{time.time()},{kind},{cost},{duration_seconds},{character_count},{service}\n")
+    broadcaster.publish_voice_cost(kind, cost, duration_seconds, character_count, service)
+
+# A hedged STT attempt that lost the race but still completed was billed as well
+stt.on_late_result = lambda result: log_voice_cost(
+    "stt", result.get("cost", 0), duration_seconds=result.get("duration_seconds", 0),
+    service=result.get("service", ""))
 
 # Use a default session ID for the web user
 WEB_SESSION_ID = "web_user_1"
 
+@app.before_request
+def _start_request_timer():
+    g.request_start = time.perf_counter()
+    # Clients correlate transcribe -> chat -> synthesize by sending one X-Request-ID on all three
+    g.request_span = start_span(
+        f"http {request.endpoint or 'unknown'}",
+        request_id=request.headers.get("X-Request-ID"),
+        root=True,
+        method=request.method,
+        path=request.path,
+    )
+
+@app.after_request
+def _record_request_latency(response):
+    start = getattr(g, "request_start", None)
+    if start is not None:
+        HTTP_LATENCY.labels(request.endpoint or "unknown").observe(time.perf_counter() - start)
+    request_span = getattr(g, "request_span", None)
+    if request_span is not None:
+        request_span.set_attribute("status_code", response.status_code)
+        request_id = getattr(request_span, "request_id", None)
+        if request_id:
+            response.headers["X-Request-ID"] = request_id
+        if response.is_streamed:
+            # Teardown runs before a streamed body is generated; end the span once it's sent
+            # so spans started while streaming are still exported under it
+            g.pop("request_span", None)
+            response.call_on_close(request_span.end)
+    return response
+
+@app.teardown_request
+def _end_request_span(error=None):
+    request_span = g.pop("request_span", None)
+    if request_span is not None:
+        if error is not None:
+            request_span.record_error(error)
+        request_span.end()
+
+@app.route("/metrics")
+def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
 # Serve audio files for TTS playback
 @app.route("/audio/<path:filename>")
 def serve_audio(filename):
@@ -60,15 +145,7 @@ def serve_spa(path):
         return send_from_directory(FRONTEND_DIST, "index.html")
     return render_template("index.html")
 
-@app.route("/chat", methods=["POST"])
-def chat():
-    data = request.json or {}
-    user_input = data.get("message")
-    session_id = data.get("session_id") or WEB_SESSION_ID
-    ui_language = data.get("ui_language")
-    if not user_input:
-        return jsonify({"error": "No message provided"}), 400
-
+def _chat_mode():
     # Determine mode: check if keys are present. If not, use 'mock'.
     # Determine mode: check if keys are present. Default to Groq.
     mode = "groq" 
@@ -77,7 +154,24 @@ def chat():
         mode = "openai"
     elif not Config.GROQ_API_KEY and not Config.OPENAI_API_KEY:
          mode = "mock"
+    # Replays need no keys: answer from the service the cassette recorded
+    cassette = bot.api_handler.cassette
+    if cassette is not None and cassette.mode == "replay":
+        recorded = cassette.services("llm")
+        if recorded and mode not in recorded:
+            mode = recorded[0]
+    return mode
+
+@app.route("/chat", methods=["POST"])
+def chat():
+    data = request.json or {}
+    user_input = data.get("message")
+    session_id = data.get("session_id") or WEB_SESSION_ID
+    ui_language = data.get("ui_language")
+    if not user_input:
+        return jsonify({"error": "No message provided"}), 400
 
+    mode = _chat_mode()
     response_text, cost = bot.process_query(
         session_id,
         user_input,
@@ -100,45 +194,43 @@ def voice_transcribe():
     if audio_file.filename == '':
         return jsonify({"error": "No selected file"}), 400
 
-    # Save temp file - Whisper supports webm, mp3, mp4, mpeg, mpga, m4a, wav, and webm
-    # Browser MediaRecorder typically outputs webm format
-    temp_filename = f"temp_{uuid.uuid4()}.webm"
-    temp_path = os.path.join(AUDIO_DIR, temp_filename)
+    # Whisper supports webm, mp3, mp4, mpeg, mpga, m4a and wav; the extension tells it which.
+    # Browser MediaRecorder typically outputs webm and may name the blob without one.
+    filename = audio_file.filename if os.path.splitext(audio_file.filename or "")[1] else "audio.webm"
     
     try:
-        audio_file.save(temp_path)
-        print(f"Saved audio file: {temp_path}, size: {os.path.getsize(temp_path)} bytes")
-        
         # Get model service preference (groq or openai)
         model_service = request.form.get('model_service', 'groq')
         ui_language = request.form.get('ui_language')
         translate = request.form.get('translate')
         
-        # Transcribe
+        # Transcribe straight from the spooled upload (no copy in the public audio folder)
         # Voice transcription strategy:
         # - English UI: translate voice to English.
         # - Bangla UI: translate voice to English for the model,
         #   but keep response language controlled by ui_language in /chat.
         if ui_language == "bn":
             result = stt.transcribe_audio(
-                temp_path,
+                audio_file.stream,
                 model_service=model_service,
                 language="bn",
-                translate=True
+                translate=True,
+                filename=filename
             )
             result["translated"] = True
             result["target_language"] = "en"
         else:
             result = stt.transcribe_audio(
-                temp_path,
+                audio_file.stream,
                 model_service=model_service,
                 language=None,
-                translate=True
+                translate=True,
+                filename=filename
             )
             result["translated"] = True
             result["target_language"] = "en"
 
-        # Log STT cost for admin stats
+        # Log STT cost for admin stats (cache hits and coalesced retries cost 0)
         try:
             log_voice_cost(
                 "stt",
@@ -149,26 +241,88 @@ def voice_transcribe():
             )
         except Exception:
             pass
-        
-        # Clean up temp file
-        try:
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-        except OSError as e:
-            print(f"Warning: Could not delete temp file {temp_path}: {e}")
             
         return jsonify(result)
+    except RecordingTooLongError as e:
+        return jsonify({"error": str(e), "text": ""}), 413
+    except STTBusyError as e:
+        return jsonify({"error": str(e), "text": ""}), 503
     except Exception as e:
-        # Clean up on error
-        try:
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-        except:
-            pass
         print(f"Error in voice_transcribe: {str(e)}")
         import traceback
         traceback.print_exc()
         return jsonify({"error": str(e), "text": ""}), 500
+    finally:
+        audio_file.close()
+
+
+def voice_stream(ws):
+    """
+    Streaming transcription over a WebSocket (see stt_stream.py).
+
+    First text frame (optional): {"sample_rate": 16000, "model_service": "groq", "ui_language": "bn"}
+    Then binary frames of 16-bit mono PCM, and {"type": "stop"} to finish.
+    """
+    options = {}
+    first = ws.receive(timeout=Config.STT_STREAM_IDLE_TIMEOUT)
+    if isinstance(first, str):
+        try:
+            options = json.loads(first)
+        except ValueError:
+            ws.send(json.dumps({"type": "error", "error": "First text frame must be JSON options"}))
+            return
+        first = None
+    try:
+        sample_rate = int(options.get("sample_rate", 16000))
+    except (TypeError, ValueError):
+        sample_rate = None
+    if sample_rate not in SAMPLE_RATES:
+        ws.send(json.dumps({"type": "error",
+                            "error": f"sample_rate must be one of {', '.join(map(str, SAMPLE_RATES))}"}))
+        return
+    model_service = options.get("model_service", "groq")
+
+    def log_result(result):
+        try:
+            log_voice_cost("stt", result.get("cost", 0), duration_seconds=result.get("duration_seconds", 0),
+                           service=result.get("service", model_service))
+        except Exception:
+            pass
+
+    # Same strategy as /api/voice/transcribe: always translate to English for the model
+    transcriber = StreamingTranscriber(
+        stt,
+        lambda message: ws.send(json.dumps(message, ensure_ascii=False)),
+        sample_rate=sample_rate,
+        model_service=model_service,
+        language="bn" if options.get("ui_language") == "bn" else None,
+        translate=True,
+        on_result=log_result,
+    )
+    transcriber.emit({"type": "ready", "sample_rate": sample_rate})
+    try:
+        message = first
+        while True:
+            if isinstance(message, (bytes, bytearray)):
+                transcriber.feed(bytes(message))
+            elif isinstance(message, str):
+                try:
+                    control = json.loads(message)
+                except ValueError:
+                    control = {}
+                if control.get("type") == "stop":
+                    break
+            message = ws.receive(timeout=Config.STT_STREAM_IDLE_TIMEOUT)
+            if message is None:
+                break  # idle client: finish with what we have
+        transcriber.finish()
+    except Exception:
+        # Client went away: drop queued segments
+        transcriber.cancel()
+        raise
+
+if sock:
+    sock.route("/api/voice/stream")(voice_stream)
 
 
 @app.route("/api/voice/synthesize", methods=["POST"])
@@ -190,8 +344,9 @@ def voice_synthesize():
     result = tts.synthesize_speech(text, output_path, voice, model_service=model_service)
     
     if result["success"]:
-        # Return relative path for frontend to access
-        result["audio_url"] = f"/audio/{filename}"
+        # Return relative path for frontend to access (cache hits live in AUDIO_DIR/tts_cache)
+        relative = os.path.relpath(result["audio_path"], AUDIO_DIR).replace(os.sep, "/")
+        result["audio_url"] = f"/audio/{relative}"
         # We don't return the full absolute path to the client
         if "audio_path" in result:
             del result["audio_path"]
@@ -209,6 +364,82 @@ def voice_synthesize():
         
     return jsonify(result)
 
+@app.route("/api/voice/synthesize/stream", methods=["POST"])
+def voice_synthesize_stream():
+    """
+    Sentence-pipelined TTS (tts_pipeline.py): audio for each sentence is sent
+    as soon as it's synthesized, in order.
+
+    Body: {"text": ...} speaks a finished answer; {"message": ..., "session_id",
+    "ui_language"} runs the chat and speaks its answer while the LLM streams
+    it. Optional "voice" and "model_service" (TTS service).
+
+    Default response is NDJSON:
+        {"type": "audio", "index", "text", "audio" (base64 mp3), "cost", "cached"}
+        {"type": "error", "index", "text", "error"}        (that sentence is skipped)
+        {"type": "done", "text", "sentences", "cost", "llm_cost", "time_to_first_audio_ms"}
+    With ?format=mp3 the sentences' mp3 data is streamed back to back as audio/mpeg.
+    """
+    data = request.json or {}
+    text = data.get("text")
+    message = data.get("message")
+    voice = data.get("voice")
+    model_service = data.get("model_service", "edge-tts")
+    raw_mp3 = request.args.get("format") == "mp3"
+    if not text and not message:
+        return jsonify({"error": "No text or message provided"}), 400
+
+    started = time.perf_counter()
+    pipeline = TTSPipeline(tts, voice=voice, model_service=model_service)
+    chat_result = {}
+    mode = None
+    if text:
+        events = pipeline.stream_text(text)
+    else:
+        mode = _chat_mode()
+        events = pipeline.stream(bot.process_query_stream(
+            data.get("session_id") or WEB_SESSION_ID, message, model_service=mode,
+            ui_language=data.get("ui_language"), result=chat_result))
+
+    def generate():
+        spoken = []
+        tts_cost = 0.0
+        characters = 0
+        first_audio_ms = None
+        try:
+            for event in events:
+                result = event["result"]
+                if not result.get("success"):
+                    if not raw_mp3:
+                        yield json.dumps({"type": "error", "index": event["index"], "text": event["text"],
+                                          "error": result.get("error")}, ensure_ascii=False) + "\n"
+                    continue
+                if first_audio_ms is None:
+                    first_audio_ms = round((event["ready_at"] - started) * 1000, 1)
+                spoken.append(event["text"])
+                tts_cost += result.get("cost", 0) or 0
+                characters += result.get("character_count", 0)
+                if raw_mp3:
+                    yield event["audio"]
+                else:
+                    yield json.dumps({"type": "audio", "index": event["index"], "text": event["text"],
+                                      "audio": base64.b64encode(event["audio"]).decode("ascii"),
+                                      "cost": result.get("cost", 0), "cached": result.get("cached", False)},
+                                     ensure_ascii=False) + "\n"
+            if not raw_mp3:
+                yield json.dumps({"type": "done", "text": chat_result.get("response", " ".join(spoken)),
+                                  "sentences": len(spoken), "cost": round(tts_cost, 6),
+                                  "llm_cost": chat_result.get("cost"), "mode": mode,
+                                  "time_to_first_audio_ms": first_audio_ms}, ensure_ascii=False) + "\n"
+        finally:
+            try:
+                log_voice_cost("tts", tts_cost, duration_seconds=0, character_count=characters,
+                               service=model_service)
+            except Exception:
+                pass
+
+    return Response(stream_with_context(generate()), mimetype="audio/mpeg" if raw_mp3 else "application/x-ndjson")
+
 @app.route("/api/login", methods=["POST"])
 def api_login():
     data = request.json
@@ -222,11 +453,89 @@ def api_login():
     
     return jsonify({"success": False, "message": "Invalid credentials"}), 401
 
+def _admin_denied():
+    """Error response for /api/admin/* unless the request carries Config.ADMIN_TOKEN, else None."""
+    if not Config.ADMIN_TOKEN:
+        return jsonify({"error": "Admin API disabled (set ADMIN_TOKEN)"}), 404
+    auth = request.headers.get("Authorization", "")
+    token = auth[7:] if auth.startswith("Bearer ") else request.headers.get("X-Admin-Token")
+    if not token or not hmac.compare_digest(token.encode(), Config.ADMIN_TOKEN.encode()):
+        return jsonify({"error": "Unauthorized"}), 401
+    return None
+
+@app.route("/api/admin/profile", methods=["POST"])
+def admin_profile():
+    """Sample all request threads for N seconds and return collapsed stacks."""
+    denied = _admin_denied()
+    if denied:
+        return denied
+    try:
+        seconds = float(request.args.get("seconds", 5))
+        interval = float(request.args.get("interval_ms", 5)) / 1000.0
+    except ValueError:
+        return jsonify({"error": "seconds and interval_ms must be numbers"}), 400
+    try:
+        result = profiler.profile(seconds=seconds, interval=interval)
+    except ProfilerBusyError as e:
+        return jsonify({"error": str(e)}), 409
+    if request.args.get("format") == "json":
+        return jsonify(result)
+    return Response(result["collapsed"] + "\n", mimetype="text/plain")
+
+@app.route("/api/admin/memory/start", methods=["POST"])
+def admin_memory_start():
+    denied = _admin_denied()
+    if denied:
+        return denied
+    try:
+        frames = int(request.args.get("frames", 10))
+    except (TypeError, ValueError):
+        frames = 0
+    if not 1 <= frames <= 65535:  # tracemalloc's limit
+        return jsonify({"error": "frames must be an integer from 1 to 65535"}), 400
+    memory_tracker.start(frames=frames)
+    return jsonify({"success": True, "tracing": memory_tracker.running})
+
+@app.route("/api/admin/memory/snapshot", methods=["POST"])
+def admin_memory_snapshot():
+    """Diff a tracemalloc snapshot against the previous one (or the first with ?since_start=1)."""
+    denied = _admin_denied()
+    if denied:
+        return denied
+    try:
+        top = int(request.args.get("top", 20))
+    except (TypeError, ValueError):
+        top = 0
+    if top < 1:
+        return jsonify({"error": "top must be a positive integer"}), 400
+    try:
+        result = memory_tracker.snapshot(
+            top=top,
+            since_start=request.args.get("since_start") == "1"
+        )
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 409
+    # Object counts for the structures that grow with traffic
+    result["objects"] = {
+        "chatbot_sessions": len(bot.sessions),
+        "session_logs": sum(len(s.logs) for s in list(bot.sessions.values())),
+        "token_tracker_query_logs": len(bot.token_tracker.query_logs),
+    }
+    return jsonify(result)
+
+@app.route("/api/admin/memory/stop", methods=["POST"])
+def admin_memory_stop():
+    denied = _admin_denied()
+    if denied:
+        return denied
+    memory_tracker.stop()
+    return jsonify({"success": True, "tracing": False})
+
 @app.route("/api/stats", methods=["GET"])
 def api_stats():
     import os
-    import csv
     import glob
+    import itertools
     import random
     import re
     from datetime import datetime, timedelta
@@ -241,7 +550,7 @@ def api_stats():
         # Check if we have meaningful data
         latest_log = max(log_files, key=os.path.getctime)
         with open(latest_log, 'r', encoding='utf-8') as f:
-            if len(f.readlines()) > 10:
+            if sum(1 for _ in itertools.islice(f, 11)) > 10:
                 use_demo_data = False
     # Also check verification logs for real usage
     verification_files = glob.glob("logs/verification_*.txt")
@@ -296,30 +605,25 @@ def api_stats():
         # Prefer CSV logs if present
         if log_files:
             latest_log = max(log_files, key=os.path.getctime)
-            with open(latest_log, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    total_queries += 1
-                    inp = int(row.get("input_tokens", 0))
-                    out = int(row.get("output_tokens", 0))
-                    
-                    # Map old logs (claude) to groq for consistency if mixed, or just handle new
-                    model = row.get("model", "groq").lower()
-                    if model == "claude": model = "groq" # Treat legacy claude as groq for this view
-                    
-                    if model in model_stats:
-                        model_stats[model]["input"] += inp
-                        model_stats[model]["output"] += out
-                        
-                        if model == "groq":
-                            cost = (inp/1e6 * 0.59) + (out/1e6 * 0.79)
-                        elif model == "openai":
-                            cost = (inp/1e6 * 0.15) + (out/1e6 * 0.60)
-                        else:
-                            cost = (inp/1e6 * 0.075) + (out/1e6 * 0.30)
-                        
-                        model_stats[model]["cost"] += cost
-                        total_cost += cost
+            agg = aggregate_file(latest_log)
+            total_queries += agg.count
+            # Logs without a model column are Groq runs
+            by_model = agg.group("model") or {"groq": {"count": agg.count, "sums": agg.sums}}
+            for model, bucket in by_model.items():
+                # Map old logs (claude) to groq for consistency if mixed, or just handle new
+                model = model.lower()
+                if model == "claude": model = "groq" # Treat legacy claude as groq for this view
+                if model not in model_stats:
+                    continue
+                inp = int(bucket["sums"].get("input_tokens", 0))
+                out = int(bucket["sums"].get("output_tokens", 0))
+                # Cost is linear in tokens, so pricing the per-model sums equals summing per-row costs
+                price = Config.PRICING[model]
+                cost = (inp/1e6 * price["input"]) + (out/1e6 * price["output"])
+                model_stats[model]["input"] += inp
+                model_stats[model]["output"] += out
+                model_stats[model]["cost"] += cost
+                total_cost += cost
 
         # Also parse verification logs for live usage
         ver_pattern = re.compile(r"In:\s*(\d+)\s*\|\s*Out:\s*(\d+)\s*\|\s*Cost:\s*\$([0-9.]+)")
@@ -349,28 +653,18 @@ def api_stats():
             "queries": total_queries,
             "cost": round(total_cost, 4)
         })
-        avg_response_time = 0.8
+        # Measured LLM latency since server start (falls back to the old estimate)
+        measured = LLM_LATENCY.mean()
+        avg_response_time = round(measured, 3) if measured else 0.8
 
     # Voice cost totals
     total_stt_cost = 0.0
     total_tts_cost = 0.0
     if os.path.exists(VOICE_LOG_PATH):
         try:
-            with open(VOICE_LOG_PATH, "r", encoding="utf-8") as f:
-                next(f, None)  # header
-                for line in f:
-                    parts = line.strip().split(",")
-                    if len(parts) < 3:
-                        continue
-                    kind = parts[1]
-                    try:
-                        cost_val = float(parts[2])
-                    except ValueError:
-                        cost_val = 0.0
-                    if kind == "stt":
-                        total_stt_cost += cost_val
-                    elif kind == "tts":
-                        total_tts_cost += cost_val
+            by_kind = aggregate_file(VOICE_LOG_PATH).group("kind")
+            total_stt_cost = by_kind.get("stt", {}).get("sums", {}).get("cost", 0.0)
+            total_tts_cost = by_kind.get("tts", {}).get("sums", {}).get("cost", 0.0)
         except Exception:
             pass
     total_voice_cost = total_stt_cost + total_tts_cost
@@ -387,19 +681,26 @@ def api_stats():
             "stt": round(total_stt_cost, 6),
             "tts": round(total_tts_cost, 6),
             "total": round(total_voice_cost, 6)
-        }
+        },
+        "tts_cache": tts.cache.stats() if tts.cache else None
     })
 
-@app.route("/api/download_report", methods=["GET"])
-def download_report():
-    from flask import send_file
-    import glob
-    import os
-    from report_generator import ReportGenerator
+@app.route("/api/stats/stream", methods=["GET"])
+def api_stats_stream():
+    """Server-Sent Events: running totals on connect, then per-query / voice-cost deltas."""
+    try:
+        broadcaster.check_capacity()
+    except TooManySubscribersError as e:
+        return jsonify({"error": str(e)}), 503
+    # Subscribes on the first read, so an aborted response never holds a slot
+    response = Response(stream_with_context(broadcaster.stream()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # disable proxy buffering (nginx)
+    return response
 
+def _report_log_file():
     # Find latest log
-    log_files = glob.glob("logs/*.csv")
-    latest_log = max(log_files, key=os.path.getctime) if log_files else None
+    latest_log = _latest_log_file()
     
     if not latest_log:
         # Generate a dummy log if totally empty for demo
@@ -408,33 +709,101 @@ def download_report():
         with open(latest_log, "w", newline="") as f:
             f.write("customer_id,query,response,model,input_tokens,output_tokens\n")
             f.write("1,test,test,claude,500,500\n")
+    return latest_log
+
+def _report_runs():
+    """
+    Run logs for a comparison report from ?runs=<glob>&since=&until=, or None
+    for the usual single-log report. The glob is matched inside logs/ only.
+    """
+    from run_summaries import select_runs
+    pattern = request.args.get("runs")
+    since = request.args.get("since")
+    until = request.args.get("until")
+    if not (pattern or since or until):
+        return None
+    pattern = os.path.join("logs", os.path.basename(pattern or "*simulation_*.csv"))
+    return select_runs(pattern, since, until)
+
+def _report_job_response(job, status_code=200):
+    data = job.to_dict()
+    data["status_url"] = f"/api/reports/{job.id}"
+    data["download_url"] = f"/api/reports/{job.id}/download"
+    return jsonify(data), status_code
+
+@app.route("/api/download_report", methods=["GET"])
+def download_report():
+    from flask import send_file
 
-    # Generate PDF
-    rg = ReportGenerator(latest_log)
-    rg.create_pdf()
+    # Same data as a previous download -> served straight from the report cache
+    runs = _report_runs()
+    if runs == []:
+        return jsonify({"error": "No simulation logs match"}), 404
+    job = report_jobs.submit(runs or _report_log_file())
+    try:
+        pdf_path = job.wait(timeout=300)
+    except Exception as e:
+        return jsonify({"error": f"Report generation failed: {e}"}), 500
     
-    return send_file(rg.output_pdf, as_attachment=True)
+    return send_file(os.path.abspath(pdf_path), as_attachment=True,
+                     download_name=os.path.basename(pdf_path))
+
+@app.route("/api/reports", methods=["POST"])
+def submit_report():
+    """
+    Queue a report for the latest log (or a comparison across ?runs= / ?since= / ?until=);
+    poll status_url, then fetch download_url.
+    """
+    runs = _report_runs()
+    if runs == []:
+        return jsonify({"error": "No simulation logs match"}), 404
+    job = report_jobs.submit(runs or _report_log_file())
+    return _report_job_response(job, 200 if job.status == "done" else 202)
+
+@app.route("/api/reports/<job_id>", methods=["GET"])
+def report_status(job_id):
+    job = report_jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "Unknown report job"}), 404
+    return _report_job_response(job)
+
+@app.route("/api/reports/<job_id>/download", methods=["GET"])
+def report_download(job_id):
+    from flask import send_file
+
+    job = report_jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "Unknown report job"}), 404
+    status = job.status
+    if status == "failed":
+        return _report_job_response(job, 500)
+    if status != "done":
+        return _report_job_response(job, 202)
+    return send_file(os.path.abspath(job.output_pdf), as_attachment=True,
+                     download_name=os.path.basename(job.output_pdf))
+
+def _latest_log_file():
+    """Newest simulation/usage CSV (the voice cost ledger is not a simulation log)."""
+    import glob
+    log_files = [p for p in glob.glob("logs/*.csv")
+                 if os.path.abspath(p) != os.path.abspath(VOICE_LOG_PATH)]
+    return max(log_files, key=os.path.getctime) if log_files else None
 
 # Keep dashboard for backward compatibility or simple view
 @app.route("/dashboard")
 def dashboard():
-    import os
-    import csv
-    import glob
-    
-    # Find the latest simulation log
-    log_files = glob.glob("logs/*.csv")
-    data = []
+    from log_index import get_index
+
+    # Find the latest simulation log; rows are fetched lazily from /api/dashboard/rows
     summary = {"total_cost": 0, "total_queries": 0, "tokens": 0}
-    
-    if log_files:
-        latest_log = max(log_files, key=os.path.getctime)
-        with open(latest_log, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                data.append(row)
-                summary["total_queries"] += 1
-                summary["tokens"] += int(row.get("input_tokens", 0)) + int(row.get("output_tokens", 0))
+    filter_values = {}
+    latest_log = _latest_log_file()
+
+    if latest_log:
+        index = get_index(latest_log)
+        summary["total_queries"] = index.totals["queries"]
+        summary["tokens"] = index.totals["input_tokens"] + index.totals["output_tokens"]
+        filter_values = index.filter_values()
                 
         # Estimate cost (simplification, assuming Claude price for dashboard view)
         # In a real app we'd map the model column.
@@ -442,7 +811,73 @@ def dashboard():
         # Let's just use a rough 0.00001 multiplier for the summary visualization
         summary["total_cost"] = summary["tokens"] * 0.00001 
 
-    return render_template("dashboard.html", data=data, summary=summary)
+    return render_template(
+        "dashboard.html",
+        summary=summary,
+        has_data=summary["total_queries"] > 0,
+        filter_values=filter_values,
+        log_name=os.path.basename(latest_log) if latest_log else None
+    )
+
+@app.route("/api/dashboard/rows", methods=["GET"])
+def dashboard_rows():
+    """
+    Paginated rows of the latest log.
+
+    Query params: page, per_page, model, mode, q (text search), format=ndjson
+    (streams every matching row, one JSON object per line).
+    """
+    import json
+    from log_index import get_index
+
+    latest_log = _latest_log_file()
+    if not latest_log:
+        return jsonify({"rows": [], "total": 0, "page": 1, "per_page": 0, "pages": 0})
+    index = get_index(latest_log)
+    filters = {"model": request.args.get("model"), "mode": request.args.get("mode")}
+
+    if request.args.get("format") == "ndjson":
+        def generate():
+            for row in index.iter_rows(filters):
+                yield json.dumps(row, ensure_ascii=False) + "\n"
+        return Response(generate(), mimetype="application/x-ndjson")
+
+    try:
+        result = index.page(
+            page=request.args.get("page", 1),
+            per_page=request.args.get("per_page", 50),
+            filters=filters,
+            search=request.args.get("q")
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(result)
+
+def prewarm_tts_cache():
+    """Synthesize common phrases into the TTS cache in the background."""
+    if tts.cache is None or not Config.TTS_PREWARM:
+        return None
+    def run():
+        added = tts.prewarm(PREWARM_PHRASES)
+        print(f"TTS cache prewarmed: {added} new phrase(s), {tts.cache.stats()['entries']} cached")
+    thread = threading.Thread(target=run, name="tts-prewarm", daemon=True)
+    thread.start()
+    return thread
+
+_prewarmed_pid = None
+_prewarm_lock = threading.Lock()
+
+@app.before_request
+def _prewarm_once_per_process():
+    # First request of each serving process: the debug reloader's child, every gunicorn worker
+    global _prewarmed_pid
+    if _prewarmed_pid == os.getpid():
+        return
+    with _prewarm_lock:
+        if _prewarmed_pid == os.getpid():
+            return
+        _prewarmed_pid = os.getpid()
+    prewarm_tts_cache()
 
 if __name__ == "__main__":
     app.run(debug=True, port=5000)
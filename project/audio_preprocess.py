@@ -0,0 +1,197 @@
+"""
+Audio preprocessing in front of speech-to-text.
+
+Whisper bills by audio duration, and browser recordings carry leading /
+trailing silence at high sample rates and bitrates. Before an upload goes
+to the provider it is decoded, downmixed to mono, resampled to 16 kHz,
+trimmed to the speech found by the energy VAD (stt_stream.EnergyVAD, plus
+a little padding) and re-encoded as 16-bit PCM WAV (FLAC when ffmpeg is
+available). The work is CPU-bound, so it runs in a process pool.
+
+WAV is decoded natively; other containers (WebM/Opus, MP3, ...) need
+ffmpeg through pydub. When audio can't be decoded, holds no detectable
+speech, or preprocessing would save nothing, the original upload is sent
+unchanged - preprocessing never blocks a transcription.
+"""
+import io
+import os
+import shutil
+import threading
+import wave
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from config import Config
+from stt_stream import EnergyVAD
+
+TARGET_RATE = 16000
+PAD_SECONDS = 0.2        # kept around the detected speech so words aren't clipped
+MIN_SECONDS_SAVED = 0.1  # below this, trimming isn't worth a re-encode
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class UnsupportedAudioError(ValueError):
+    pass
+
+
+def _audio_segment():
+    """pydub's AudioSegment when ffmpeg is installed, else None (pydub warns on import without it)."""
+    if shutil.which("ffmpeg") is None:
+        return None
+    try:
+        from pydub import AudioSegment
+    except ImportError:
+        return None
+    return AudioSegment
+
+
+def can_decode(head):
+    """Whether decode() can handle audio starting with `head`: WAV natively, anything else needs ffmpeg."""
+    return (head[:4] == b"RIFF" and head[8:12] == b"WAVE") or shutil.which("ffmpeg") is not None
+
+
+def decode(data, filename="audio.webm"):
+    """Decode to (float32 array shaped (frames, channels) in [-1, 1], sample rate)."""
+    try:
+        with wave.open(io.BytesIO(data), "rb") as w:
+            channels, width, rate = w.getnchannels(), w.getsampwidth(), w.getframerate()
+            raw = w.readframes(w.getnframes())
+    except (wave.Error, EOFError):
+        AudioSegment = _audio_segment()
+        if AudioSegment is None:
+            raise UnsupportedAudioError(f"Cannot decode {os.path.splitext(filename)[1] or 'audio'} without ffmpeg")
+        segment = AudioSegment.from_file(io.BytesIO(data), format=os.path.splitext(filename)[1].lstrip(".") or None)
+        channels, width, rate = segment.channels, segment.sample_width, segment.frame_rate
+        raw = segment.raw_data
+
+    if width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128.0
+    elif width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        samples = (np.where(ints & 0x800000, ints - (1 << 24), ints)).astype(np.float32) / 8388608.0
+    elif width == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise UnsupportedAudioError(f"Unsupported sample width: {width} bytes")
+    frames = len(samples) // channels
+    return samples[:frames * channels].reshape(frames, channels), rate
+
+
+def downmix(samples):
+    return samples.mean(axis=1) if samples.shape[1] > 1 else samples[:, 0]
+
+
+def resample(x, rate, target=TARGET_RATE):
+    """Windowed-sinc low-pass (when downsampling) then linear interpolation."""
+    if rate == target or len(x) == 0:
+        return x.astype(np.float32)
+    if rate > target:
+        cutoff = 0.45 * target / rate            # cycles per input sample, under the new Nyquist
+        half = int(np.ceil(4 * rate / target))
+        n = np.arange(-half, half + 1)
+        taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hanning(len(n))
+        x = np.convolve(x, taps / taps.sum(), mode="same")
+    positions = np.arange(int(len(x) * target / rate)) * (rate / target)
+    return np.interp(positions, np.arange(len(x)), x).astype(np.float32)
+
+
+def speech_bounds(pcm16, rate=TARGET_RATE, pad=PAD_SECONDS):
+    """(start, end) sample range covering all detected speech plus padding, or None."""
+    vad = EnergyVAD(rate, max_segment_s=3600)
+    events = vad.feed(pcm16.tobytes()) + vad.flush()
+    segments = [e[1] for e in events if e[0] == "segment"]
+    if not segments:
+        return None
+    start = max(0, int((segments[0].start - pad) * rate))
+    end = min(len(pcm16), int((segments[-1].end + pad) * rate))
+    return start, end
+
+
+def encode(pcm16, rate=TARGET_RATE):
+    """(bytes, filename): FLAC when ffmpeg is available, else 16-bit mono WAV."""
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(pcm16.tobytes())
+    AudioSegment = _audio_segment()
+    if AudioSegment is not None:
+        try:
+            out = io.BytesIO()
+            AudioSegment.from_wav(io.BytesIO(buf.getvalue())).export(out, format="flac")
+            return out.getvalue(), "audio.flac"
+        except Exception:
+            pass
+    return buf.getvalue(), "audio.wav"
+
+
+def preprocess(data, filename="audio.webm"):
+    """
+    Decode, downmix, resample, trim and re-encode one upload (runs in a worker process).
+
+    Returns {"applied", "audio", "filename", "original_bytes", "sent_bytes",
+    "original_seconds", "billed_seconds", "reason"}; when not applied,
+    "audio" is the original data.
+    """
+    result = {"applied": False, "audio": data, "filename": filename, "original_bytes": len(data),
+              "sent_bytes": len(data), "original_seconds": None, "billed_seconds": None, "reason": ""}
+    try:
+        samples, rate = decode(data, filename)
+    except (UnsupportedAudioError, wave.Error, EOFError) as e:
+        result["reason"] = str(e)
+        return result
+    except Exception as e:  # ffmpeg decode failures
+        result["reason"] = f"Decode failed: {e}"
+        return result
+
+    original_seconds = len(samples) / rate
+    result["original_seconds"] = result["billed_seconds"] = round(original_seconds, 3)
+    mono = resample(downmix(samples), rate)
+    pcm16 = (np.clip(mono, -1.0, 1.0) * 32767).astype("<i2")
+    bounds = speech_bounds(pcm16)
+    if bounds is None:
+        result["reason"] = "No speech detected"
+        return result
+    pcm16 = pcm16[bounds[0]:bounds[1]]
+    billed_seconds = len(pcm16) / TARGET_RATE
+    audio, new_name = encode(pcm16)
+
+    if original_seconds - billed_seconds < MIN_SECONDS_SAVED and len(audio) >= len(data):
+        result["reason"] = "Nothing to save"
+        return result
+    result.update({"applied": True, "audio": audio, "filename": new_name, "sent_bytes": len(audio),
+                   "billed_seconds": round(billed_seconds, 3)})
+    return result
+
+
+def _preprocess_worker(data, filename):
+    result = preprocess(data, filename)
+    if not result["applied"]:
+        result["audio"] = None  # the caller still has the original; don't pickle it back
+    return result
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=Config.STT_PREPROCESS_WORKERS)
+    return _pool
+
+
+def run(data, filename="audio.webm", timeout=None):
+    """Preprocess in the process pool; any failure falls back to the original audio."""
+    try:
+        result = _get_pool().submit(_preprocess_worker, bytes(data), filename).result(timeout=timeout)
+        if result["audio"] is None:
+            result["audio"] = data
+        return result
+    except Exception as e:
+        return {"applied": False, "audio": data, "filename": filename, "original_bytes": len(data),
+                "sent_bytes": len(data), "original_seconds": None, "billed_seconds": None,
+                "reason": f"Preprocessing failed: {e}"}
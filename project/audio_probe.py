@@ -0,0 +1,351 @@
+"""
+Audio duration from container headers and frame indexes, without decoding.
+
+Reads at most the first and last HEAD_BYTES / TAIL_BYTES of a recording:
+- WAV (RIFF/RF64): data chunk size / byte rate
+- MP3: Xing/Info or VBRI frame count, else CBR bitrate over the audio bytes
+- Ogg (Opus, Vorbis): granule position of the last page / sample rate
+- WebM/Matroska: Segment Info Duration, or - for MediaRecorder files, which
+  don't write one - the timecode of the last block in the last Cluster
+
+Used for STT cost fallbacks and for admitting / queueing long recordings
+before any provider call (STTHandler).
+"""
+import io
+import os
+import struct
+
+HEAD_BYTES = 64 * 1024
+TAIL_BYTES = 64 * 1024
+MAX_TAIL_BYTES = 4 * 1024 * 1024
+
+
+class _Source:
+    """Random access to the start / end of a path, bytes-like or seekable file."""
+
+    def __init__(self, source):
+        self._close = None
+        self._view = None
+        self._file = None
+        if isinstance(source, (str, os.PathLike)):
+            self._file = self._close = open(source, "rb")
+            self.size = os.fstat(self._file.fileno()).st_size
+        elif isinstance(source, (bytes, bytearray, memoryview)):
+            self._view = memoryview(source).cast("B")
+            self.size = len(self._view)
+        else:
+            self._file = source
+            self._restore = source.tell()
+            self.size = source.seek(0, io.SEEK_END)
+
+    def read(self, offset, length):
+        offset = max(0, offset)
+        if self._view is not None:
+            return bytes(self._view[offset:offset + length])
+        self._file.seek(offset)
+        return self._file.read(length)
+
+    def close(self):
+        if self._close is not None:
+            self._close.close()
+        elif self._file is not None:
+            self._file.seek(self._restore)
+
+
+def read_head(source, length=HEAD_BYTES):
+    """The first `length` bytes of a path, bytes-like object or seekable file (position kept); b"" if unreadable."""
+    try:
+        src = _Source(source)
+    except (OSError, AttributeError, ValueError):
+        return b""
+    try:
+        return src.read(0, length)
+    finally:
+        src.close()
+
+
+def probe_duration(source):
+    """Seconds of audio in a path, bytes-like object or seekable binary file; None if unknown."""
+    try:
+        src = _Source(source)
+    except (OSError, AttributeError, ValueError):
+        return None
+    try:
+        head = src.read(0, HEAD_BYTES)
+        if head[:4] in (b"RIFF", b"RF64") and head[8:12] == b"WAVE":
+            seconds = _wav_duration(head, src.size)
+        elif head[:4] == b"OggS":
+            seconds = _ogg_duration(head, src)
+        elif head[:4] == b"\x1a\x45\xdf\xa3":
+            seconds = _matroska_duration(head, src)
+        else:
+            seconds = _mp3_duration(head, src)
+    except (struct.error, IndexError, ValueError, ZeroDivisionError):
+        seconds = None
+    finally:
+        src.close()
+    return round(seconds, 3) if seconds is not None and seconds >= 0 else None
+
+
+# ---------------------------------------------------------------------------
+# WAV
+# ---------------------------------------------------------------------------
+
+def _wav_duration(head, size):
+    pos = 12
+    byte_rate = None
+    while pos + 8 <= len(head):
+        chunk_id = head[pos:pos + 4]
+        chunk_size = struct.unpack_from("<I", head, pos + 4)[0]
+        if chunk_id == b"fmt ":
+            byte_rate = struct.unpack_from("<I", head, pos + 16)[0]
+        elif chunk_id == b"data":
+            if not byte_rate:
+                return None
+            available = size - (pos + 8)
+            # 0 / 0xFFFFFFFF: streamed or RF64 writers that fill the size in later
+            if chunk_size in (0, 0xFFFFFFFF) or chunk_size > available:
+                chunk_size = available
+            return chunk_size / byte_rate
+        pos += 8 + chunk_size + (chunk_size & 1)
+    return None
+
+
+# ---------------------------------------------------------------------------
+# MP3
+# ---------------------------------------------------------------------------
+
+_MP3_BITRATES = {
+    (1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_MP3_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+def _mp3_header(b, pos):
+    """(bitrate bps, sample rate, samples per frame, frame bytes, mpeg1, mono) or None."""
+    if pos + 4 > len(b) or b[pos] != 0xFF or b[pos + 1] & 0xE0 != 0xE0:
+        return None
+    version = (b[pos + 1] >> 3) & 3
+    layer = 4 - ((b[pos + 1] >> 1) & 3)
+    bitrate_index = b[pos + 2] >> 4
+    rate_index = (b[pos + 2] >> 2) & 3
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    mpeg1 = version == 3
+    bitrate = _MP3_BITRATES[(1 if mpeg1 else 2, layer)][bitrate_index] * 1000
+    rate = _MP3_RATES[version][rate_index]
+    padding = (b[pos + 2] >> 1) & 1
+    if layer == 1:
+        samples, length = 384, (12 * bitrate // rate + padding) * 4
+    else:
+        samples = 1152 if (layer == 2 or mpeg1) else 576
+        length = samples // 8 * bitrate // rate + padding
+    return bitrate, rate, samples, length, mpeg1, (b[pos + 3] >> 6) == 3
+
+
+def _mp3_duration(head, src):
+    pos = base = 0
+    if head[:3] == b"ID3":
+        tag_size = (head[6] & 0x7F) << 21 | (head[7] & 0x7F) << 14 | (head[8] & 0x7F) << 7 | (head[9] & 0x7F)
+        base = 10 + tag_size + (10 if head[5] & 0x10 else 0)
+        head = src.read(base, HEAD_BYTES)
+
+    # First frame whose successor also syncs (skips stray 0xFF bytes in padding)
+    limit = min(len(head) - 4, pos + 8192)
+    header = None
+    while pos < limit:
+        header = _mp3_header(head, pos)
+        if header and (pos + header[3] + 4 > len(head) or _mp3_header(head, pos + header[3])):
+            break
+        header = None
+        pos += 1
+    if header is None:
+        return None
+    bitrate, rate, samples, _, mpeg1, mono = header
+
+    side_info = (17 if mono else 32) if mpeg1 else (9 if mono else 17)
+    xing = pos + 4 + side_info
+    if head[xing:xing + 4] in (b"Xing", b"Info"):
+        flags = struct.unpack_from(">I", head, xing + 4)[0]
+        if flags & 1:
+            frames = struct.unpack_from(">I", head, xing + 8)[0]
+            return frames * samples / rate
+    vbri = pos + 4 + 32
+    if head[vbri:vbri + 4] == b"VBRI":
+        frames = struct.unpack_from(">I", head, vbri + 14)[0]
+        return frames * samples / rate
+
+    audio_bytes = src.size - (base + pos)
+    if src.size >= 128 and src.read(src.size - 128, 3) == b"TAG":
+        audio_bytes -= 128  # ID3v1
+    return audio_bytes * 8 / bitrate
+
+
+# ---------------------------------------------------------------------------
+# Ogg (Opus / Vorbis)
+# ---------------------------------------------------------------------------
+
+def _ogg_duration(head, src):
+    segments = head[26]
+    packet = 27 + segments
+    if head[packet:packet + 8] == b"OpusHead":
+        rate = 48000  # Opus granules always count 48 kHz samples
+        pre_skip = struct.unpack_from("<H", head, packet + 10)[0]
+    elif head[packet:packet + 7] == b"\x01vorbis":
+        rate = struct.unpack_from("<I", head, packet + 12)[0]
+        pre_skip = 0
+    else:
+        return None
+
+    window = TAIL_BYTES
+    while True:
+        tail = src.read(src.size - window, window)
+        pos = len(tail)
+        while True:
+            pos = tail.rfind(b"OggS", 0, pos)
+            if pos < 0 or pos + 14 > len(tail):
+                break
+            granule = struct.unpack_from("<q", tail, pos + 6)[0]
+            if tail[pos + 4] == 0 and granule >= 0:
+                return max(0, granule - pre_skip) / rate
+        if window >= min(src.size, MAX_TAIL_BYTES):
+            return None
+        window *= 4
+
+
+# ---------------------------------------------------------------------------
+# WebM / Matroska
+# ---------------------------------------------------------------------------
+
+EBML_SEGMENT = 0x18538067
+EBML_INFO = 0x1549A966
+EBML_TIMECODE_SCALE = 0x2AD7B1
+EBML_DURATION = 0x4489
+EBML_CLUSTER = 0x1F43B675
+EBML_TIMECODE = 0xE7
+EBML_SIMPLE_BLOCK = 0xA3
+EBML_BLOCK_GROUP = 0xA0
+EBML_BLOCK = 0xA1
+EBML_CRC32 = 0xBF
+CLUSTER_ID_BYTES = b"\x1f\x43\xb6\x75"
+
+
+def _vint(b, pos, keep_marker):
+    """(value, length, unknown_size) of an EBML variable-length integer."""
+    first = b[pos]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not first & mask:
+        mask >>= 1
+        length += 1
+    if length > 8:
+        raise ValueError("Invalid EBML vint")
+    value = first if keep_marker else first & (mask - 1)
+    for i in range(1, length):
+        value = (value << 8) | b[pos + i]
+    unknown = not keep_marker and value == (1 << (7 * length)) - 1
+    return value, length, unknown
+
+
+def _element(b, pos):
+    """(id, data start, data size or None if unknown)."""
+    element_id, id_len, _ = _vint(b, pos, True)
+    size, size_len, unknown = _vint(b, pos + id_len, False)
+    return element_id, pos + id_len + size_len, None if unknown else size
+
+
+def _uint(b, start, size):
+    return int.from_bytes(b[start:start + size], "big")
+
+
+def _matroska_duration(head, src):
+    _, start, size = _element(head, 0)            # EBML header
+    pos = start + size
+    element_id, pos, _ = _element(head, pos)
+    if element_id != EBML_SEGMENT:
+        return None
+
+    scale = 1_000_000  # ns per timecode unit
+    duration = None
+    while pos < len(head) - 2:
+        element_id, start, size = _element(head, pos)
+        if element_id == EBML_INFO:
+            end = start + (size if size is not None else len(head) - start)
+            child = start
+            while child < min(end, len(head)) - 2:
+                cid, cstart, csize = _element(head, child)
+                if cid == EBML_TIMECODE_SCALE:
+                    scale = _uint(head, cstart, csize)
+                elif cid == EBML_DURATION:
+                    duration = struct.unpack_from(">f" if csize == 4 else ">d", head, cstart)[0]
+                child = cstart + (csize or 0)
+            if duration:
+                return duration * scale / 1e9
+        if element_id == EBML_CLUSTER or size is None:
+            break
+        pos = start + size
+    return _last_block_time(src, scale)
+
+
+def _last_block_time(src, scale):
+    """End time of the last block in the last Cluster (MediaRecorder files have no Duration)."""
+    window = TAIL_BYTES
+    while True:
+        offset = max(0, src.size - window)
+        tail = src.read(offset, window)
+        pos = len(tail)
+        while True:
+            pos = tail.rfind(CLUSTER_ID_BYTES, 0, pos)
+            if pos < 0:
+                break
+            result = _cluster_end(tail, pos)
+            if result is not None:
+                return result * scale / 1e9
+        if offset == 0 or window >= MAX_TAIL_BYTES:
+            return None
+        window *= 4
+
+
+def _cluster_end(b, pos):
+    """Timecode just past the last block of the cluster at `pos`, or None if it doesn't parse."""
+    try:
+        _, start, size = _element(b, pos)
+        end = len(b) if size is None else min(len(b), start + size)
+        cluster_time = None
+        block_times = []
+        child = start
+        while child < end - 2:
+            cid, cstart, csize = _element(b, child)
+            if cid == EBML_TIMECODE:
+                cluster_time = _uint(b, cstart, csize)
+            elif cid == EBML_SIMPLE_BLOCK and cluster_time is not None and cstart + 4 <= len(b):
+                _, track_len, _ = _vint(b, cstart, False)
+                block_times.append(struct.unpack_from(">h", b, cstart + track_len)[0])
+            elif cid == EBML_BLOCK_GROUP and cluster_time is not None:
+                inner = cstart
+                while inner < min(end, cstart + (csize or 0)) - 2:
+                    gid, gstart, gsize = _element(b, inner)
+                    if gid == EBML_BLOCK and gstart + 4 <= len(b):
+                        _, track_len, _ = _vint(b, gstart, False)
+                        block_times.append(struct.unpack_from(">h", b, gstart + track_len)[0])
+                    inner = gstart + (gsize or 0)
+            elif cluster_time is None and cid != EBML_CRC32:
+                return None  # Timecode must come first; this wasn't a real cluster
+            if csize is None:
+                break
+            child = cstart + csize
+    except (ValueError, IndexError, struct.error):
+        return None
+    if cluster_time is None:
+        return None
+    if not block_times:
+        return cluster_time
+    block_times.sort()
+    # The last block lasts about as long as the spacing between the last two
+    frame = block_times[-1] - block_times[-2] if len(block_times) > 1 else 0
+    return cluster_time + block_times[-1] + frame
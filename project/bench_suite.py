@@ -0,0 +1,326 @@
+"""
+Microbenchmark / regression suite for the request hot paths.
+
+Each case times a small piece of work (sentence trimming, prompt build,
+Bangla detection, pricing, token tracking, /api/stats over synthetic logs,
+mock end-to-end /chat) and reports the median per-call time over several
+repeats, plus the spread of those repeats as a noise estimate. Results are
+compared with a baseline JSON; a case regresses when it is slower than
+`threshold` x its baseline plus the noise band of both runs.
+
+Absolute timings differ between machines (and clock speed drifts within a
+run), so a fixed pure-Python calibration loop is timed between the repeats
+of every case, and each case's baseline is rescaled by the ratio of its two
+calibration times before comparing.
+
+    python main.py bench                       # compare with benchmarks/baseline.json
+    python main.py bench --update-baseline     # record a new baseline
+"""
+import json
+import os
+import platform
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime
+from config import Config
+
+DEFAULT_BASELINE = os.path.join("benchmarks", "baseline.json")
+DEFAULT_THRESHOLD = 1.5
+REPEAT = 9
+# Per-repeat budget used to size the inner loop of each case
+TARGET_SECONDS = 0.1
+CALIBRATION_NUMBER = 10
+
+RESPONSE_EN = ("Hydra Glow Serum is $45 and suits dry and normal skin. It contains hyaluronic acid and "
+               "niacinamide! Apply two drops morning and evening? It is fragrance-free. Our Volumizing "
+               "Mascara is waterproof and lasts all day. Would you like a recommendation")
+RESPONSE_BN = ("হাইড্রা গ্লো সিরাম শুষ্ক ত্বকের জন্য ভালো। এর দাম ৪৫ ডলার। এটি সুগন্ধিমুক্ত। "
+               "দিনে দুবার ব্যবহার করুন।")
+QUERY_EN = "Is Hydra Glow Serum good for dry skin and how much does it cost?"
+QUERY_BN = "হাইড্রা গ্লো সিরামের দাম কত?"
+
+SIM_FIELDS = ["customer_id", "mode", "query", "response", "ai_cost", "stt_cost", "tts_cost",
+              "total_cost", "input_tokens", "output_tokens", "audio_duration"]
+
+
+def _calibration():
+    total = 0
+    for i in range(10000):
+        total += i * i % 7
+    return total
+
+
+def _time_once(fn, number):
+    start = time.perf_counter()
+    for _ in range(number):
+        fn()
+    return (time.perf_counter() - start) / number
+
+
+def _median(values):
+    values = sorted(values)
+    mid = len(values) // 2
+    return values[mid] if len(values) % 2 else (values[mid - 1] + values[mid]) / 2
+
+
+def _noise(values):
+    """Half the interquartile range relative to the median: the run's own jitter."""
+    values = sorted(values)
+    q1, q3 = values[len(values) // 4], values[(3 * len(values)) // 4]
+    return (q3 - q1) / 2 / _median(values)
+
+
+def _time_per_call(fn, number, repeat=REPEAT):
+    """(median per-call seconds, noise, median calibration seconds) with calibration interleaved."""
+    times, calibration = [], []
+    for _ in range(repeat):
+        calibration.append(_time_once(_calibration, CALIBRATION_NUMBER))
+        times.append(_time_once(fn, number))
+    return _median(times), _noise(times), _median(calibration)
+
+
+def _autorange(fn):
+    """Inner loop size so one repeat takes about TARGET_SECONDS."""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= TARGET_SECONDS / 5 or number >= 1_000_000:
+            return max(1, int(number * TARGET_SECONDS / max(elapsed, 1e-9)))
+        number *= 10
+
+
+def write_synthetic_logs(log_dir, rows=2000, seed=0):
+    """A simulation CSV, a voice cost log and a verification log like a busy day's."""
+    import csv
+    rng = random.Random(seed)
+    os.makedirs(log_dir, exist_ok=True)
+    # Written first: /api/stats reads the newest CSV in logs/
+    with open(os.path.join(log_dir, "voice_costs.csv"), "w", encoding="utf-8") as f:
+        f.write("timestamp,kind,cost,duration_seconds,character_count,service\n")
+        for i in range(rows // 2):
+            f.write(f"{time.time()},stt,0.00003,3.2,0,groq\n{time.time()},tts,0.0,0,{len(RESPONSE_EN)},edge-tts\n")
+    with open(os.path.join(log_dir, f"voice_simulation_{int(time.time())}.csv"), "w",
+              newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(SIM_FIELDS)
+        for i in range(rows):
+            inp, out = rng.randint(800, 2500), rng.randint(20, 120)
+            ai_cost = inp / 1e6 * 0.59 + out / 1e6 * 0.79
+            voice = i % 2 == 1
+            stt_cost = 0.00003 if voice else 0.0
+            writer.writerow([f"sim_user_{i // 5}", "voice" if voice else "text", QUERY_EN, RESPONSE_EN,
+                             ai_cost, stt_cost, 0.0, ai_cost + stt_cost, inp, out, 3.2 if voice else 0])
+    with open(os.path.join(log_dir, "verification_groq.txt"), "w", encoding="utf-8") as f:
+        for _ in range(rows // 4):
+            f.write(f"[{datetime.now()}] In: 1500 | Out: 60 | Cost: $0.00093240\n")
+
+
+# ---------------------------------------------------------------------------
+# Cases: each setup returns a zero-argument callable (and may register cleanup)
+# ---------------------------------------------------------------------------
+
+def _case_limit_sentences(ctx):
+    bot = ctx.bot()
+    return lambda: (bot._limit_sentences(RESPONSE_EN, 4, "en"), bot._limit_sentences(RESPONSE_BN, 2, "bn"))
+
+
+def _case_prompt_build(ctx):
+    from chatbot import Session
+    bot = ctx.bot()
+    session = Session("bench")
+    for _ in range(3):
+        session.add_interaction(QUERY_EN, RESPONSE_EN, 0.0001, 1500, 60)
+    return lambda: (bot._build_prompt(session, QUERY_EN, "en"), bot._build_prompt(session, QUERY_BN, "bn"))
+
+
+def _case_bangla_detection(ctx):
+    from tts_handler import TTSHandler
+    tts = TTSHandler()
+    # English is the worst case: every character is scanned
+    return lambda: (tts._detect_language(RESPONSE_EN), tts._detect_language(RESPONSE_BN))
+
+
+def _case_calculate_cost(ctx):
+    from cost_calculator import CostCalculator
+    calc = CostCalculator()
+    return lambda: (calc.calculate_cost("groq", 1523, 87), calc.calculate_cost("openai", 1523, 87))
+
+
+def _case_token_tracker(ctx):
+    from token_tracker import TokenTracker
+    ctx.enter_tempdir()
+    tracker = TokenTracker()
+    for i in range(5000):
+        tracker.log_query("groq", 1000 + i % 500, 50, 0.0006, 0.8)
+
+    def run():
+        tracker.log_query("groq", 1523, 87, 0.00096, 0.8)
+        tracker.get_averages("groq")
+    return run
+
+
+def _case_api_stats(ctx):
+    client = ctx.client()
+    ctx.enter_tempdir()
+    write_synthetic_logs("logs")
+    return lambda: client.get("/api/stats").get_json()
+
+
+def _case_chat_mock(ctx):
+    client = ctx.client()
+    ctx.enter_tempdir()
+    ctx.patch(Config, GROQ_API_KEY="", OPENAI_API_KEY="")
+    payload = {"message": QUERY_EN, "session_id": "bench_session"}
+
+    def run():
+        body = client.post("/chat", json=payload).get_json()
+        if body.get("mode") != "mock":
+            raise RuntimeError(f"/chat did not use the mock provider: {body}")
+    return run
+
+
+CASES = {
+    "limit_sentences": _case_limit_sentences,
+    "prompt_build": _case_prompt_build,
+    "bangla_detection": _case_bangla_detection,
+    "calculate_cost": _case_calculate_cost,
+    "token_tracker": _case_token_tracker,
+    "api_stats": _case_api_stats,
+    "chat_mock": _case_chat_mock,
+}
+
+
+class _Context:
+    """Shared fixtures plus undo actions (cwd, config patches) for one case."""
+
+    _bot = None
+    _client = None
+
+    def __init__(self):
+        self._undo = []
+
+    def bot(self):
+        if _Context._bot is None:
+            from chatbot import Chatbot
+            _Context._bot = Chatbot()
+        return _Context._bot
+
+    def client(self):
+        # Import before any chdir: app resolves its audio / frontend dirs at import
+        if _Context._client is None:
+            import app as app_module
+            _Context._client = app_module.app.test_client()
+        return _Context._client
+
+    def enter_tempdir(self):
+        """Run the case in a scratch cwd so logs it writes never touch the real logs/."""
+        cwd = os.getcwd()
+        tmp = tempfile.mkdtemp(prefix="lira_bench_")
+        os.chdir(tmp)
+        self._undo.append(lambda: (os.chdir(cwd), shutil.rmtree(tmp, ignore_errors=True)))
+        return tmp
+
+    def patch(self, obj, **values):
+        old = {name: getattr(obj, name) for name in values}
+        for name, value in values.items():
+            setattr(obj, name, value)
+        self._undo.append(lambda: [setattr(obj, name, value) for name, value in old.items()])
+
+    def close(self):
+        while self._undo:
+            self._undo.pop()()
+
+
+def run(names=None, repeat=REPEAT, progress=None):
+    """
+    Run the selected cases (default: all).
+
+    Returns {"calibration_us", "machine", "created_at",
+    "results": {name: {"per_call_us", "noise", "calibration_us", "number"}}}.
+    """
+    names = list(names or CASES)
+    unknown = [n for n in names if n not in CASES]
+    if unknown:
+        raise ValueError(f"Unknown benchmark(s): {', '.join(unknown)} (expected: {', '.join(CASES)})")
+
+    results = {}
+    for name in names:
+        ctx = _Context()
+        try:
+            fn = CASES[name](ctx)
+            fn()  # warm caches / lazy imports outside the timed loop
+            number = _autorange(fn)
+            per_call, noise, calibration = _time_per_call(fn, number, repeat)
+            results[name] = {"per_call_us": round(per_call * 1e6, 3), "noise": round(noise, 4),
+                             "calibration_us": round(calibration * 1e6, 3), "number": number}
+        finally:
+            ctx.close()
+        if progress:
+            progress(name, results[name])
+    return {
+        "calibration_us": round(_median([_time_once(_calibration, CALIBRATION_NUMBER) for _ in range(repeat)]) * 1e6, 3),
+        "machine": f"{platform.python_implementation()} {platform.python_version()} / {platform.machine()}",
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Per-case ratio of current to (machine-scaled) baseline time.
+
+    A case regresses when its ratio exceeds `threshold` widened by twice the
+    combined noise of the two runs. Returns [{"name", "current_us",
+    "expected_us", "ratio", "limit", "regressed"}] for cases present in both runs.
+    """
+    global_scale = 1.0
+    if baseline.get("calibration_us") and current.get("calibration_us"):
+        global_scale = current["calibration_us"] / baseline["calibration_us"]
+    rows = []
+    for name, result in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base or not base.get("per_call_us"):
+            continue
+        scale = global_scale
+        if base.get("calibration_us") and result.get("calibration_us"):
+            scale = result["calibration_us"] / base["calibration_us"]
+        expected = base["per_call_us"] * scale
+        ratio = result["per_call_us"] / expected
+        limit = threshold * (1 + 2 * (result.get("noise", 0) + base.get("noise", 0)))
+        rows.append({"name": name, "current_us": result["per_call_us"], "expected_us": round(expected, 3),
+                     "ratio": round(ratio, 3), "limit": round(limit, 3), "regressed": ratio > limit})
+    return rows
+
+
+def merge_fastest(*runs):
+    """Per case, the run with the lowest calibrated time (for re-checking suspected regressions)."""
+    merged = dict(runs[0], results=dict(runs[0]["results"]))
+    for run_ in runs[1:]:
+        for name, result in run_["results"].items():
+            best = merged["results"].get(name)
+            if best is None or (result["per_call_us"] / result.get("calibration_us", 1)
+                                < best["per_call_us"] / best.get("calibration_us", 1)):
+                merged["results"][name] = result
+    return merged
+
+
+def load_baseline(path=DEFAULT_BASELINE):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(current, path=DEFAULT_BASELINE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(current, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    os.replace(tmp, path)
@@ -0,0 +1,97 @@
+"""
+Benchmark: log_aggregator vs. csv.DictReader on a generated large log.
+
+Run from the project folder:
+    python benchmarks/bench_aggregate.py --size-mb 2048 [--workers 8] [--keep]
+
+The DictReader baseline is timed on the first --baseline-mb of the file and
+extrapolated (a full multi-GB DictReader pass takes minutes).
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from log_aggregator import aggregate_file
+
+HEADER = "customer_id,mode,query,response,ai_cost,stt_cost,tts_cost,total_cost,input_tokens,output_tokens,audio_duration\n"
+
+
+def generate(path, size_mb):
+    # Build a ~1 MB block of realistic rows once and write it repeatedly
+    rows = []
+    for i in range(8000):
+        mode = "voice" if i % 2 else "text"
+        stt = 0.0003 if mode == "voice" else 0
+        rows.append(f"sim_user_{i // 5},{mode},\"Is Hydra Glow Serum good for dry, oily skin?\","
+                    f"Yes. It hydrates without clogging pores.,{0.0005 + i % 7 / 1e5},{stt},0.0,"
+                    f"{0.0005 + stt},{800 + i % 90},{40 + i % 30},{9.5 if stt else 0}\n")
+    block = "".join(rows).encode("utf-8")
+    target = size_mb * 1024 * 1024
+    with open(path, "wb") as f:
+        f.write(HEADER.encode("utf-8"))
+        written = 0
+        while written < target:
+            f.write(block)
+            written += len(block)
+    return os.path.getsize(path)
+
+
+def dictreader_baseline(path, limit_bytes):
+    start = time.perf_counter()
+    total = 0.0
+    count = 0
+    with open(path, "r", encoding="utf-8") as f:
+        head = f.read(limit_bytes)
+    head = head[:head.rfind("\n") + 1]
+    for row in csv.DictReader(io.StringIO(head)):
+        total += float(row.get("ai_cost", 0)) + float(row.get("stt_cost", 0))
+        count += 1
+    return time.perf_counter() - start, len(head.encode("utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=int, default=2048)
+    parser.add_argument("--baseline-mb", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--keep", action="store_true", help="Keep the generated log")
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix=".csv")
+    os.close(fd)
+    try:
+        print(f"Generating {args.size_mb} MB log...")
+        size = generate(path, args.size_mb)
+        gb = size / 1024 ** 3
+
+        base_s, base_bytes = dictreader_baseline(path, args.baseline_mb * 1024 * 1024)
+        extrapolated = base_s * size / base_bytes
+
+        start = time.perf_counter()
+        serial = aggregate_file(path, parallel=False)
+        serial_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        parallel = aggregate_file(path, workers=args.workers, parallel=True)
+        parallel_s = time.perf_counter() - start
+
+        assert serial.count == parallel.count
+        print(f"Rows: {parallel.count:,}  ({gb:.2f} GB)")
+        print(f"csv.DictReader (extrapolated): {extrapolated:8.2f} s  {gb / extrapolated:6.3f} GB/s")
+        print(f"aggregate_file, 1 process:     {serial_s:8.2f} s  {gb / serial_s:6.3f} GB/s")
+        print(f"aggregate_file, process pool:  {parallel_s:8.2f} s  {gb / parallel_s:6.3f} GB/s "
+              f"({os.cpu_count()} CPUs)")
+        print(f"By mode: { {k: v['count'] for k, v in parallel.group('mode').items()} }")
+    finally:
+        if args.keep:
+            print(f"Log kept at {path}")
+        else:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark: /dashboard page reads through log_index vs. reading the whole CSV.
+
+Run from the project folder:
+    python benchmarks/bench_dashboard.py [--rows 10000 100000 1000000]
+
+Page latency after the (one-off, incremental) index build should stay flat
+as the log grows; the old full-read approach grows linearly.
+"""
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from log_index import LogIndex
+
+FIELDS = ["customer_id", "mode", "query", "response", "ai_cost", "stt_cost", "tts_cost",
+          "total_cost", "input_tokens", "output_tokens", "audio_duration"]
+
+
+def write_log(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(FIELDS)
+        for i in range(rows):
+            writer.writerow([f"sim_user_{i // 5}", "voice" if i % 2 else "text",
+                             "Is Hydra Glow Serum good for dry skin?",
+                             "Yes, it is. It contains hyaluronic acid, which hydrates dry skin.",
+                             0.00012, 0.0003, 0.0, 0.00042, 850, 60, 9.5])
+
+
+def full_read(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return list(csv.DictReader(f))[:50]
+
+
+def best_of(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'Rows':>10} {'Index build s':>14} {'First page ms':>14} {'Last page ms':>13} "
+          f"{'Filtered ms':>12} {'Full read ms':>13}")
+    for rows in args.rows:
+        fd, path = tempfile.mkstemp(suffix=".csv")
+        os.close(fd)
+        try:
+            write_log(path, rows)
+            start = time.perf_counter()
+            index = LogIndex(path).refresh()
+            build = time.perf_counter() - start
+            last = -(-rows // 50)
+            first_ms = best_of(lambda: index.page(1, 50)) * 1000
+            last_ms = best_of(lambda: index.page(last, 50)) * 1000
+            filtered_ms = best_of(lambda: index.page(last // 2, 50, filters={"mode": "voice"})) * 1000
+            full_ms = best_of(lambda: full_read(path), repeat=1) * 1000
+            print(f"{rows:>10} {build:>14.2f} {first_ms:>14.2f} {last_ms:>13.2f} {filtered_ms:>12.2f} {full_ms:>13.1f}")
+        finally:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
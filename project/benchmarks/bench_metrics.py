@@ -0,0 +1,52 @@
+"""
+Benchmark: recording overhead of metrics.Histogram / Counter.
+
+Run from the project folder:
+    python benchmarks/bench_metrics.py
+
+Fails (exit code 1) if a single observation costs a microsecond or more.
+"""
+import os
+import sys
+import timeit
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from metrics import Counter, Histogram, Registry
+
+BUDGET_NS = 1000
+NUMBER = 200_000
+
+
+def per_call_ns(stmt, setup_globals):
+    # Best of 5 runs to filter scheduler noise
+    best = min(timeit.repeat(stmt, globals=setup_globals, number=NUMBER, repeat=5))
+    return best / NUMBER * 1e9
+
+
+def main():
+    registry = Registry()
+    family = registry.histogram("bench_seconds", "Benchmark histogram.", ("service",))
+    child = family.labels("groq")
+    counter = Counter()
+    hist = Histogram()
+
+    results = {
+        "Histogram.observe (small value)": per_call_ns("hist.observe(0.000012)", {"hist": hist}),
+        "Histogram.observe (1.2s)": per_call_ns("hist.observe(1.234567)", {"hist": hist}),
+        "family.labels(...).observe": per_call_ns("family.labels('groq').observe(0.8)", {"family": family}),
+        "child.observe": per_call_ns("child.observe(0.8)", {"child": child}),
+        "Counter.inc": per_call_ns("counter.inc()", {"counter": counter}),
+    }
+
+    failed = False
+    for name, ns in results.items():
+        status = "OK" if ns < BUDGET_NS else "OVER BUDGET"
+        failed = failed or ns >= BUDGET_NS
+        print(f"{name:<34} {ns:8.1f} ns/op  [{status}]")
+
+    render_s = min(timeit.repeat(registry.render, number=100, repeat=3)) / 100
+    print(f"{'Registry.render (1 histogram)':<34} {render_s * 1e6:8.1f} us")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
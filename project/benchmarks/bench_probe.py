@@ -0,0 +1,74 @@
+"""
+Benchmark: audio_probe.probe_duration vs. decoding, plus the old size estimate's error.
+
+Run from the project folder:
+    python benchmarks/bench_probe.py [FILE ...] [--iterations 2000]
+
+Without files, synthetic WAV (16 kHz and 48 kHz stereo) and CBR MP3 clips
+are generated. For each file it prints the probe time per call, the time to
+decode the samples (WAV only, via audio_preprocess.decode) and the duration
+STTHandler used to assume (file size / 16000) next to the probed one.
+"""
+import argparse
+import io
+import os
+import sys
+import time
+import wave
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from audio_probe import probe_duration
+from audio_preprocess import decode
+from fake_provider import MP3_FRAME, MP3_FRAME_SECONDS
+
+
+def synthetic_wav(seconds, rate, channels):
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(b"\x00\x00" * int(seconds * rate) * channels)
+    return buf.getvalue()
+
+
+def best_time(fn, iterations):
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        best = min(best, (time.perf_counter() - start) / iterations)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    samples = {}
+    for path in args.files:
+        with open(path, "rb") as f:
+            samples[os.path.basename(path)] = f.read()
+    if not samples:
+        samples = {
+            "60s 16k mono.wav": synthetic_wav(60, 16000, 1),
+            "60s 48k stereo.wav": synthetic_wav(60, 48000, 2),
+            "60s 128k.mp3": MP3_FRAME * int(60 / MP3_FRAME_SECONDS),
+        }
+
+    print(f"{'File':<22}{'KB':>9}{'probe us':>10}{'decode ms':>11}{'probed s':>10}{'size/16000 s':>14}")
+    for name, data in samples.items():
+        probe_us = best_time(lambda: probe_duration(data), args.iterations) * 1e6
+        try:
+            decode_ms = f"{best_time(lambda: decode(data, name), 3) * 1000:.2f}"
+        except Exception:  # needs ffmpeg for non-WAV
+            decode_ms = "n/a"
+        seconds = probe_duration(data)
+        print(f"{name:<22}{len(data) / 1024:>9.0f}{probe_us:>10.1f}{decode_ms:>11}"
+              f"{seconds if seconds is not None else float('nan'):>10.2f}{len(data) / 16000:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
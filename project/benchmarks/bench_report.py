@@ -0,0 +1,81 @@
+"""
+Benchmark: ReportGenerator chart rendering and report throughput.
+
+Run from the project folder:
+    python benchmarks/bench_report.py [--reports 16] [--threads 4]
+
+Charts are rendered in memory through the Agg API, so reports can be built
+from several threads at once without racing on a shared PNG file.
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from report_generator import ReportGenerator, render_cost_chart
+
+HEADER = "customer_id,mode,query,response,ai_cost,stt_cost,tts_cost,total_cost,input_tokens,output_tokens,audio_duration\n"
+
+
+def write_log(path, rows, seed):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(HEADER)
+        for i in range(rows):
+            ai = 0.0001 + (i * seed % 97) / 1e7
+            f.write(f"sim_user_{i // 5},voice,Hi,Hello,{ai},0.0003,0.0,{ai + 0.0003},900,50,9.5\n")
+
+
+def build(path):
+    start = time.perf_counter()
+    ReportGenerator(path, output_pdf=io.BytesIO()).create_pdf()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reports", type=int, default=16)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=500)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    logs = []
+    for i in range(args.reports):
+        path = os.path.join(tmp, f"run_{i}.csv")
+        write_log(path, args.rows, seed=i + 1)
+        logs.append(path)
+
+    render_cost_chart.cache_clear()
+    start = time.perf_counter()
+    render_cost_chart(0.12, 0.3, 0.0)
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    render_cost_chart(0.12, 0.3, 0.0)
+    warm = time.perf_counter() - start
+    print(f"Chart render (cold):      {cold * 1000:8.2f} ms")
+    print(f"Chart render (memoized):  {warm * 1e6:8.2f} us")
+
+    render_cost_chart.cache_clear()
+    serial = [build(p) for p in logs]
+    print(f"Report, serial:           {sum(serial) / len(serial) * 1000:8.2f} ms/report (distinct data)")
+    repeat = [build(logs[0]) for _ in range(len(logs))]
+    print(f"Report, serial:           {sum(repeat) / len(repeat) * 1000:8.2f} ms/report (same data, memoized chart)")
+
+    render_cost_chart.cache_clear()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        list(pool.map(build, logs))
+    wall = time.perf_counter() - start
+    print(f"Concurrent ({args.threads} threads):    {len(logs) / wall:8.2f} reports/s "
+          f"({wall:.2f}s for {len(logs)} reports, no shared chart file)")
+
+    for p in logs:
+        os.remove(p)
+    os.rmdir(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Benchmark: vectorized what-if re-pricing vs. calculate_cost in a loop.
+
+Run from the project folder:
+    python benchmarks/bench_reprice.py [--rows 5000000]
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cost_calculator import CostCalculator
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--loop-rows", type=int, default=200_000, help="Rows timed for the Python loop baseline")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    usage = {
+        "input_tokens": rng.integers(600, 1200, args.rows).astype(np.float64),
+        "output_tokens": rng.integers(20, 220, args.rows).astype(np.float64),
+        "audio_duration": rng.exponential(8.0, args.rows),
+        "tts_chars": rng.integers(0, 600, args.rows).astype(np.float64),
+    }
+    calc = CostCalculator()
+
+    start = time.perf_counter()
+    for model in calc.pricing:
+        for i in range(args.loop_rows):
+            calc.calculate_cost(model, usage["input_tokens"][i], usage["output_tokens"][i])
+    loop_s = (time.perf_counter() - start) * args.rows / args.loop_rows
+
+    start = time.perf_counter()
+    result = calc.compare_pricing(usage)
+    vec_s = time.perf_counter() - start
+
+    print(f"Rows: {args.rows:,} x {len(calc.pricing)} LLM tables + STT/TTS tables")
+    print(f"calculate_cost loop (extrapolated): {loop_s:8.2f} s")
+    print(f"compare_pricing (vectorized):       {vec_s:8.3f} s")
+    for name, s in result["llm"].items():
+        print(f"  {name:<8} total ${s['total']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark: simulation memory and throughput vs. customer count.
+
+Uses a stand-in bot with a fixed per-query latency (no API calls), so it
+measures the simulation harness itself: peak traced memory should stay flat
+as --customers grows.
+
+Run from the project folder:
+    python benchmarks/bench_simulation.py [--customers 1000 10000] [--concurrency 8] [--latency-ms 2]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from unittest import mock
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import simulation
+from chatbot import Session
+from token_tracker import TokenTracker
+
+PRODUCTS = [{"name": f"Product {i}", "brand": "Lira"} for i in range(40)]
+
+
+class StubBot:
+    def __init__(self, latency):
+        self.products = PRODUCTS
+        self.latency = latency
+        self.sessions = {}
+        self.token_tracker = TokenTracker()
+
+    def process_query(self, customer_id, query, model_service="groq"):
+        time.sleep(self.latency)
+        session = self.sessions.setdefault(customer_id, Session(customer_id))
+        response = "Thanks for asking! " * 10
+        session.add_interaction(query, response, 0.0005, 900, 40)
+        return response, 0.0005
+
+    def end_session(self, customer_id):
+        self.sessions.pop(customer_id, None)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--customers", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    tmp = tempfile.mkdtemp()
+    os.chdir(tmp)
+    try:
+        for customers in args.customers:
+            bot = StubBot(args.latency_ms / 1000)
+            tracemalloc.start()
+            start = time.perf_counter()
+            with mock.patch.object(simulation, "Chatbot", return_value=bot), \
+                    open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+                path = simulation.run_simulation(customers, args.concurrency, seed=1)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            rows = sum(1 for _ in open(path, encoding="utf-8")) - 1
+            os.remove(path)
+            print(f"{customers:>8,} customers  {rows:>8,} rows  {elapsed:7.2f}s  "
+                  f"{rows / elapsed:9.0f} queries/s  peak {peak / 1024:8.0f} KiB")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
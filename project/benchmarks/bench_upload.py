@@ -0,0 +1,119 @@
+"""
+Benchmark: /api/voice/transcribe upload handling, old disk path vs. spooled stream.
+
+Run from the project folder:
+    python benchmarks/bench_upload.py [--sizes-kb 64 1024 8192 20480] [--iterations 20]
+
+Old: the multipart upload is parsed by Flask's default stream (a temp file
+above 500 KB), saved to the public audio folder, reopened, sized and read
+fully into memory for the provider call. New: the upload is parsed into a
+SpooledTemporaryFile (memory up to UPLOAD_SPOOL_BYTES) and that stream is
+handed to STTHandler.transcribe_audio, which passes it to the SDK as-is.
+The provider is a stub that consumes the body in 64 KB reads, like httpx,
+so the numbers isolate the server-side copies and disk hops.
+"""
+import argparse
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from flask import Request
+from werkzeug.datastructures import FileStorage
+from werkzeug.test import create_environ, encode_multipart
+from stt_handler import STTHandler
+
+
+class StubTranscriptions:
+    def create(self, file, **kwargs):
+        name, content = file
+        if isinstance(content, (bytes, bytearray)):
+            size = len(content)
+        else:
+            size = 0
+            for chunk in iter(lambda: content.read(64 * 1024), b""):
+                size += len(chunk)
+        return SimpleNamespace(text="What is the price of Hydra Glow Serum?", duration=size / 16000, language="en")
+
+
+STUB_CLIENT = SimpleNamespace(audio=SimpleNamespace(transcriptions=StubTranscriptions()))
+
+
+def make_request(request_class, body, boundary):
+    environ = create_environ(method="POST", input_stream=io.BytesIO(body), content_length=len(body),
+                             content_type=f"multipart/form-data; boundary={boundary}")
+    return request_class(environ)
+
+
+def legacy_upload(body, boundary, audio_dir):
+    """The pre-spooling handler: save to the public folder, reopen, read, delete."""
+    req = make_request(Request, body, boundary)
+    upload = req.files["audio"]
+    temp_path = os.path.join(audio_dir, f"temp_{uuid.uuid4()}.webm")
+    upload.save(temp_path)
+    try:
+        with open(temp_path, "rb") as file:
+            file.seek(0, 2)
+            file.tell()
+            file.seek(0)
+            STUB_CLIENT.audio.transcriptions.create(file=(os.path.basename(temp_path), file.read()),
+                                                   model="whisper-large-v3")
+    finally:
+        os.remove(temp_path)
+        upload.close()
+
+
+def spooled_upload(body, boundary, stt, request_class):
+    req = make_request(request_class, body, boundary)
+    upload = req.files["audio"]
+    try:
+        result = stt.transcribe_audio(upload.stream, model_service="groq", filename="clip.webm", preprocess=False)
+        if result.get("error"):
+            raise RuntimeError(result["error"])
+    finally:
+        upload.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-kb", type=int, nargs="+", default=[64, 1024, 8192, 20480])
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    from app import SpooledRequest  # imports the app (its handlers print key warnings)
+
+    stt = STTHandler()
+    stt.groq_client = STUB_CLIENT
+    stt.cassette = None
+    audio_dir = tempfile.mkdtemp(prefix="bench_audio_")
+    try:
+        print(f"{'Upload':>10}{'old ms':>10}{'new ms':>10}{'old MB/s':>11}{'new MB/s':>11}{'speedup':>9}")
+        for size_kb in args.sizes_kb:
+            payload = os.urandom(size_kb * 1024)
+            upload = FileStorage(io.BytesIO(payload), filename="clip.webm", content_type="audio/webm")
+            boundary, body = encode_multipart({"audio": upload, "model_service": "groq"})
+            timings = {}
+            for name, run in (("old", lambda: legacy_upload(body, boundary, audio_dir)),
+                              ("new", lambda: spooled_upload(body, boundary, stt, SpooledRequest))):
+                run()  # warm-up
+                best = float("inf")
+                for _ in range(args.iterations):
+                    start = time.perf_counter()
+                    run()
+                    best = min(best, time.perf_counter() - start)
+                timings[name] = best
+            mb = size_kb / 1024
+            print(f"{size_kb:>8}KB{timings['old'] * 1000:>10.2f}{timings['new'] * 1000:>10.2f}"
+                  f"{mb / timings['old']:>11.1f}{mb / timings['new']:>11.1f}{timings['old'] / timings['new']:>8.2f}x")
+        leftover = os.listdir(audio_dir)
+        print(f"\nFiles left in the audio folder: {len(leftover)}")
+    finally:
+        shutil.rmtree(audio_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Monte Carlo capacity and cost planner.
+
+Samples the empirical per-query distributions we already log (tokens and
+audio per query from simulation logs, provider latency from trace spans)
+and simulates trajectories of one or more days (e.g. a 30-day month) of
+diurnal Poisson arrivals at minute resolution. Everything is vectorized over
+trajectories in batches, so 10k simulated days take seconds. Output is
+percentile bands for daily cost, peak RPM / TPM and the worker count each
+provider needs (across all simulated days), and for the cost of the whole
+horizon (across trajectories).
+"""
+import glob
+import math
+import numpy as np
+from config import Config
+from cost_calculator import CostCalculator
+from log_aggregator import load_usage
+
+MINUTES_PER_DAY = 1440
+PERCENTILES = (5, 50, 95, 99)
+
+# Used when no trace spans have been recorded yet (seconds)
+DEFAULT_LATENCY = {"llm": 0.8, "stt": 0.5, "tts": 0.6}
+SPAN_STAGES = {"llm.call": "llm", "stt.provider_call": "stt", "tts.synthesize": "tts"}
+
+
+class Profile:
+    """Empirical per-query samples: one row per logged query, plus stage latencies."""
+
+    def __init__(self, input_tokens, output_tokens, audio_duration, tts_chars, latencies=None):
+        self.input_tokens = np.asarray(input_tokens, dtype=np.float64)
+        self.output_tokens = np.asarray(output_tokens, dtype=np.float64)
+        self.audio_duration = np.asarray(audio_duration, dtype=np.float64)
+        self.tts_chars = np.asarray(tts_chars, dtype=np.float64)
+        # {"llm": {service or None: array}, "stt": {...}, "tts": {...}}
+        self.latencies = latencies or {}
+        if not len(self.input_tokens):
+            raise ValueError("Profile needs at least one logged query")
+
+    @classmethod
+    def from_logs(cls, logs_glob="logs/*simulation_*.csv", trace_dir=None):
+        paths = sorted(glob.glob(logs_glob))
+        if not paths:
+            raise ValueError(f"No logs match {logs_glob}")
+        parts = [load_usage(p) for p in paths]
+        usage = {k: np.concatenate([u[k] for u in parts]) for k in parts[0]}
+
+        from tracing import load_spans
+        latencies = {}
+        for s in load_spans(trace_dir):
+            stage = SPAN_STAGES.get(s["name"])
+            if stage and not s["error"]:
+                seconds = (s["end"] - s["start"]) / 1e9
+                by_service = latencies.setdefault(stage, {})
+                by_service.setdefault(s["attributes"].get("service"), []).append(seconds)
+                if s["attributes"].get("service") is not None:
+                    by_service.setdefault(None, []).append(seconds)
+        latencies = {stage: {k: np.array(v) for k, v in d.items()} for stage, d in latencies.items()}
+        return cls(usage["input_tokens"], usage["output_tokens"], usage["audio_duration"],
+                   usage["tts_chars"], latencies)
+
+    @property
+    def voice_share(self):
+        return float(np.mean(self.audio_duration > 0))
+
+    def mean_latency(self, stage, service=None):
+        samples = self.latencies.get(stage, {})
+        values = samples.get(service)
+        if values is None:
+            values = samples.get(None)
+        return float(values.mean()) if values is not None and len(values) else DEFAULT_LATENCY[stage]
+
+    def service_time(self, provider, stt_service, tts_service):
+        """Mean seconds a worker spends on one query routed to `provider`."""
+        voice = self.mean_latency("stt", stt_service) + self.mean_latency("tts", tts_service)
+        return self.mean_latency("llm", provider) + self.voice_share * voice
+
+
+def diurnal_weights(peak_hour=14.0, amplitude=0.6):
+    """Share of daily traffic per minute: a cosine day curve peaking at `peak_hour`."""
+    minutes = np.arange(MINUTES_PER_DAY)
+    curve = 1 + amplitude * np.cos(2 * np.pi * (minutes / 60.0 - peak_hour) / 24.0)
+    return curve / curve.sum()
+
+
+def _segment_sums(rng, columns, counts, exact):
+    """
+    Sum `counts[i]` random draws from the empirical rows for every segment i.
+
+    exact: bootstrap every query (row indices shared across columns, so
+           tokens and cost stay correlated); otherwise a CLT normal
+           approximation with the columns' mean and variance.
+    """
+    flat = counts.ravel()
+    if exact:
+        idx = rng.integers(0, len(columns[0]), int(flat.sum()))
+        ends = np.cumsum(flat)
+        starts = ends - flat
+        sums = []
+        for col in columns:
+            cs = np.concatenate(([0.0], np.cumsum(col[idx])))
+            sums.append((cs[ends] - cs[starts]).reshape(counts.shape))
+        return sums
+    noise = rng.standard_normal(flat.shape)
+    return [np.maximum(0.0, flat * col.mean() + np.sqrt(flat * col.var()) * noise).reshape(counts.shape)
+            for col in columns]
+
+
+def _bands(values):
+    return {f"p{p}": float(v) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+
+
+def simulate(profile, daily_queries, trajectories=10000, mix=None, seed=None,
+             stt_service="groq", tts_service="edge-tts", day_cv=0.15, peak_hour=14.0,
+             amplitude=0.6, target_utilization=0.75, batch=1000, max_exact_draws=20_000_000, days=1):
+    """
+    Simulate `trajectories` runs of `days` consecutive days of traffic.
+
+    Args:
+        daily_queries: mean queries per day
+        days: horizon of each trajectory; its summed cost is reported as "horizon_cost"
+        mix: {provider: traffic share} (default: all traffic on Config's default provider, groq)
+        day_cv: day-to-day volume variation (coefficient of variation)
+        target_utilization: worker busy fraction to size for at the peak minute
+        max_exact_draws: per batch; above this, per-minute sums use the CLT approximation
+
+    Returns:
+        dict: {"trajectories", "days", "exact",
+               "providers": {p: {daily_cost, horizon_cost, peak_rpm, peak_tpm, workers}},
+               "total": {daily_cost, horizon_cost, peak_rpm, workers}} with percentile bands
+    """
+    if days < 1:
+        raise ValueError("days must be at least 1")
+    mix = mix or {"groq": 1.0}
+    providers = list(mix)
+    shares = np.array([mix[p] for p in providers], dtype=np.float64)
+    shares /= shares.sum()
+    rng = np.random.default_rng(seed)
+    calc = CostCalculator()
+
+    names, llm_costs = calc.reprice_batch(profile.input_tokens, profile.output_tokens)
+    voice = (profile.audio_duration / 60.0 * Config.STT_PRICING.get(stt_service, 0.0)
+             + profile.tts_chars * Config.TTS_PRICING.get(tts_service, 0.0))
+    tokens = profile.input_tokens + profile.output_tokens
+    per_query_cost = {p: llm_costs[:, names.index(p)] + voice for p in providers}
+    service_time = {p: profile.service_time(p, stt_service, tts_service) for p in providers}
+
+    rate = daily_queries * diurnal_weights(peak_hour, amplitude)
+    exact = batch * daily_queries <= max_exact_draws
+    shape = 1.0 / day_cv ** 2 if day_cv > 0 else None
+
+    out = {p: {"daily_cost": [], "horizon_cost": [], "peak_rpm": [], "peak_tpm": []} for p in providers}
+    total_rpm = []
+    for start in range(0, trajectories, batch):
+        n = min(batch, trajectories - start)
+        horizon_cost = {p: np.zeros(n) for p in providers}
+        # One day at a time, so memory stays at (n, minutes) however long the horizon
+        for _ in range(days):
+            volume = rng.gamma(shape, 1.0 / shape, n) if shape else np.ones(n)
+            arrivals = rng.poisson(volume[:, None] * rate[None, :])   # (n, minutes)
+            total_rpm.append(arrivals.max(axis=1))
+
+            # Split each minute's arrivals across providers (multinomial via sequential binomials)
+            remaining, left = arrivals, 1.0
+            for i, p in enumerate(providers):
+                if i == len(providers) - 1:
+                    counts = remaining
+                else:
+                    counts = rng.binomial(remaining, min(1.0, shares[i] / left))
+                    remaining, left = remaining - counts, left - shares[i]
+                tpm, cost = _segment_sums(rng, (tokens, per_query_cost[p]), counts, exact)
+                out[p]["peak_rpm"].append(counts.max(axis=1))
+                out[p]["peak_tpm"].append(tpm.max(axis=1))
+                out[p]["daily_cost"].append(cost.sum(axis=1))
+                horizon_cost[p] += out[p]["daily_cost"][-1]
+        for p in providers:
+            out[p]["horizon_cost"].append(horizon_cost[p])
+
+    result = {"trajectories": trajectories, "days": days, "daily_queries": daily_queries, "exact": exact,
+              "voice_share": profile.voice_share, "providers": {}}
+    total_cost = 0.0
+    total_horizon_cost = 0.0
+    total_workers = 0.0
+    for p in providers:
+        daily_cost = np.concatenate(out[p]["daily_cost"])
+        horizon_cost = np.concatenate(out[p]["horizon_cost"])
+        peak_rpm = np.concatenate(out[p]["peak_rpm"])
+        # Little's law at the busiest minute, with headroom for queueing
+        workers = np.ceil(peak_rpm / 60.0 * service_time[p] / target_utilization)
+        result["providers"][p] = {
+            "share": float(shares[providers.index(p)]),
+            "service_time": service_time[p],
+            "daily_cost": _bands(daily_cost),
+            "horizon_cost": _bands(horizon_cost),
+            "peak_rpm": _bands(peak_rpm),
+            "peak_tpm": _bands(np.concatenate(out[p]["peak_tpm"])),
+            "workers": _bands(workers),
+        }
+        total_cost = total_cost + daily_cost
+        total_horizon_cost = total_horizon_cost + horizon_cost
+        total_workers = total_workers + workers
+    result["total"] = {
+        "daily_cost": _bands(total_cost),
+        "horizon_cost": _bands(total_horizon_cost),
+        "peak_rpm": _bands(np.concatenate(total_rpm)),
+        "workers": _bands(total_workers),
+    }
+    return result
+
+
+def print_plan(result):
+    bands = [f"p{p}" for p in PERCENTILES]
+    header = f"  {'':<14}" + "".join(f"{b:>14}" for b in bands)
+    mode = "bootstrap" if result["exact"] else "CLT approximation"
+    days = result.get("days", 1)
+    runs = "days" if days == 1 else f"{days}-day periods"
+    print(f"{result['trajectories']:,} simulated {runs}, ~{result['daily_queries']:,} queries/day "
+          f"({result['voice_share'] * 100:.0f}% voice, {mode})")
+    # Label, result key, format; the horizon total only differs from daily_cost over several days
+    cost_rows = [("daily_cost", "daily_cost", "{:>14.4f}")]
+    if days > 1:
+        cost_rows.append((f"{days}-day cost", "horizon_cost", "{:>14.4f}"))
+    for p, r in result["providers"].items():
+        print(f"\n{p} ({r['share'] * 100:.0f}% of traffic, {r['service_time']:.2f}s per query)")
+        print(header)
+        for label, key, fmt in cost_rows + [("peak_rpm", "peak_rpm", "{:>14.0f}"),
+                                            ("peak_tpm", "peak_tpm", "{:>14.0f}"),
+                                            ("workers", "workers", "{:>14.0f}")]:
+            print(f"  {label:<14}" + "".join(fmt.format(r[key][b]) for b in bands))
+    print("\nTotal")
+    print(header)
+    for label, key, fmt in cost_rows + [("peak_rpm", "peak_rpm", "{:>14.0f}"), ("workers", "workers", "{:>14.0f}")]:
+        print(f"  {label:<14}" + "".join(fmt.format(result["total"][key][b]) for b in bands))
+
+
+def parse_mix(text):
+    """'groq=0.7,openai=0.3' -> {"groq": 0.7, "openai": 0.3}"""
+    mix = {}
+    for part in filter(None, (text or "").split(",")):
+        name, _, share = part.partition("=")
+        mix[name.strip()] = float(share or 1)
+    unknown = [p for p in mix if p not in Config.PRICING]
+    if unknown:
+        raise ValueError(f"Unknown provider(s): {', '.join(unknown)}")
+    return mix or None
+
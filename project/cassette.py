@@ -0,0 +1,161 @@
+"""
+Record / replay of provider calls (LLM, STT, TTS).
+
+A cassette is a directory with one JSON line per recorded interaction
+(request fingerprint, response, usage, latency) plus content-addressed
+blobs for audio. Modes (Config.CASSETTE_MODE):
+- "record": always call the provider and append the interaction
+- "replay": serve recorded responses only; a miss raises CassetteMissError
+- "auto":   replay hits, record misses
+Replays can re-impose the recorded latency (Config.CASSETTE_LATENCY_SCALE,
+1.0 = as recorded, 0 = instant) so load tests keep realistic timing.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from config import Config
+
+MODES = ("record", "replay", "auto")
+INTERACTIONS_FILE = "interactions.jsonl"
+
+
+class CassetteMissError(LookupError):
+    pass
+
+
+def _canonical(request):
+    """Request dict with bytes replaced by their hash, for fingerprints and storage."""
+    out = {}
+    for key, value in sorted(request.items()):
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            value = {"sha256": hashlib.sha256(value).hexdigest(), "bytes": len(value)}
+        out[key] = value
+    return out
+
+
+def fingerprint(kind, request):
+    payload = json.dumps({"kind": kind, "request": _canonical(request)}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    def __init__(self, path, mode="replay", latency_scale=0.0):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode '{mode}' (expected one of {', '.join(MODES)})")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self._interactions = {}   # fingerprint -> [interaction, ...] in recording order
+        self._cursor = {}         # fingerprint -> next replay index
+        self._load()
+
+    def _load(self):
+        try:
+            with open(os.path.join(self.path, INTERACTIONS_FILE), "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        interaction = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn write at the end of a killed recording
+                    self._interactions.setdefault(interaction["fingerprint"], []).append(interaction)
+        except FileNotFoundError:
+            pass
+
+    def __len__(self):
+        return sum(len(v) for v in self._interactions.values())
+
+    def services(self, kind):
+        """Services with recorded `kind` interactions, in the order they were first recorded."""
+        with self._lock:
+            interactions = [i for recorded in self._interactions.values() for i in recorded if i["kind"] == kind]
+        interactions.sort(key=lambda i: i.get("recorded_at", 0))
+        return list(dict.fromkeys(i["request"].get("service") for i in interactions if i["request"].get("service")))
+
+    def _next(self, key):
+        """Recorded interaction for a fingerprint; repeated requests cycle through recordings in order."""
+        with self._lock:
+            recorded = self._interactions.get(key)
+            if not recorded:
+                return None
+            i = self._cursor.get(key, 0)
+            self._cursor[key] = i + 1
+            return recorded[i % len(recorded)]
+
+    def _blob_path(self, digest):
+        return os.path.join(self.path, "blobs", f"{digest}.bin")
+
+    def _record(self, kind, key, request, response, blob, latency, usage_keys):
+        interaction = {
+            "fingerprint": key,
+            "kind": kind,
+            "request": _canonical(request),
+            "response": response,
+            "usage": {k: response[k] for k in usage_keys if k in response},
+            "latency": round(latency, 6),
+            "recorded_at": time.time(),
+        }
+        if blob is not None:
+            digest = hashlib.sha256(blob).hexdigest()
+            interaction["blob"] = digest
+            os.makedirs(os.path.join(self.path, "blobs"), exist_ok=True)
+            if not os.path.exists(self._blob_path(digest)):
+                tmp = f"{self._blob_path(digest)}.{threading.get_ident()}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(blob)
+                os.replace(tmp, self._blob_path(digest))
+        line = json.dumps(interaction, ensure_ascii=False) + "\n"
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            with open(os.path.join(self.path, INTERACTIONS_FILE), "a", encoding="utf-8") as f:
+                f.write(line)
+            self._interactions.setdefault(key, []).append(interaction)
+
+    def replay_or_record(self, kind, request, live, usage_keys=()):
+        """
+        Serve `request` from the cassette or from the provider.
+
+        Args:
+            kind: "llm", "stt" or "tts"
+            request: JSON-able dict identifying the call (bytes values are hashed)
+            live: callable making the real call; returns (response dict, blob bytes or None)
+            usage_keys: response keys stored as the interaction's usage
+
+        Returns:
+            (response dict, blob bytes or None)
+        """
+        key = fingerprint(kind, request)
+        if self.mode in ("replay", "auto"):
+            interaction = self._next(key)
+            if interaction is not None:
+                if self.latency_scale > 0:
+                    time.sleep(interaction["latency"] * self.latency_scale)
+                blob = None
+                if "blob" in interaction:
+                    with open(self._blob_path(interaction["blob"]), "rb") as f:
+                        blob = f.read()
+                return dict(interaction["response"]), blob
+            if self.mode == "replay":
+                raise CassetteMissError(f"No recorded {kind} interaction for this request ({key[:12]})")
+
+        start = time.perf_counter()
+        response, blob = live()
+        self._record(kind, key, request, response, blob, time.perf_counter() - start, usage_keys)
+        return response, blob
+
+
+_cassette = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette():
+    """Shared cassette from Config (None when CASSETTE_MODE is unset)."""
+    global _cassette
+    if not Config.CASSETTE_MODE:
+        return None
+    with _cassette_lock:
+        if _cassette is None:
+            _cassette = Cassette(Config.CASSETTE_DIR, Config.CASSETTE_MODE, Config.CASSETTE_LATENCY_SCALE)
+    return _cassette
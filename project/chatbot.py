@@ -2,12 +2,17 @@ import json
 import time
 import re
 import os
+import threading
 from collections import deque
 from typing import Dict, Any, Tuple
 from config import Config
 from api_handler import APIHandler
 from cost_calculator import CostCalculator
 from token_tracker import TokenTracker
+from metrics import LLM_LATENCY, LLM_REQUESTS, LLM_TOKENS
+from tracing import span
+from stats_stream import broadcaster
+from sentences import SentenceSplitter
 
 class Session:
     def __init__(self, customer_id):
@@ -73,6 +78,7 @@ class Chatbot:
 
         self.system_prompt = Config.SYSTEM_PROMPT.format(product_data=product_text)
         self.sessions: Dict[str, Session] = {}
+        self._sessions_lock = threading.Lock()  # sessions are shared by request / simulation threads
         
         # Session cleanup timer (24 hours)
         self.last_cleanup = time.time()
@@ -133,14 +139,20 @@ class Chatbot:
         Returns:
             Session: The customer's session object.
         """
-        # Clean up old sessions periodically
-        self._cleanup_old_sessions()
-        
-        if customer_id not in self.sessions:
-            self.sessions[customer_id] = Session(customer_id)
-        return self.sessions[customer_id]
+        with self._sessions_lock:
+            # Clean up old sessions periodically
+            self._cleanup_old_sessions()
+
+            if customer_id not in self.sessions:
+                self.sessions[customer_id] = Session(customer_id)
+            return self.sessions[customer_id]
 
 
+    def end_session(self, customer_id: str) -> None:
+        """Drop a customer's session (history and logs) once they are done."""
+        with self._sessions_lock:
+            self.sessions.pop(customer_id, None)
+
     def _limit_sentences(self, text: str, max_sentences: int = 4, language: str | None = None) -> str:
         """Trim response to a maximum number of sentences without cutting mid-sentence."""
         if not text:
@@ -160,20 +172,8 @@ class Chatbot:
             final_text = final_text + ("।" if language == "bn" else ".")
         return final_text
 
-    def process_query(self, customer_id: str, query: str, model_service: str = "groq", ui_language: str | None = None) -> Tuple[str, float]:
-        """
-        Process a user query, generate a response, and track usage.
-        
-        Args:
-            customer_id (str): The customer's ID.
-            query (str): The text query from the customer.
-            model_service (str, optional): The LLM service to use. Defaults to "groq".
-            
-        Returns:
-            Tuple[str, float]: The response text and the calculated cost.
-        """
-        session = self.get_session(customer_id)
-        
+    def _build_prompt(self, session: Session, query: str, ui_language: str | None = None) -> Tuple[str, str]:
+        """Conversation prompt (recent history + query) and the language-adjusted system prompt."""
         # Build context from history
         context_str = ""
         for msg in session.history:
@@ -181,8 +181,6 @@ class Chatbot:
         
         full_prompt = f"{context_str}User: {query}"
         
-        # Call API
-        start_time = time.time()
         system_prompt = self.system_prompt
         if ui_language == "bn":
             system_prompt = system_prompt + (
@@ -198,30 +196,121 @@ class Chatbot:
                     "\nIMPORTANT: The user's input may be Bangla. "
                     "Translate it to English internally and respond in English.\n"
                 )
+        return full_prompt, system_prompt
 
-        response_text, input_tok, output_tok, error = self.api_handler.generate_response(
-            full_prompt,
-            model_service=model_service,
-            system_prompt=system_prompt
-        )
+    def process_query(self, customer_id: str, query: str, model_service: str = "groq", ui_language: str | None = None) -> Tuple[str, float]:
+        """
+        Process a user query, generate a response, and track usage.
+        
+        Args:
+            customer_id (str): The customer's ID.
+            query (str): The text query from the customer.
+            model_service (str, optional): The LLM service to use. Defaults to "groq".
+            
+        Returns:
+            Tuple[str, float]: The response text and the calculated cost.
+        """
+        session = self.get_session(customer_id)
+        
+        with span("chat.prompt_build", history_messages=len(session.history)):
+            full_prompt, system_prompt = self._build_prompt(session, query, ui_language)
+
+        # Call API
+        start_time = time.time()
+        with span("llm.call", service=model_service) as llm_span:
+            response_text, input_tok, output_tok, error = self.api_handler.generate_response(
+                full_prompt,
+                model_service=model_service,
+                system_prompt=system_prompt
+            )
+            llm_span.set_attribute("input_tokens", input_tok)
+            llm_span.set_attribute("output_tokens", output_tok)
+            if error:
+                llm_span.record_error(error)
         response_time = time.time() - start_time
+        LLM_LATENCY.labels(model_service).observe(response_time)
 
         if error:
+            LLM_REQUESTS.labels(model_service, "error").inc()
             return f"Error: {error}", 0.0
 
         max_sentences = 2 if ui_language == "bn" else 4
-        response_text = self._limit_sentences(response_text, max_sentences=max_sentences, language=ui_language)
+        with span("chat.trim_sentences"):
+            response_text = self._limit_sentences(response_text, max_sentences=max_sentences, language=ui_language)
+
+        cost = self._record_query(session, query, response_text, model_service, input_tok, output_tok, response_time)
+        return response_text, cost
+
+    def process_query_stream(self, customer_id: str, query: str, model_service: str = "groq",
+                             ui_language: str | None = None, result: Dict[str, Any] | None = None):
+        """
+        Like process_query, but yields the response sentence by sentence while
+        the LLM is still writing it (same 2 / 4 sentence limit; the stream is
+        closed once it's reached). Cost, tokens and history are recorded when
+        the generator ends or is closed, and `result` receives {"response",
+        "cost", "error"}.
+        """
+        result = {} if result is None else result
+        session = self.get_session(customer_id)
+
+        with span("chat.prompt_build", history_messages=len(session.history)):
+            full_prompt, system_prompt = self._build_prompt(session, query, ui_language)
+
+        max_sentences = 2 if ui_language == "bn" else 4
+        splitter = SentenceSplitter()
+        sentences = []
+        usage = {}
+        start_time = time.time()
+        stream = self.api_handler.generate_response_stream(full_prompt, model_service=model_service,
+                                                           system_prompt=system_prompt, usage=usage)
+        try:
+            for delta in stream:
+                for sentence in splitter.feed(delta):
+                    sentences.append(sentence)
+                    yield sentence
+                    if len(sentences) >= max_sentences:
+                        break
+                if len(sentences) >= max_sentences:
+                    break
+            else:
+                for sentence in splitter.flush()[:max_sentences - len(sentences)]:
+                    sentences.append(sentence)
+                    yield sentence
+        finally:
+            # Also runs when the client went away mid-answer: those tokens were billed
+            stream.close()
+            response_time = time.time() - start_time
+            LLM_LATENCY.labels(model_service).observe(response_time)
+            response_text = " ".join(sentences)
+            if usage.get("error") and not usage.get("output_tokens"):
+                LLM_REQUESTS.labels(model_service, "error").inc()
+                result.update(response=f"Error: {usage['error']}", cost=0.0, error=usage["error"])
+            else:
+                # A stream that failed midway still billed what it produced (usage is estimated)
+                cost = self._record_query(session, query, response_text, model_service,
+                                          usage.get("input_tokens", 0), usage.get("output_tokens", 0), response_time,
+                                          status="error" if usage.get("error") else "success")
+                result.update(response=response_text, cost=cost, error=usage.get("error"))
+
+    def _record_query(self, session: Session, query: str, response_text: str, model_service: str,
+                      input_tok: int, output_tok: int, response_time: float, status: str = "success") -> float:
+        """Metrics, cost, tracker / dashboard logging and session history for one answered query."""
+        LLM_REQUESTS.labels(model_service, status).inc()
+        LLM_TOKENS.labels(model_service, "input").inc(input_tok)
+        LLM_TOKENS.labels(model_service, "output").inc(output_tok)
 
         # Calculate cost
         cost = self.cost_calculator.calculate_cost(model_service, input_tok, output_tok)
         
         # Log to tracker for teacher verification
         self.token_tracker.log_query(model_service, input_tok, output_tok, cost, response_time)
+        # Push the delta to live admin dashboards
+        broadcaster.publish_query(model_service, input_tok, output_tok, cost, response_time)
         
         # Update session
         session.add_interaction(query, response_text, cost, input_tok, output_tok)
         
-        return response_text, cost
+        return cost
 
     def get_session_stats(self, customer_id: str) -> Dict[str, Any]:
         """
@@ -16,8 +16,71 @@ class Config:
     OPENAI_MODEL_NAME = "gpt-4o-mini"
     GEMINI_MODEL_NAME = "gemini-2.0-flash"
 
+    # Optional API base URLs, e.g. a local fake provider (python fake_provider.py):
+    #   GROQ_BASE_URL=http://127.0.0.1:8090  OPENAI_BASE_URL=http://127.0.0.1:8090/v1
+    GROQ_BASE_URL = os.getenv("GROQ_BASE_URL") or None
+    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+
     MAX_TOKENS = 220 # allow more room to avoid mid-sentence cutoffs
 
+    # Admin API token (required by /api/admin/*); the admin endpoints are disabled when unset
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN") or None
+
+    # Live stats stream (/api/stats/stream)
+    STATS_STREAM_BUFFER = int(os.getenv("STATS_STREAM_BUFFER", 256))  # events kept per client
+    STATS_STREAM_MAX_CLIENTS = int(os.getenv("STATS_STREAM_MAX_CLIENTS", 100))
+
+    # Background report generation
+    REPORT_CACHE_DIR = os.getenv("REPORT_CACHE_DIR", "reports")
+    REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", 2))
+    RUN_SUMMARY_PATH = os.getenv("RUN_SUMMARY_PATH", os.path.join(REPORT_CACHE_DIR, "run_summaries.json"))
+
+    # Tracing (OTLP-JSON lines, size-rotated)
+    TRACING_ENABLED = os.getenv("TRACING_ENABLED", "1") != "0"
+    TRACE_DIR = os.getenv("TRACE_DIR", os.path.join("logs", "traces"))
+    TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", 5 * 1024 * 1024))
+    TRACE_BACKUP_COUNT = int(os.getenv("TRACE_BACKUP_COUNT", 5))
+
+    # Provider record / replay (cassette.py): "", "record", "replay" or "auto"
+    CASSETTE_MODE = os.getenv("CASSETTE_MODE", "")
+    CASSETTE_DIR = os.getenv("CASSETTE_DIR", os.path.join("cassettes", "default"))
+    CASSETTE_LATENCY_SCALE = float(os.getenv("CASSETTE_LATENCY_SCALE", 0))  # 1.0 = replay recorded latency
+
+    # Audio uploads stay in memory up to this size, then spill to a temp file in the system temp dir
+    UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", 8 * 1024 * 1024))
+    # STT preprocessing (audio_preprocess.py): trim silence, 16 kHz mono, compact re-encode
+    STT_PREPROCESS = os.getenv("STT_PREPROCESS", "1") != "0"
+    STT_PREPROCESS_WORKERS = int(os.getenv("STT_PREPROCESS_WORKERS", 2))
+    STT_PREPROCESS_TIMEOUT = float(os.getenv("STT_PREPROCESS_TIMEOUT", 10))  # seconds, then send the original
+    # STT admission by probed audio duration (audio_probe.py)
+    STT_MAX_SECONDS = float(os.getenv("STT_MAX_SECONDS", 1800))        # longer recordings are rejected (413)
+    STT_LONG_SECONDS = float(os.getenv("STT_LONG_SECONDS", 120))       # "long" recordings share a few slots
+    STT_LONG_CONCURRENCY = int(os.getenv("STT_LONG_CONCURRENCY", 2))
+    STT_QUEUE_TIMEOUT = float(os.getenv("STT_QUEUE_TIMEOUT", 30))      # wait for a slot, then 503
+    # STT latency budget: start the other Whisper provider when the first hasn't answered in time
+    STT_RACE_DEADLINE = float(os.getenv("STT_RACE_DEADLINE", 3.0))  # seconds; 0 disables racing
+    STT_RACE_WORKERS = int(os.getenv("STT_RACE_WORKERS", 8))  # concurrent hedges; when all busy, don't hedge
+    # STT result cache (stt_cache.py): retried / duplicate uploads skip the provider
+    STT_CACHE = os.getenv("STT_CACHE", "1") != "0"
+    STT_CACHE_DIR = os.getenv("STT_CACHE_DIR", os.path.join("cache", "stt"))  # "" = memory only
+    STT_CACHE_SIZE = int(os.getenv("STT_CACHE_SIZE", 1000))                   # in-memory LRU entries
+    STT_CACHE_DISK_ENTRIES = int(os.getenv("STT_CACHE_DISK_ENTRIES", 20000))
+    STT_CACHE_TTL = float(os.getenv("STT_CACHE_TTL", 7 * 24 * 3600))          # seconds
+    # Streaming transcription (WebSocket /api/voice/stream)
+    STT_STREAM_WORKERS = int(os.getenv("STT_STREAM_WORKERS", 4))               # parallel segment transcriptions
+    STT_STREAM_VAD_DB = float(os.getenv("STT_STREAM_VAD_DB", -45))             # speech threshold, dBFS
+    STT_STREAM_HANGOVER_MS = int(os.getenv("STT_STREAM_HANGOVER_MS", 300))     # silence that ends a segment
+    STT_STREAM_MAX_SEGMENT = float(os.getenv("STT_STREAM_MAX_SEGMENT", 15))    # seconds before a forced cut
+    STT_STREAM_PARTIAL_INTERVAL = float(os.getenv("STT_STREAM_PARTIAL_INTERVAL", 0))  # >0 enables (billed) partials
+    STT_STREAM_PARTIAL_WINDOW = float(os.getenv("STT_STREAM_PARTIAL_WINDOW", 3))  # seconds of recent audio per partial
+    STT_STREAM_IDLE_TIMEOUT = float(os.getenv("STT_STREAM_IDLE_TIMEOUT", 30))
+    # TTS audio cache (tts_cache.py), stored under the public audio folder
+    TTS_CACHE = os.getenv("TTS_CACHE", "1") != "0"
+    TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", 200 * 1024 * 1024))
+    TTS_PREWARM = os.getenv("TTS_PREWARM", "1") != "0"  # synthesize tts_cache.PREWARM_PHRASES on each process's first request
+    # Sentence-pipelined TTS (tts_pipeline.py, /api/voice/synthesize/stream)
+    TTS_PIPELINE_WORKERS = int(os.getenv("TTS_PIPELINE_WORKERS", 4))  # sentences synthesized in parallel (all streams)
+    TTS_PIPELINE_AHEAD = int(os.getenv("TTS_PIPELINE_AHEAD", 3))      # per stream, ahead of the one being sent
     # Pricing (per 1M tokens)
     # VERIFIED: January 2025 (Official Sources)
     PRICING = {
@@ -41,6 +104,17 @@ class Config:
         }
     }
 
+    # Voice pricing for what-if comparisons (CostCalculator.compare_pricing)
+    STT_PRICING = {
+        "groq": 0.111 / 60,     # Whisper Large V3, per audio minute
+        "openai": 0.006         # whisper-1, per audio minute
+    }
+    TTS_PRICING = {
+        "edge-tts": 0.0,        # per character
+        "gtts": 0.0,
+        "openai": 0.000015      # tts-1
+    }
+
     SYSTEM_PROMPT = """You are a professional Customer Service Officer for Lira Cosmetics Ltd.
 Your goal is to answer customer queries about our products helpfully and accurately.
 You have access to the product catalog below.
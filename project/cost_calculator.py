@@ -1,3 +1,4 @@
+import numpy as np
 from config import Config
 
 class CostCalculator:
@@ -52,16 +53,107 @@ class CostCalculator:
             "daily_total_cost": round(daily_total_cost, 6)
         }
 
-    def calculate_voice_costs(self, audio_duration_seconds, text_char_count):
-        """Calculate STT and TTS costs"""
+    def calculate_voice_costs(self, audio_duration_seconds, text_char_count, stt_service=None):
+        """Calculate STT and TTS costs (STT at Config.STT_PRICING[stt_service] when given)"""
         # STT Cost
         duration_minutes = audio_duration_seconds / 60.0
-        stt_cost = duration_minutes * self.stt_price_per_minute
+        rate = Config.STT_PRICING.get(stt_service, self.stt_price_per_minute) if stt_service else self.stt_price_per_minute
+        stt_cost = duration_minutes * rate
         
         # TTS Cost
         tts_cost = text_char_count * self.tts_price_per_char
         
         return round(stt_cost, 8), round(tts_cost, 8)
 
+    def calculate_preprocessing_savings(self, preprocessing, stt_service=None):
+        """
+        Bytes, billed seconds and STT cost saved by audio preprocessing.
+
+        Args:
+            preprocessing: stats from audio_preprocess.preprocess (original/sent
+                bytes, original/billed seconds)
+        """
+        original_seconds = preprocessing.get("original_seconds") or 0
+        billed_seconds = preprocessing.get("billed_seconds") or original_seconds
+        original_cost, _ = self.calculate_voice_costs(original_seconds, 0, stt_service)
+        billed_cost, _ = self.calculate_voice_costs(billed_seconds, 0, stt_service)
+        return {
+            "bytes_saved": preprocessing.get("original_bytes", 0) - preprocessing.get("sent_bytes", 0),
+            "seconds_saved": round(original_seconds - billed_seconds, 3),
+            "stt_cost_saved": round(original_cost - billed_cost, 8),
+        }
+
+    def reprice_batch(self, input_tokens, output_tokens, pricing=None):
+        """
+        Vectorized what-if LLM pricing: cost of every row under every pricing table.
+
+        Args:
+            input_tokens, output_tokens: 1-D arrays (one entry per query)
+            pricing: {name: {"input": $/1M, "output": $/1M}} (default: Config.PRICING)
+
+        Returns:
+            (names, costs) where costs has shape (rows, len(names))
+        """
+        pricing = pricing or self.pricing
+        names = list(pricing)
+        rates = np.array([[pricing[n]['input'] for n in names],
+                          [pricing[n]['output'] for n in names]], dtype=np.float64) / 1_000_000
+        tokens = np.column_stack((np.asarray(input_tokens, dtype=np.float64),
+                                  np.asarray(output_tokens, dtype=np.float64)))
+        return names, tokens @ rates
+
+    def reprice_voice_batch(self, audio_seconds, tts_chars, stt_rates=None, tts_rates=None):
+        """
+        Vectorized STT/TTS pricing.
+
+        Args:
+            stt_rates: {service: $/minute} (default: Config.STT_PRICING)
+            tts_rates: {service: $/character} (default: Config.TTS_PRICING)
+
+        Returns:
+            {"stt": (names, costs), "tts": (names, costs)}, costs shaped (rows, services)
+        """
+        stt_rates = stt_rates or Config.STT_PRICING
+        tts_rates = tts_rates or Config.TTS_PRICING
+        minutes = np.asarray(audio_seconds, dtype=np.float64)[:, None] / 60.0
+        chars = np.asarray(tts_chars, dtype=np.float64)[:, None]
+        return {
+            "stt": (list(stt_rates), minutes * np.array(list(stt_rates.values()), dtype=np.float64)),
+            "tts": (list(tts_rates), chars * np.array(list(tts_rates.values()), dtype=np.float64)),
+        }
+
+    def compare_pricing(self, usage, pricing=None, stt_rates=None, tts_rates=None):
+        """
+        Re-price logged usage under alternative pricing tables.
+
+        Args:
+            usage: dict of arrays: input_tokens, output_tokens and optionally
+                   audio_duration (seconds) and tts_chars
+
+        Returns:
+            {"rows": n, "llm"|"stt"|"tts": {name: {total, per_query, p95}}}
+        """
+        rows = len(usage['input_tokens'])
+        rank = int(round(0.95 * (rows - 1))) if rows else 0
+
+        def p95(values):
+            # Nearest-rank percentile via partition (much cheaper than a sort / np.percentile)
+            return np.partition(values, rank, axis=0)[rank] if rows else np.zeros(values.shape[1:])
+
+        def summarize(names, totals, p95s):
+            return {n: {"total": float(totals[i]), "per_query": float(totals[i] / rows) if rows else 0.0,
+                        "p95": float(p95s[i])} for i, n in enumerate(names)}
+
+        names, costs = self.reprice_batch(usage['input_tokens'], usage['output_tokens'], pricing)
+        result = {"rows": rows, "llm": summarize(names, costs.sum(axis=0), p95(costs))}
+
+        # Voice cost is one usage column times a rate, so totals and percentiles scale with the rate
+        for key, column, rates, scale in (("stt", 'audio_duration', stt_rates or Config.STT_PRICING, 1 / 60.0),
+                                          ("tts", 'tts_chars', tts_rates or Config.TTS_PRICING, 1.0)):
+            values = np.asarray(usage.get(column, np.zeros(rows)), dtype=np.float64) * scale
+            r = np.array(list(rates.values()), dtype=np.float64)
+            result[key] = summarize(list(rates), values.sum() * r, float(p95(values)) * r if rows else r * 0)
+        return result
+
     def format_cost(self, cost):
         return f"${cost:.6f}"
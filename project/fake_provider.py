@@ -0,0 +1,268 @@
+"""
+Local fake of the OpenAI-compatible provider APIs (OpenAI and Groq).
+
+Serves chat completions (plain and streaming, with usage), audio
+transcriptions / translations and speech, with configurable latency
+distributions and injected 429s, so load tests and benchmarks can run
+without API keys or network. Point the app at it with:
+
+    python fake_provider.py --port 8090
+    GROQ_API_KEY=fake OPENAI_API_KEY=fake \\
+    GROQ_BASE_URL=http://127.0.0.1:8090 OPENAI_BASE_URL=http://127.0.0.1:8090/v1 python app.py
+
+Groq's SDK prefixes paths with /openai/v1, OpenAI's with /v1; both are served.
+"""
+import io
+import json
+import math
+import random
+import threading
+import time
+import uuid
+import wave
+from flask import Flask, Response, jsonify, request
+from audio_probe import probe_duration
+
+REPLY_SENTENCES = [
+    "Hydra Glow Serum is $45 and suits dry and normal skin.",
+    "It contains hyaluronic acid and niacinamide.",
+    "Apply two drops morning and evening after cleansing.",
+    "It is fragrance-free and suitable for sensitive skin.",
+    "Our Volumizing Mascara is waterproof and lasts all day.",
+    "Would you like a recommendation for your skin type?",
+]
+TRANSCRIPT = "What is the price of Hydra Glow Serum?"
+
+# One silent MPEG-1 Layer III frame (128 kbps, 44.1 kHz): 417 bytes, 1152 samples
+MP3_FRAME = b"\xff\xfb\x90\x64" + b"\x00" * 413
+MP3_FRAME_SECONDS = 1152 / 44100
+
+
+class Latency:
+    """Lognormal latency with a given median (ms) and shape; sigma=0 means fixed."""
+
+    def __init__(self, median_ms=0.0, sigma=0.0):
+        self.median_ms = median_ms
+        self.sigma = sigma
+
+    @classmethod
+    def parse(cls, text):
+        """'300' or '300,0.5' -> Latency(300, 0.5)"""
+        median, _, sigma = str(text).partition(",")
+        return cls(float(median), float(sigma or 0))
+
+    def sample(self, rng):
+        if self.median_ms <= 0:
+            return 0.0
+        return self.median_ms * math.exp(rng.gauss(0, self.sigma)) / 1000 if self.sigma else self.median_ms / 1000
+
+
+class FakeProviderConfig:
+    def __init__(self, chat_latency=None, token_latency=None, transcription_latency=None,
+                 speech_latency=None, rate_limit_rate=0.0, retry_after=1.0, reply_sentences=2,
+                 seed=None):
+        self.chat_latency = chat_latency or Latency(300, 0.4)             # time to first token
+        self.token_latency = token_latency or Latency(5)                  # per streamed token
+        self.transcription_latency = transcription_latency or Latency(250, 0.3)
+        self.speech_latency = speech_latency or Latency(200, 0.3)
+        self.rate_limit_rate = rate_limit_rate                            # share of requests answered 429
+        self.retry_after = retry_after
+        self.reply_sentences = reply_sentences
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {}
+
+    def record(self, endpoint, outcome):
+        with self._lock:
+            counts = self.stats.setdefault(endpoint, {})
+            counts[outcome] = counts.get(outcome, 0) + 1
+
+    def sample(self, latency):
+        with self._lock:
+            return latency.sample(self.rng)
+
+    def rate_limited(self):
+        with self._lock:
+            return self.rate_limit_rate > 0 and self.rng.random() < self.rate_limit_rate
+
+    def reply(self):
+        with self._lock:
+            start = self.rng.randrange(len(REPLY_SENTENCES))
+        return " ".join(REPLY_SENTENCES[(start + i) % len(REPLY_SENTENCES)] for i in range(self.reply_sentences))
+
+
+def _count_tokens(text):
+    # ~4 characters per token, like the provider tokenizers on English text
+    return max(1, math.ceil(len(text) / 4))
+
+
+def _audio_duration(data):
+    """Seconds of audio from its container headers, else ~16 KB/s (same fallback as STTHandler)."""
+    seconds = probe_duration(data)
+    return seconds if seconds is not None else len(data) / 16000
+
+
+def _speech_wav(seconds, sample_rate=24000):
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(b"\x00\x00" * int(seconds * sample_rate))
+    return buf.getvalue()
+
+
+def create_app(config=None):
+    config = config or FakeProviderConfig()
+    app = Flask(__name__)
+    app.config["FAKE_PROVIDER"] = config
+
+    def rate_limit_response(endpoint):
+        config.record(endpoint, "429")
+        response = jsonify({"error": {
+            "message": "Rate limit reached (injected by fake provider). Please try again later.",
+            "type": "rate_limit_error" if endpoint != "chat" else "tokens",
+            "code": "rate_limit_exceeded",
+        }})
+        response.status_code = 429
+        response.headers["Retry-After"] = str(config.retry_after)
+        return response
+
+    @app.route("/v1/chat/completions", methods=["POST"])
+    @app.route("/openai/v1/chat/completions", methods=["POST"])
+    def chat_completions():
+        if config.rate_limited():
+            return rate_limit_response("chat")
+        body = request.get_json(silent=True) or {}
+        model = body.get("model", "fake-model")
+        prompt = " ".join(str(m.get("content", "")) for m in body.get("messages", []))
+        text = config.reply()
+        max_tokens = body.get("max_tokens") or body.get("max_completion_tokens")
+        if max_tokens:
+            text = text[:int(max_tokens) * 4]
+        usage = {
+            "prompt_tokens": _count_tokens(prompt),
+            "completion_tokens": _count_tokens(text),
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        time.sleep(config.sample(config.chat_latency))
+
+        if not body.get("stream"):
+            config.record("chat", "200")
+            return jsonify({
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+
+        include_usage = (body.get("stream_options") or {}).get("include_usage")
+        groq_style = request.path.startswith("/openai/")
+
+        def chunk(delta, finish_reason=None, extra=None):
+            data = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+            data.update(extra or {})
+            return f"data: {json.dumps(data)}\n\n"
+
+        def generate():
+            yield chunk({"role": "assistant", "content": ""})
+            words = text.split(" ")
+            for i, word in enumerate(words):
+                time.sleep(config.sample(config.token_latency))
+                yield chunk({"content": word if i == 0 else " " + word})
+            yield chunk({}, "stop", {"x_groq": {"usage": usage}} if groq_style else None)
+            if include_usage:
+                yield f"data: {json.dumps({'id': completion_id, 'object': 'chat.completion.chunk', 'created': created, 'model': model, 'choices': [], 'usage': usage})}\n\n"
+            yield "data: [DONE]\n\n"
+            config.record("chat", "200")
+
+        return Response(generate(), mimetype="text/event-stream")
+
+    @app.route("/v1/audio/transcriptions", methods=["POST"])
+    @app.route("/openai/v1/audio/transcriptions", methods=["POST"])
+    @app.route("/v1/audio/translations", methods=["POST"])
+    @app.route("/openai/v1/audio/translations", methods=["POST"])
+    def transcriptions():
+        if config.rate_limited():
+            return rate_limit_response("transcription")
+        upload = request.files.get("file")
+        if upload is None:
+            config.record("transcription", "400")
+            return jsonify({"error": {"message": "file is required", "type": "invalid_request_error"}}), 400
+        duration = _audio_duration(upload.read())
+        time.sleep(config.sample(config.transcription_latency))
+        config.record("transcription", "200")
+
+        translate = request.path.endswith("/translations") or request.form.get("task") == "translate"
+        response_format = request.form.get("response_format", "json")
+        if response_format == "text":
+            return Response(TRANSCRIPT, mimetype="text/plain")
+        if response_format == "verbose_json":
+            return jsonify({
+                "task": "translate" if translate else "transcribe",
+                "language": "english" if translate else request.form.get("language", "english"),
+                "duration": round(duration, 2),
+                "text": TRANSCRIPT,
+                "segments": [{"id": 0, "start": 0.0, "end": round(duration, 2), "text": TRANSCRIPT}],
+                # Groq reports usage like this; OpenAI bills by duration
+                "x_groq": {"id": f"req_{uuid.uuid4().hex[:20]}"},
+            })
+        return jsonify({"text": TRANSCRIPT})
+
+    @app.route("/v1/audio/speech", methods=["POST"])
+    @app.route("/openai/v1/audio/speech", methods=["POST"])
+    def speech():
+        if config.rate_limited():
+            return rate_limit_response("speech")
+        body = request.get_json(silent=True) or {}
+        text = body.get("input", "")
+        if not text:
+            config.record("speech", "400")
+            return jsonify({"error": {"message": "input is required", "type": "invalid_request_error"}}), 400
+        time.sleep(config.sample(config.speech_latency))
+        config.record("speech", "200")
+
+        seconds = max(0.5, len(text) / 15.0)  # ~15 characters of speech per second
+        if body.get("response_format") == "wav":
+            return Response(_speech_wav(seconds), mimetype="audio/wav")
+        return Response(MP3_FRAME * math.ceil(seconds / MP3_FRAME_SECONDS), mimetype="audio/mpeg")
+
+    @app.route("/fake/stats", methods=["GET"])
+    def fake_stats():
+        return jsonify(config.stats)
+
+    return app
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Local fake OpenAI/Groq-compatible provider")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--chat-latency", default="300,0.4", help="Time to first token: median ms[,lognormal sigma]")
+    parser.add_argument("--token-latency", default="5", help="Per streamed token: median ms[,sigma]")
+    parser.add_argument("--transcription-latency", default="250,0.3", help="median ms[,sigma]")
+    parser.add_argument("--speech-latency", default="200,0.3", help="median ms[,sigma]")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds on injected 429s")
+    parser.add_argument("--reply-sentences", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    config = FakeProviderConfig(
+        chat_latency=Latency.parse(args.chat_latency),
+        token_latency=Latency.parse(args.token_latency),
+        transcription_latency=Latency.parse(args.transcription_latency),
+        speech_latency=Latency.parse(args.speech_latency),
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        reply_sentences=args.reply_sentences,
+        seed=args.seed,
+    )
+    create_app(config).run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""
+Open-loop load generator for /chat, /api/voice/transcribe and /api/voice/synthesize.
+
+Requests are fired on a fixed schedule (constant or Poisson arrivals, with
+optional linear ramp-up) no matter how fast the server answers, and latency
+is measured from each request's *scheduled* time, so a server that falls
+behind shows up in the percentiles instead of silently slowing the test
+down (coordinated omission).
+
+Targets:
+- "mock": the Flask app in-process via its test client, with its LLM / STT /
+  OpenAI TTS clients pointed at an in-process fake_provider server for the
+  run, so configured API keys are never billed. Synthesis defaults to the
+  "openai" service there, and the cost ledgers and STT / TTS caches are
+  redirected to a temporary directory, so fake traffic never shows up in
+  logs/, /api/stats, the served audio directory or the caches.
+- a base URL, e.g. http://127.0.0.1:5000 for a running app wired to real
+  providers or to a local fake provider server
+"""
+import io
+import json
+import math
+import random
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from simulation import generate_random_query
+
+ENDPOINTS = {
+    "chat": "/chat",
+    "transcribe": "/api/voice/transcribe",
+    "synthesize": "/api/voice/synthesize",
+}
+
+
+def sample_wav(seconds=3.0, sample_rate=16000):
+    """Built-in test clip: a speech-band tone with a little noise, as 16-bit mono WAV bytes."""
+    rng = random.Random(0)
+    frames = bytearray()
+    for i in range(int(seconds * sample_rate)):
+        t = i / sample_rate
+        value = 0.3 * math.sin(2 * math.pi * 220 * t) * (0.6 + 0.4 * math.sin(2 * math.pi * 3 * t))
+        value += rng.uniform(-0.02, 0.02)
+        frames += struct.pack("<h", int(value * 32767))
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(bytes(frames))
+    return buf.getvalue()
+
+
+def arrival_times(duration, rate, ramp=0.0, poisson=False, rng=None):
+    """
+    Scheduled send offsets (seconds) for an open-loop run.
+
+    The rate ramps linearly from 5% to `rate` over `ramp` seconds, then holds.
+    """
+    rng = rng or random.Random()
+    times = []
+    t = 0.0
+    while True:
+        current = rate * max(0.05, min(1.0, t / ramp)) if ramp else rate
+        t += rng.expovariate(current) if poisson else 1.0 / current
+        if t >= duration - 1e-9:  # float drift would add a send at exactly `duration`
+            return times
+        times.append(t)
+
+
+class _Client:
+    """Per-thread HTTP client: Flask test client for "mock", requests.Session otherwise."""
+
+    def __init__(self, target):
+        self.target = target
+        self._local = threading.local()
+        self._undo = []
+        if target == "mock":
+            import app as app_module
+            self._app = app_module.app
+            self._use_fake_provider(app_module)
+
+    def _use_fake_provider(self, app_module):
+        """Serve a fake_provider locally and swap it in for every provider client the app holds."""
+        import openai
+        from werkzeug.serving import make_server
+        from config import Config
+        from fake_provider import create_app
+        try:
+            from groq import Groq
+        except ImportError:
+            Groq = None
+
+        server = make_server("127.0.0.1", 0, create_app(), threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self._undo.append(server.shutdown)
+        base = f"http://127.0.0.1:{server.server_port}"
+        fake_openai = openai.OpenAI(api_key="fake", base_url=f"{base}/v1", max_retries=0)
+        fake_groq = Groq(api_key="fake", base_url=base, max_retries=0) if Groq else None
+
+        def patch(obj, **values):
+            for name, value in values.items():
+                old = getattr(obj, name, None)
+                self._undo.append(lambda obj=obj, name=name, old=old: setattr(obj, name, old))
+                setattr(obj, name, value)
+        # Clients created later (e.g. APIHandler's lazy Groq client) read Config
+        patch(Config, GROQ_API_KEY="fake" if Groq else "", OPENAI_API_KEY="fake",
+              GROQ_BASE_URL=base, OPENAI_BASE_URL=f"{base}/v1")
+        patch(app_module.bot.api_handler, openai_client=fake_openai, groq_client=fake_groq)
+        patch(app_module.stt, openai_client=fake_openai, groq_client=fake_groq)
+        patch(app_module.tts, openai_client=fake_openai)
+
+        # Fake traffic must not land in the real cost ledgers, served audio or the STT / TTS caches
+        scratch = tempfile.mkdtemp(prefix="loadtest_")
+        self._undo.append(lambda: shutil.rmtree(scratch, ignore_errors=True))
+        patch(app_module, VOICE_LOG_PATH=os.path.join(scratch, "voice_costs.csv"), AUDIO_DIR=scratch)
+        patch(app_module.bot.token_tracker, log_dir=scratch)
+        patch(app_module.stt, cache=None)
+        patch(app_module.tts, cache=None)
+
+    def close(self):
+        """Undo _use_fake_provider (newest change first)."""
+        while self._undo:
+            self._undo.pop()()
+
+    def _session(self):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            if self.target == "mock":
+                client = self._app.test_client()
+            else:
+                import requests
+                client = requests.Session()
+            self._local.client = client
+        return client
+
+    def post(self, path, json_body=None, files=None, data=None, timeout=60):
+        """Returns (status_code, parsed JSON body or None)."""
+        client = self._session()
+        if self.target == "mock":
+            if files:
+                form = dict(data or {})
+                form.update({name: (io.BytesIO(content), filename) for name, (filename, content) in files.items()})
+                resp = client.post(path, data=form, content_type="multipart/form-data")
+            else:
+                resp = client.post(path, json=json_body)
+            return resp.status_code, resp.get_json(silent=True)
+        resp = client.post(self.target.rstrip("/") + path, json=json_body, data=data,
+                           files={k: (fn, c) for k, (fn, c) in (files or {}).items()}, timeout=timeout)
+        try:
+            body = resp.json()
+        except ValueError:
+            body = None
+        return resp.status_code, body
+
+
+class LoadTest:
+    def __init__(self, target="mock", rate=5.0, duration=30.0, ramp=0.0, poisson=True,
+                 mix=None, audio=None, sessions=50, max_inflight=256, stt_service="groq",
+                 tts_service=None, seed=None):
+        self.target = target
+        self.rate = rate
+        self.duration = duration
+        self.ramp = ramp
+        self.poisson = poisson
+        self.mix = mix or {"chat": 1.0}
+        unknown = [e for e in self.mix if e not in ENDPOINTS]
+        if unknown:
+            raise ValueError(f"Unknown endpoint(s): {', '.join(unknown)}")
+        self.audio = audio or [("sample.wav", sample_wav())]
+        self.sessions = sessions
+        self.max_inflight = max_inflight
+        self.stt_service = stt_service
+        # "openai" is what the mock target's fake provider serves; edge-tts would go out to the network
+        self.tts_service = tts_service or ("openai" if target == "mock" else "edge-tts")
+        self.rng = random.Random(seed)
+        with open("products.json", "r", encoding="utf-8") as f:
+            self.products = json.load(f)
+        self._lock = threading.Lock()
+        self._results = {name: [] for name in self.mix}   # (latency_s, ok, status)
+
+    def _request(self, client, endpoint, i, query):
+        if endpoint == "chat":
+            return client.post(ENDPOINTS["chat"], json_body={"message": query, "session_id": f"loadtest_{i % self.sessions}"})
+        if endpoint == "transcribe":
+            filename, content = self.audio[i % len(self.audio)]
+            return client.post(ENDPOINTS["transcribe"], files={"audio": (filename, content)},
+                               data={"model_service": self.stt_service})
+        return client.post(ENDPOINTS["synthesize"], json_body={"text": query, "model_service": self.tts_service})
+
+    def _fire(self, client, endpoint, i, query, scheduled_at):
+        try:
+            status, body = self._request(client, endpoint, i, query)
+            ok = status < 400 and not (isinstance(body, dict) and (body.get("error") or body.get("success") is False))
+        except Exception:
+            status, ok = "exception", False
+        latency = time.perf_counter() - scheduled_at
+        with self._lock:
+            self._results[endpoint].append((latency, ok, status))
+
+    def run(self):
+        """Run the schedule; returns the summary dict (see summarize)."""
+        client = _Client(self.target)
+        try:
+            return self._run(client)
+        finally:
+            client.close()
+
+    def _run(self, client):
+        names = list(self.mix)
+        weights = [self.mix[n] for n in names]
+        schedule = arrival_times(self.duration, self.rate, self.ramp, self.poisson, self.rng)
+        plan = [(t, self.rng.choices(names, weights)[0], generate_random_query(self.products, self.rng))
+                for t in schedule]
+
+        with ThreadPoolExecutor(max_workers=self.max_inflight, thread_name_prefix="load") as pool:
+            start = time.perf_counter()
+            for i, (offset, endpoint, query) in enumerate(plan):
+                delay = start + offset - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(self._fire, client, endpoint, i, query, start + offset)
+        wall = time.perf_counter() - start
+        return self.summarize(wall, len(plan))
+
+    def summarize(self, wall, scheduled):
+        endpoints = {}
+        for name, results in self._results.items():
+            latencies = np.array([r[0] for r in results]) * 1000
+            errors = sum(1 for r in results if not r[1])
+            statuses = {}
+            for r in results:
+                statuses[str(r[2])] = statuses.get(str(r[2]), 0) + 1
+            p50, p95, p99 = np.percentile(latencies, (50, 95, 99)) if len(latencies) else (0.0, 0.0, 0.0)
+            endpoints[name] = {
+                "requests": len(results),
+                "errors": errors,
+                "error_rate": errors / len(results) if results else 0.0,
+                "throughput": (len(results) - errors) / wall if wall else 0.0,
+                "p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99),
+                "status_codes": statuses,
+            }
+        return {"target": self.target, "scheduled": scheduled, "wall_seconds": wall,
+                "offered_rate": scheduled / self.duration if self.duration else 0.0, "endpoints": endpoints}
+
+
+def print_summary(summary):
+    print(f"Target {summary['target']}: {summary['scheduled']} requests in {summary['wall_seconds']:.1f}s "
+          f"(offered {summary['offered_rate']:.1f} req/s)")
+    print(f"  {'Endpoint':<12}{'Requests':>10}{'OK/s':>9}{'Errors':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, s in summary["endpoints"].items():
+        print(f"  {name:<12}{s['requests']:>10}{s['throughput']:>9.1f}{s['error_rate'] * 100:>8.1f}%"
+              f"{s['p50_ms']:>10.1f}{s['p95_ms']:>10.1f}{s['p99_ms']:>10.1f}")
+        if s["errors"]:
+            print(f"  {'':<12}status codes: {s['status_codes']}")
@@ -0,0 +1,286 @@
+"""
+Chunked, multi-core aggregation over simulation / usage CSV logs.
+
+The file is memory-mapped and split into byte ranges that end on newline
+boundaries. Each range is parsed in a worker process into NumPy column
+arrays and reduced to sums, counts and group-bys (model, mode, kind, day).
+Partial results are small and merge by addition, so any number of chunks
+(or files) reduce to one Aggregate.
+
+Small files are parsed in-process: the pool only pays off for large logs.
+Our writers never put newlines inside quoted fields; if a chunk boundary
+does land inside quotes (odd quote parity), the file is re-parsed serially.
+"""
+import csv
+import io
+import mmap
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+import numpy as np
+
+NUMERIC_COLUMNS = (
+    "ai_cost", "stt_cost", "tts_cost", "total_cost",
+    "input_tokens", "output_tokens", "audio_duration",
+    "cost", "duration_seconds", "character_count",
+)
+GROUP_COLUMNS = ("model", "mode", "kind", "service")
+
+CHUNK_BYTES = 64 * 1024 * 1024
+PARALLEL_THRESHOLD = 8 * 1024 * 1024
+
+_pool = None
+_pool_workers = None
+
+
+class Aggregate:
+    """Reducible totals: row count, column sums and per-group count/sums."""
+
+    def __init__(self):
+        self.count = 0
+        self.sums = {}
+        self.groups = {}   # dimension -> key -> {"count": int, "sums": {column: float}}
+
+    def merge(self, other):
+        self.count += other.count
+        for col, value in other.sums.items():
+            self.sums[col] = self.sums.get(col, 0.0) + value
+        for dim, keys in other.groups.items():
+            mine = self.groups.setdefault(dim, {})
+            for key, bucket in keys.items():
+                target = mine.setdefault(key, {"count": 0, "sums": {}})
+                target["count"] += bucket["count"]
+                for col, value in bucket["sums"].items():
+                    target["sums"][col] = target["sums"].get(col, 0.0) + value
+        return self
+
+    def total(self, column):
+        return self.sums.get(column, 0.0)
+
+    def group(self, dimension):
+        return self.groups.get(dimension, {})
+
+    def to_dict(self):
+        return {"count": self.count, "sums": self.sums, "groups": self.groups}
+
+
+def _to_float_array(values):
+    try:
+        return np.array(values, dtype=np.float64)
+    except ValueError:
+        out = np.zeros(len(values), dtype=np.float64)
+        for i, v in enumerate(values):
+            try:
+                out[i] = float(v)
+            except ValueError:
+                pass
+        return out
+
+
+def _day_labels(timestamps):
+    days = timestamps.astype(np.int64).astype("datetime64[s]").astype("datetime64[D]")
+    return np.datetime_as_string(days)
+
+
+def _reduce(count, numeric, dims):
+    agg = Aggregate()
+    agg.count = count
+    for name, arr in numeric.items():
+        agg.sums[name] = float(arr.sum())
+    for dim, labels in dims.items():
+        keys, codes = np.unique(labels, return_inverse=True)
+        counts = np.bincount(codes, minlength=len(keys))
+        sums = {name: np.bincount(codes, weights=arr, minlength=len(keys)) for name, arr in numeric.items()}
+        agg.groups[dim] = {
+            str(key): {"count": int(counts[i]), "sums": {name: float(s[i]) for name, s in sums.items()}}
+            for i, key in enumerate(keys)
+        }
+    return agg
+
+
+def aggregate_rows(header, rows, default_day=None):
+    """Reduce parsed CSV rows (lists of strings) to an Aggregate using NumPy."""
+    columns = list(zip(*(r for r in rows if len(r) == len(header))))
+    if not columns:
+        return Aggregate()
+    col_index = {name: i for i, name in enumerate(header)}
+    count = len(columns[0])
+
+    numeric = {name: _to_float_array(columns[col_index[name]]) for name in NUMERIC_COLUMNS if name in col_index}
+    dims = {name: np.array(columns[col_index[name]]) for name in GROUP_COLUMNS if name in col_index}
+    if "timestamp" in col_index:
+        dims["day"] = _day_labels(_to_float_array(columns[col_index["timestamp"]]))
+    elif default_day:
+        dims["day"] = np.full(count, default_day)
+    return _reduce(count, numeric, dims)
+
+
+def _aggregate_bytes(header, data, default_day=None):
+    """
+    Fast path: let NumPy's C parser (np.loadtxt) pull only the needed columns.
+    Raises ValueError on anything it can't parse (empty numeric fields, ragged rows).
+    """
+    col_index = {name: i for i, name in enumerate(header)}
+    num_names = [n for n in NUMERIC_COLUMNS if n in col_index]
+    if "timestamp" in col_index:
+        num_names.append("timestamp")
+    group_names = [n for n in GROUP_COLUMNS if n in col_index]
+    opts = {"delimiter": ",", "quotechar": '"', "comments": None, "ndmin": 2, "encoding": "utf-8"}
+
+    numeric = {}
+    count = None
+    if num_names:
+        values = np.loadtxt(io.BytesIO(data), usecols=[col_index[n] for n in num_names], dtype=np.float64, **opts)
+        count = values.shape[0]
+        numeric = {n: values[:, i] for i, n in enumerate(num_names)}
+    dims = {}
+    if group_names:
+        labels = np.loadtxt(io.BytesIO(data), usecols=[col_index[n] for n in group_names], dtype=str, **opts)
+        count = labels.shape[0]
+        dims = {n: labels[:, i] for i, n in enumerate(group_names)}
+    if count is None:
+        raise ValueError("No known columns")
+
+    timestamps = numeric.pop("timestamp", None)
+    if timestamps is not None:
+        dims["day"] = _day_labels(timestamps)
+    elif default_day:
+        dims["day"] = np.full(count, default_day)
+    return _reduce(count, numeric, dims)
+
+
+def _parse_range(path, start, end, header, default_day):
+    """Worker: parse bytes [start, end) of `path`. Returns (Aggregate, quote_count)."""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        data = mm[start:end]
+    if not data.strip():
+        return Aggregate(), 0
+    try:
+        agg = _aggregate_bytes(header, data, default_day)
+    except ValueError:
+        rows = list(csv.reader(io.StringIO(data.decode("utf-8", errors="replace"))))
+        agg = aggregate_rows(header, rows, default_day)
+    return agg, data.count(b'"')
+
+
+def split_ranges(mm, start, chunk_bytes):
+    """Split [start, len(mm)) into ranges that end just after a newline."""
+    size = len(mm)
+    ranges = []
+    while start < size:
+        end = min(start + chunk_bytes, size)
+        if end < size:
+            nl = mm.find(b"\n", end)
+            end = size if nl == -1 else nl + 1
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def run_timestamp(path):
+    """Run start time: the unix timestamp in the filename (voice_simulation_<ts>.csv), else mtime."""
+    m = re.search(r"_(\d{9,11})\.csv$", os.path.basename(path))
+    return int(m.group(1)) if m else os.path.getmtime(path)
+
+
+def run_day(path):
+    """Day label for logs without a timestamp column."""
+    return datetime.fromtimestamp(run_timestamp(path), tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+def _get_pool(workers):
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != workers:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool = ProcessPoolExecutor(max_workers=workers)
+        _pool_workers = workers
+    return _pool
+
+
+def aggregate_file(path, workers=None, chunk_bytes=CHUNK_BYTES, parallel=None):
+    """
+    Aggregate one CSV log.
+
+    Args:
+        workers: process count (default: CPU count)
+        chunk_bytes: target bytes per chunk
+        parallel: force (True) or disable (False) the process pool; default by file size
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        return Aggregate()
+    default_day = run_day(path)
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        header_end = mm.find(b"\n")
+        if header_end == -1:
+            return Aggregate()
+        header = next(csv.reader([mm[:header_end].decode("utf-8-sig").strip()]))
+        ranges = split_ranges(mm, header_end + 1, chunk_bytes)
+    if parallel is None:
+        parallel = size >= PARALLEL_THRESHOLD and len(ranges) > 1
+
+    if parallel:
+        pool = _get_pool(workers or os.cpu_count() or 1)
+        futures = [pool.submit(_parse_range, path, s, e, header, default_day) for s, e in ranges]
+        results = (f.result() for f in futures)
+    else:
+        # Same chunking in-process keeps memory bounded for big files
+        results = (_parse_range(path, s, e, header, default_day) for s, e in ranges)
+
+    total = Aggregate()
+    parity = 0
+    for i, (part, quotes) in enumerate(results):
+        parity += quotes
+        total.merge(part)
+        if parity % 2 and i < len(ranges) - 1:
+            # A boundary fell inside a quoted field: parse the whole file in one piece instead
+            return _parse_range(path, header_end + 1, size, header, default_day)[0]
+    return total
+
+
+def load_usage(path):
+    """
+    Per-row usage arrays for re-pricing (CostCalculator.compare_pricing):
+    input_tokens, output_tokens, audio_duration and tts_chars (response length).
+    Missing columns come back as zeros; text-mode rows have no TTS characters.
+    """
+    with open(path, "rb") as f:
+        header = next(csv.reader([f.readline().decode("utf-8-sig").strip()]), [])
+        data = f.read()
+    col_index = {name: i for i, name in enumerate(header)}
+    if not data.strip():
+        return {n: np.zeros(0) for n in ("input_tokens", "output_tokens", "audio_duration", "tts_chars")}
+    opts = {"delimiter": ",", "quotechar": '"', "comments": None, "ndmin": 2, "encoding": "utf-8"}
+    names = [n for n in ("input_tokens", "output_tokens", "audio_duration") if n in col_index]
+    try:
+        values = np.loadtxt(io.BytesIO(data), usecols=[col_index[n] for n in names], dtype=np.float64, **opts) \
+            if names else np.zeros((0, 0))
+        usage = {n: values[:, i] for i, n in enumerate(names)}
+        if "response" in col_index:
+            responses = np.loadtxt(io.BytesIO(data), usecols=[col_index["response"]], dtype=str, **opts)[:, 0]
+            usage["tts_chars"] = np.char.str_len(responses).astype(np.float64)
+            if "mode" in col_index:
+                modes = np.loadtxt(io.BytesIO(data), usecols=[col_index["mode"]], dtype=str, **opts)[:, 0]
+                usage["tts_chars"] *= modes == "voice"
+    except ValueError:
+        rows = [r for r in csv.reader(io.StringIO(data.decode("utf-8", errors="replace"))) if len(r) == len(header)]
+        columns = list(zip(*rows)) or [()] * len(header)
+        usage = {n: _to_float_array(columns[col_index[n]]) for n in names}
+        if "response" in col_index:
+            voice = columns[col_index["mode"]] if "mode" in col_index else None
+            usage["tts_chars"] = np.array([len(v) if voice is None or voice[i] == "voice" else 0
+                                           for i, v in enumerate(columns[col_index["response"]])], dtype=np.float64)
+    rows = len(next(iter(usage.values()))) if usage else 0
+    for n in ("input_tokens", "output_tokens", "audio_duration", "tts_chars"):
+        usage.setdefault(n, np.zeros(rows))
+    return usage
+
+
+def aggregate_files(paths, **kwargs):
+    total = Aggregate()
+    for path in paths:
+        total.merge(aggregate_file(path, **kwargs))
+    return total
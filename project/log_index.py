@@ -0,0 +1,194 @@
+"""
+Byte-offset index over a CSV log for paginated reads.
+
+The index is built once per file and extended incrementally as the file
+grows (simulation logs are append-only), so reading a page never rescans
+the whole log:
+- a sparse checkpoint every STRIDE rows (row number -> byte offset),
+- posting lists (row numbers) per value for low-cardinality columns,
+- running totals for the dashboard summary.
+Rows may contain quoted newlines; boundaries are found by quote parity.
+"""
+import csv
+import io
+import os
+import threading
+from array import array
+
+STRIDE = 64
+POSTING_COLUMNS = ("model", "mode")
+
+
+class LogIndex:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.header = []
+        self.checkpoints = array("q")   # byte offset of row i*STRIDE
+        self.row_count = 0
+        self.indexed_size = 0            # bytes covered by complete rows
+        self.data_start = 0
+        self.postings = {}               # column -> value -> array of row numbers
+        self.totals = {"queries": 0, "input_tokens": 0, "output_tokens": 0}
+
+    def refresh(self):
+        """Index any rows appended since the last call (full rebuild if the file shrank)."""
+        with self._lock:
+            size = os.path.getsize(self.path)
+            if size < self.indexed_size:
+                self._reset()  # keeps self._lock: other callers stay out during the rebuild
+                size = os.path.getsize(self.path)
+            if size == self.indexed_size:
+                return self
+            with open(self.path, "rb") as f:
+                if not self.header:
+                    line = f.readline()
+                    if not line.endswith(b"\n"):
+                        return self  # header not fully written yet
+                    self.header = next(csv.reader([line.decode("utf-8-sig")]))
+                    self.data_start = self.indexed_size = f.tell()
+                f.seek(self.indexed_size)
+                self._index_rows(f)
+        return self
+
+    def _index_rows(self, f):
+        col = {name: i for i, name in enumerate(self.header)}
+        posting_cols = [(c, col[c]) for c in POSTING_COLUMNS if c in col]
+        in_idx, out_idx = col.get("input_tokens"), col.get("output_tokens")
+        offset = self.indexed_size
+        for row_bytes in _iter_rows(f):
+            if not row_bytes.endswith(b"\n"):
+                break  # partial row at EOF; pick it up next refresh
+            if row_bytes.strip():
+                if self.row_count % STRIDE == 0:
+                    self.checkpoints.append(offset)
+                values = _parse_row(row_bytes)
+                n = self.row_count
+                for name, i in posting_cols:
+                    value = values[i] if i < len(values) else ""
+                    self.postings.setdefault(name, {}).setdefault(value, array("I")).append(n)
+                self.totals["queries"] += 1
+                self.totals["input_tokens"] += _to_int(values, in_idx)
+                self.totals["output_tokens"] += _to_int(values, out_idx)
+                self.row_count += 1
+            offset += len(row_bytes)
+            self.indexed_size = offset
+
+    def _read_rows(self, f, row_numbers):
+        """Yield rows (as dicts) for ascending row numbers, seeking via checkpoints."""
+        current = None
+        rows = None
+        for n in row_numbers:
+            if current is None or n < current or n // STRIDE != current // STRIDE:
+                f.seek(self.checkpoints[n // STRIDE])
+                rows = (r for r in _iter_rows(f) if r.strip())
+                current = (n // STRIDE) * STRIDE
+            while current < n:
+                next(rows)
+                current += 1
+            values = _parse_row(next(rows))
+            current += 1
+            yield dict(zip(self.header, values))
+
+    def page(self, page=1, per_page=50, filters=None, search=None):
+        """
+        Return one page of rows, optionally filtered.
+
+        filters: {column: value} on POSTING_COLUMNS (constant time per page)
+        search:  case-insensitive substring over query/response (scans until the page fills)
+        """
+        self.refresh()
+        page = max(1, int(page))
+        per_page = max(1, min(int(per_page), 500))
+        start = (page - 1) * per_page
+        selected = self._filtered_rows(filters or {})
+
+        with open(self.path, "rb") as f:
+            if not search:
+                total = len(selected) if selected is not None else self.row_count
+                if selected is not None:
+                    numbers = list(selected[start:start + per_page])
+                else:
+                    numbers = range(start, min(start + per_page, self.row_count))
+                return {"rows": list(self._read_rows(f, numbers)), "total": total,
+                        "page": page, "per_page": per_page, "pages": -(-total // per_page)}
+
+            needle = search.lower()
+            candidates = selected if selected is not None else range(self.row_count)
+            rows, matched = [], 0
+            for row in self._read_rows(f, candidates):
+                if needle in (row.get("query", "") + " " + row.get("response", "")).lower():
+                    if matched >= start and len(rows) < per_page:
+                        rows.append(row)
+                    matched += 1
+                    if len(rows) == per_page:
+                        break
+            # Total is unknown without a full scan; report what we know
+            return {"rows": rows, "total": None, "page": page, "per_page": per_page, "pages": None}
+
+    def iter_rows(self, filters=None):
+        """Stream every (filtered) row without loading the log into memory."""
+        self.refresh()
+        selected = self._filtered_rows(filters or {})
+        with open(self.path, "rb") as f:
+            yield from self._read_rows(f, selected if selected is not None else range(self.row_count))
+
+    def _filtered_rows(self, filters):
+        selected = None
+        for column, value in filters.items():
+            if not value:
+                continue
+            if column not in POSTING_COLUMNS:
+                raise ValueError(f"Cannot filter on column '{column}'")
+            rows = self.postings.get(column, {}).get(value, array("I"))
+            if selected is None:
+                selected = rows
+            else:
+                keep = set(rows)
+                selected = array("I", (n for n in selected if n in keep))
+        return selected
+
+    def filter_values(self):
+        return {column: sorted(values) for column, values in self.postings.items()}
+
+
+def _iter_rows(f):
+    """Yield raw CSV records (bytes), joining lines inside quoted fields."""
+    pending = b""
+    for line in f:
+        pending += line
+        if pending.count(b'"') % 2 == 0:
+            yield pending
+            pending = b""
+    if pending:
+        yield pending
+
+
+def _parse_row(row_bytes):
+    return next(csv.reader(io.StringIO(row_bytes.decode("utf-8", errors="replace"))), [])
+
+
+def _to_int(values, idx):
+    if idx is None or idx >= len(values):
+        return 0
+    try:
+        return int(float(values[idx] or 0))
+    except ValueError:
+        return 0
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(path):
+    """Shared, incrementally refreshed index for a log file."""
+    key = os.path.abspath(path)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = LogIndex(path)
+    return index.refresh()
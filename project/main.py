@@ -41,18 +41,175 @@ def interactive_chat():
         print(f"Total Tokens: {stats['total_tokens']}")
         print(f"Total Cost: ${stats['total_cost']:.6f}")
 
+def reprice(logs_glob, pricing_file=None):
+    """What-if: re-price logged usage under every LLM / STT / TTS pricing table."""
+    import glob
+    import json
+    import time
+    import numpy as np
+    from cost_calculator import CostCalculator
+    from log_aggregator import load_usage
+
+    paths = sorted(glob.glob(logs_glob))
+    if not paths:
+        print(f"No logs match {logs_glob}")
+        return
+
+    # Optional JSON: {"llm": {name: {"input", "output"}}, "stt": {name: $/min}, "tts": {name: $/char}}
+    tables = {}
+    if pricing_file:
+        with open(pricing_file, "r", encoding="utf-8") as f:
+            tables = json.load(f)
+
+    start = time.perf_counter()
+    parts = [load_usage(p) for p in paths]
+    usage = {k: np.concatenate([u[k] for u in parts]) for k in parts[0]}
+    load_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = CostCalculator().compare_pricing(usage, tables.get("llm"), tables.get("stt"), tables.get("tts"))
+    price_s = time.perf_counter() - start
+
+    print(f"Re-priced {result['rows']:,} queries from {len(paths)} log(s) "
+          f"(load {load_s:.2f}s, pricing {price_s * 1000:.1f}ms)")
+    sections = (("llm", "LLM (tokens)"), ("stt", "STT (audio minutes)"), ("tts", "TTS (characters)"))
+    for key, title in sections:
+        print(f"\n{title}")
+        print(f"  {'Provider':<12}{'Total':>14}{'Per query':>14}{'p95 query':>14}")
+        for name, s in sorted(result[key].items(), key=lambda kv: kv[1]['total']):
+            print(f"  {name:<12}{s['total']:>14.6f}{s['per_query']:>14.8f}{s['p95']:>14.8f}")
+
+def plan(logs_glob, daily_queries, trajectories, mix, seed=None, days=1):
+    """Monte Carlo capacity / cost plan from the logged usage distributions."""
+    import time
+    from capacity_planner import Profile, simulate, print_plan, parse_mix
+
+    try:
+        profile = Profile.from_logs(logs_glob)
+        mix = parse_mix(mix)
+    except ValueError as e:
+        print(e)
+        return
+    start = time.perf_counter()
+    try:
+        result = simulate(profile, daily_queries, trajectories, mix, seed, days=days)
+    except ValueError as e:
+        print(e)
+        return
+    print_plan(result)
+    print(f"\nSimulated in {time.perf_counter() - start:.2f}s")
+
+def loadtest(args):
+    """Open-loop load test against the app (in-process "mock" or a base URL)."""
+    import json
+    import os
+    from loadtest import LoadTest, print_summary
+
+    mix = {}
+    for part in filter(None, args.endpoints.split(",")):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    audio = []
+    for path in args.audio or []:
+        with open(path, "rb") as f:
+            audio.append((os.path.basename(path), f.read()))
+
+    try:
+        test = LoadTest(target=args.target, rate=args.rate, duration=args.duration, ramp=args.ramp,
+                        poisson=args.arrivals == "poisson", mix=mix, audio=audio or None,
+                        max_inflight=args.max_inflight, seed=args.seed)
+    except ValueError as e:
+        print(e)
+        return
+    summary = test.run()
+    print_summary(summary)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+def bench(args):
+    """Run the microbenchmark suite and compare it with the stored baseline."""
+    import bench_suite
+
+    names = [n.strip() for n in args.cases.split(",") if n.strip()] if args.cases else None
+    try:
+        current = bench_suite.run(names, progress=lambda name, r: print(f"  {name:<20}{r['per_call_us']:>12.2f} us"))
+    except ValueError as e:
+        print(e)
+        return 2
+    if args.update_baseline:
+        bench_suite.save_baseline(current, args.baseline)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    baseline = bench_suite.load_baseline(args.baseline)
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; record one with --update-baseline")
+        return 2
+    rows = bench_suite.compare(current, baseline, args.threshold)
+    suspects = [row["name"] for row in rows if row["regressed"]]
+    if suspects:
+        # A real regression reproduces; a noisy repeat (scheduler, turbo, GC) usually doesn't
+        print(f"Re-running {', '.join(suspects)} to confirm")
+        retry = bench_suite.run(suspects, progress=lambda name, r: print(f"  {name:<20}{r['per_call_us']:>12.2f} us"))
+        rows = bench_suite.compare(bench_suite.merge_fastest(current, retry), baseline, args.threshold)
+    print(f"\n{'Benchmark':<20}{'Current us':>12}{'Expected us':>13}{'Ratio':>8}{'Limit':>8}")
+    for row in rows:
+        flag = "  REGRESSED" if row["regressed"] else ""
+        print(f"{row['name']:<20}{row['current_us']:>12.2f}{row['expected_us']:>13.2f}{row['ratio']:>8.2f}"
+              f"{row['limit']:>8.2f}{flag}")
+    regressed = [row["name"] for row in rows if row["regressed"]]
+    if regressed:
+        print(f"\nRegressed past {args.threshold}x baseline: {', '.join(regressed)}")
+        return 1
+    print(f"\nAll benchmarks within {args.threshold}x baseline")
+    return 0
+
 def main():
     parser = argparse.ArgumentParser(description="Lira Cosmetics AI Customer Service Chatbot")
-    parser.add_argument('mode', choices=['chat', 'simulate'], nargs='?', default='chat', help="Mode to run: 'chat' for interactive mode, 'simulate' for customer simulation")
+    parser.add_argument('mode', choices=['chat', 'simulate', 'reprice', 'plan', 'loadtest', 'bench'], nargs='?', default='chat', help="Mode to run: 'chat' for interactive mode, 'simulate' for customer simulation, 'reprice' for what-if pricing of logged usage, 'plan' for a Monte Carlo capacity plan, 'loadtest' for an open-loop load test, 'bench' for the microbenchmark regression suite")
+    parser.add_argument('--logs', default="logs/*simulation_*.csv", help="reprice/plan: glob of usage logs")
+    parser.add_argument('--pricing', default=None, help="reprice: JSON file with alternative llm/stt/tts pricing tables")
+    parser.add_argument('--daily-queries', type=int, default=5000, help="plan: mean queries per day")
+    parser.add_argument('--trajectories', type=int, default=10000, help="plan: simulated trajectories of --days days each")
+    parser.add_argument('--days', type=int, default=1, help="plan: days per trajectory, e.g. 30 for a monthly cost band")
+    parser.add_argument('--mix', default="groq=1", help="plan: provider traffic split, e.g. groq=0.7,openai=0.3")
+    parser.add_argument('--seed', type=int, default=None, help="simulate/plan/loadtest: random seed for reproducible runs")
+    parser.add_argument('--concurrency', type=int, default=1, help="simulate: customers processed in parallel")
+    parser.add_argument('--customers', type=int, default=50, help="simulate: number of simulated customers")
+    
+    parser.add_argument('--target', default="mock", help="loadtest: 'mock' (in-process app against a local fake provider) or a base URL such as http://127.0.0.1:5000")
+    parser.add_argument('--rate', type=float, default=5.0, help="loadtest: requests per second")
+    parser.add_argument('--duration', type=float, default=30.0, help="loadtest: seconds of load")
+    parser.add_argument('--ramp', type=float, default=0.0, help="loadtest: seconds to ramp up to --rate")
+    parser.add_argument('--arrivals', choices=['constant', 'poisson'], default='poisson', help="loadtest: arrival process")
+    parser.add_argument('--endpoints', default="chat=1", help="loadtest: endpoint mix, e.g. chat=0.6,transcribe=0.2,synthesize=0.2")
+    parser.add_argument('--audio', nargs='*', default=None, help="loadtest: audio files for transcribe (default: built-in WAV clip)")
+    parser.add_argument('--max-inflight', type=int, default=256, help="loadtest: client threads")
+    parser.add_argument('--output', default=None, help="loadtest: write the JSON summary here")
+    
+    parser.add_argument('--baseline', default="benchmarks/baseline.json", help="bench: baseline JSON file")
+    parser.add_argument('--threshold', type=float, default=1.5, help="bench: fail when a case is slower than this multiple of its baseline")
+    parser.add_argument('--update-baseline', action='store_true', help="bench: record the results as the new baseline")
+    parser.add_argument('--cases', default=None, help="bench: comma-separated subset of cases (default: all)")
     
     args = parser.parse_args()
 
     if args.mode == 'chat':
         interactive_chat()
+    elif args.mode == 'reprice':
+        reprice(args.logs, args.pricing)
+    elif args.mode == 'loadtest':
+        loadtest(args)
+    elif args.mode == 'bench':
+        sys.exit(bench(args))
+    elif args.mode == 'plan':
+        plan(args.logs, args.daily_queries, args.trajectories, args.mix, args.seed, args.days)
     elif args.mode == 'simulate':
         if run_simulation:
             print("Starting simulation...")
-            run_simulation()
+            run_simulation(args.customers, args.concurrency, args.seed)
         else:
             print("Simulation module not found or import error.")
             # Fallback inline or just error out. 
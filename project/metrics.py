@@ -0,0 +1,228 @@
+import math
+import threading
+import time
+
+
+class Counter:
+    """Monotonic counter. `+=` is not atomic across threads, so increments take a lock."""
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Histogram:
+    """
+    HDR-style latency histogram.
+
+    Values are recorded in seconds and stored as integer microseconds in
+    log-linear buckets: every power of two is split into 2**(SUB_BITS-1)
+    linear sub-buckets, which keeps the relative error around 6% over the
+    whole range (1us .. ~2h) with a fixed, small bucket array.
+    Recording is one multiply, one bit_length and one list increment under
+    a lock, so it stays well under a microsecond per observation.
+    """
+
+    SUB_BITS = 5
+    SUB_COUNT = 1 << SUB_BITS
+    HALF_COUNT = SUB_COUNT >> 1
+    MAX_SHIFT = 28  # 2**(28+5) us ~= 2.4 hours
+    BUCKET_COUNT = SUB_COUNT + MAX_SHIFT * HALF_COUNT
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKET_COUNT
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        v = int(value * 1_000_000)
+        if v < 32:
+            idx = v if v > 0 else 0
+        else:
+            shift = v.bit_length() - 5
+            idx = (shift << 4) + (v >> shift)
+            if idx >= 480:
+                idx = 479
+        with self._lock:
+            self.counts[idx] += 1
+            self.sum += value
+
+    def time(self):
+        return _Timer(self)
+
+    @classmethod
+    def bucket_upper_bound(cls, idx):
+        """Largest value (in seconds) that lands in bucket `idx`."""
+        if idx < cls.SUB_COUNT:
+            return idx / 1_000_000
+        shift = (idx - cls.SUB_COUNT) // cls.HALF_COUNT + 1
+        mantissa = (idx - cls.SUB_COUNT) % cls.HALF_COUNT + cls.HALF_COUNT
+        return (((mantissa + 1) << shift) - 1) / 1_000_000
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def mean(self):
+        count = self.count
+        return self.sum / count if count else 0.0
+
+    def percentile(self, p):
+        """Approximate percentile (0-100) in seconds, 0.0 when empty."""
+        counts = list(self.counts)
+        total = sum(counts)
+        if not total:
+            return 0.0
+        target = max(1, math.ceil(total * p / 100.0))
+        seen = 0
+        for idx, c in enumerate(counts):
+            seen += c
+            if seen >= target:
+                return self.bucket_upper_bound(idx)
+        return self.bucket_upper_bound(len(counts) - 1)
+
+    def cumulative(self, bounds):
+        """Cumulative counts for Prometheus `le` bounds (seconds)."""
+        counts = list(self.counts)
+        result = []
+        idx = 0
+        running = 0
+        for le in bounds:
+            while idx < len(counts) and self.bucket_upper_bound(idx) <= le:
+                running += counts[idx]
+                idx += 1
+            result.append(running)
+        return result, running + sum(counts[idx:])
+
+
+# Sanity check of the constants inlined in Histogram.observe
+assert Histogram.SUB_BITS == 5 and Histogram.BUCKET_COUNT == 480
+
+
+class _Timer:
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class MetricFamily:
+    """A named metric with optional labels; children are created on first use."""
+
+    def __init__(self, kind, name, documentation, labelnames=()):
+        self.kind = kind
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.children = {}
+        self._factory = Counter if kind == "counter" else Histogram
+
+    def labels(self, *values):
+        child = self.children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self.children.setdefault(values, self._factory())
+        return child
+
+    # Shortcuts for unlabelled metrics
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def mean(self):
+        """Mean over all children of a histogram family, 0.0 when empty."""
+        children = list(self.children.values())
+        count = sum(c.count for c in children)
+        return sum(c.sum for c in children) / count if count else 0.0
+
+
+class Registry:
+    """Holds all metric families and renders them in Prometheus text format."""
+
+    # Prometheus `le` bounds exported for every histogram (seconds)
+    EXPORT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    def __init__(self):
+        self.families = {}
+
+    def _register(self, kind, name, documentation, labelnames):
+        family = self.families.get(name)
+        if family is None:
+            family = MetricFamily(kind, name, documentation, labelnames)
+            self.families[name] = family
+        return family
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register("counter", name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=()):
+        return self._register("histogram", name, documentation, labelnames)
+
+    def render(self):
+        lines = []
+        for family in list(self.families.values()):
+            lines.append(f"# HELP {family.name} {family.documentation}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for values, child in sorted(family.children.items()):
+                labels = _format_labels(family.labelnames, values)
+                if family.kind == "counter":
+                    lines.append(f"{family.name}{_wrap(labels)} {_format_value(child.value)}")
+                    continue
+                cumulative, total = child.cumulative(self.EXPORT_BUCKETS)
+                for le, count in zip(self.EXPORT_BUCKETS, cumulative):
+                    le_label = _join(labels, f'le="{le}"')
+                    lines.append(f"{family.name}_bucket{_wrap(le_label)} {count}")
+                inf_label = _join(labels, 'le="+Inf"')
+                lines.append(f"{family.name}_bucket{_wrap(inf_label)} {total}")
+                lines.append(f"{family.name}_sum{_wrap(labels)} {_format_value(child.sum)}")
+                lines.append(f"{family.name}_count{_wrap(labels)} {total}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values):
+    return ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+
+
+def _join(labels, extra):
+    return f"{labels},{extra}" if labels else extra
+
+
+def _wrap(labels):
+    return "{" + labels + "}" if labels else ""
+
+
+def _format_value(value):
+    return repr(float(value))
+
+
+REGISTRY = Registry()
+
+# Pipeline stage metrics
+LLM_LATENCY = REGISTRY.histogram("lira_llm_request_seconds", "LLM call latency.", ("service",))
+LLM_REQUESTS = REGISTRY.counter("lira_llm_requests_total", "LLM calls by outcome.", ("service", "outcome"))
+LLM_TOKENS = REGISTRY.counter("lira_llm_tokens_total", "Tokens used by LLM calls.", ("service", "direction"))
+STT_LATENCY = REGISTRY.histogram("lira_stt_request_seconds", "Speech-to-text call latency.", ("service",))
+STT_REQUESTS = REGISTRY.counter("lira_stt_requests_total", "Speech-to-text calls by outcome.", ("service", "outcome"))
+TTS_LATENCY = REGISTRY.histogram("lira_tts_request_seconds", "Text-to-speech call latency.", ("service",))
+TTS_REQUESTS = REGISTRY.counter("lira_tts_requests_total", "Text-to-speech calls by outcome.", ("service", "outcome"))
+STT_PREPROCESS_SAVED = REGISTRY.counter("lira_stt_preprocess_saved_total", "Audio bytes and billed seconds removed before STT.", ("unit",))
+CACHE_REQUESTS = REGISTRY.counter("lira_cache_requests_total", "Cache lookups by cache and result.", ("cache", "result"))
+QUEUE_WAIT = REGISTRY.histogram("lira_queue_wait_seconds", "Time spent waiting in a work queue.", ("queue",))
+HTTP_LATENCY = REGISTRY.histogram("lira_http_request_seconds", "HTTP request latency by endpoint.", ("endpoint",))
@@ -0,0 +1,135 @@
+"""
+On-demand profiling for the running server.
+
+- SamplingProfiler: samples the Python stacks of every thread at a fixed
+  interval (sys._current_frames) and returns collapsed stacks
+  ("thread;outer;inner count" lines) ready for flamegraph.pl / speedscope.
+- MemoryTracker: tracemalloc snapshots diffed against the previous one,
+  to catch steady growth (e.g. Chatbot.sessions, TokenTracker.query_logs).
+"""
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+
+class ProfilerBusyError(RuntimeError):
+    pass
+
+
+class SamplingProfiler:
+    """Low-overhead stack sampler. Only one profile can run at a time."""
+
+    MAX_SECONDS = 60
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _frame_label(frame):
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def _sample(self, counts, skip_idents):
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident in skip_idents:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_label(frame))
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            key = ";".join(reversed(stack))
+            counts[key] = counts.get(key, 0) + 1
+
+    def profile(self, seconds=5.0, interval=0.005):
+        """
+        Sample all threads (except the caller) for `seconds`.
+
+        Returns:
+            dict: {collapsed, samples, seconds, interval}
+        """
+        seconds = max(0.1, min(float(seconds), self.MAX_SECONDS))
+        interval = max(0.001, float(interval))
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusyError("A profile is already running")
+        try:
+            counts = {}
+            skip = {threading.get_ident()}
+            samples = 0
+            deadline = time.perf_counter() + seconds
+            while time.perf_counter() < deadline:
+                self._sample(counts, skip)
+                samples += 1
+                time.sleep(interval)
+        finally:
+            self._lock.release()
+
+        collapsed = "\n".join(
+            f"{stack} {count}" for stack, count in sorted(counts.items(), key=lambda kv: -kv[1])
+        )
+        return {"collapsed": collapsed, "samples": samples, "seconds": seconds, "interval": interval}
+
+
+class MemoryTracker:
+    """tracemalloc wrapper that diffs each snapshot against the previous one."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._previous = None
+        self._first = None
+
+    @property
+    def running(self):
+        return tracemalloc.is_tracing()
+
+    def start(self, frames=10):
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+            self._previous = self._first = self._take()
+
+    def stop(self):
+        with self._lock:
+            tracemalloc.stop()
+            self._previous = self._first = None
+
+    @staticmethod
+    def _take():
+        # Hide allocations made by tracemalloc / this module itself
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ))
+
+    def snapshot(self, top=20, since_start=False):
+        """
+        Take a snapshot and diff it against the previous one (or the first).
+
+        Returns:
+            dict: {current_bytes, peak_bytes, top: [{location, size_diff, count_diff, size}]}
+        """
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                raise RuntimeError("Memory tracking is not running")
+            current = self._take()
+            baseline = self._first if since_start else self._previous
+            stats = current.compare_to(baseline, "lineno")
+            self._previous = current
+
+        size, peak = tracemalloc.get_traced_memory()
+        return {
+            "current_bytes": size,
+            "peak_bytes": peak,
+            "top": [
+                {
+                    "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                    "size_diff": stat.size_diff,
+                    "count_diff": stat.count_diff,
+                    "size": stat.size,
+                }
+                for stat in stats[:top]
+            ],
+        }
@@ -1,33 +1,77 @@
-import csv
+import io
 import os
 import time
+from functools import lru_cache
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 from reportlab.lib import colors
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
 from reportlab.lib.styles import getSampleStyleSheet
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from log_aggregator import aggregate_file
+from run_summaries import RunSummaryStore, combine
+
+
+@lru_cache(maxsize=128)
+def render_cost_chart(ai_cost, stt_cost, tts_cost):
+    """
+    Render the cost breakdown pie chart to PNG bytes.
+
+    Uses the object-oriented Agg API (no pyplot global state, no files), so
+    concurrent reports can render safely; identical inputs are memoized.
+    """
+    fig = Figure(figsize=(6, 4))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    labels = ['AI (Groq)', 'STT (Whisper)', 'TTS (Edge)']
+    colors = ['#3498db', '#e74c3c', '#2ecc71']
+
+    # Avoid 0 in pie chart
+    sizes = [max(s, 0.000001) for s in (ai_cost, stt_cost, tts_cost)]
+
+    ax.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%', startangle=140)
+    ax.set_title('Voice Bot Cost Breakdown')
+    ax.axis('equal')
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=100)
+    return buf.getvalue()
+
+
+@lru_cache(maxsize=32)
+def render_trend_chart(labels, total_costs, cost_per_query):
+    """Per-run total cost (bars) and cost per query (line) as PNG bytes."""
+    fig = Figure(figsize=(7, 4))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    x = range(len(labels))
+    ax.bar(x, total_costs, color='#3498db', label='Total cost ($)')
+    ax.set_ylabel('Total cost ($)')
+    ax.set_xticks(list(x))
+    ax.set_xticklabels(labels, rotation=45, ha='right', fontsize=7)
+    ax2 = ax.twinx()
+    ax2.plot(list(x), cost_per_query, color='#e74c3c', marker='o', label='Cost / query ($)')
+    ax2.set_ylabel('Cost / query ($)')
+    ax.set_title('Cost Trend Across Runs')
+    fig.tight_layout()
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=100)
+    return buf.getvalue()
+
 
 class ReportGenerator:
-    def __init__(self, logs_file):
+    def __init__(self, logs_file, output_pdf=None):
         self.logs_file = logs_file
-        self.output_pdf = f"voice_report_{int(time.time())}.pdf"
+        # Path or writable file-like object
+        self.output_pdf = output_pdf or f"voice_report_{int(time.time())}.pdf"
 
     def generate_charts(self, cost_breakdown):
-        # Generate Cost Breakdown Pie Chart
-        plt.figure(figsize=(6, 4))
-        labels = ['AI (Groq)', 'STT (Whisper)', 'TTS (Edge)']
-        sizes = [cost_breakdown['ai'], cost_breakdown['stt'], cost_breakdown['tts']]
-        colors = ['#3498db', '#e74c3c', '#2ecc71']
-        
-        # Avoid 0 in pie chart
-        sizes = [max(s, 0.000001) for s in sizes]
-        
-        plt.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%', startangle=140)
-        plt.title('Voice Bot Cost Breakdown')
-        plt.axis('equal')
-        plt.savefig('voice_cost_chart.png')
-        plt.close()
+        """Cost Breakdown Pie Chart as PNG bytes"""
+        return render_cost_chart(
+            round(cost_breakdown['ai'], 8),
+            round(cost_breakdown['stt'], 8),
+            round(cost_breakdown['tts'], 8)
+        )
 
     def create_pdf(self):
         # Read Data
@@ -38,20 +82,17 @@ class ReportGenerator:
         voice_queries = 0
         
         if os.path.exists(self.logs_file):
-            with open(self.logs_file, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    total_queries += 1
-                    total_ai_cost += float(row.get('ai_cost', 0))
-                    total_stt_cost += float(row.get('stt_cost', 0))
-                    total_tts_cost += float(row.get('tts_cost', 0))
-                    if row.get('mode') == 'voice':
-                        voice_queries += 1
+            agg = aggregate_file(self.logs_file)
+            total_queries = agg.count
+            total_ai_cost = agg.total('ai_cost')
+            total_stt_cost = agg.total('stt_cost')
+            total_tts_cost = agg.total('tts_cost')
+            voice_queries = agg.group('mode').get('voice', {}).get('count', 0)
         
         grand_total = total_ai_cost + total_stt_cost + total_tts_cost
         
         # Generate Charts
-        self.generate_charts({
+        chart_png = self.generate_charts({
             'ai': total_ai_cost,
             'stt': total_stt_cost,
             'tts': total_tts_cost
@@ -111,8 +152,7 @@ class ReportGenerator:
         msgs.append(Spacer(1, 12))
 
         # Chart
-        if os.path.exists('voice_cost_chart.png'):
-            msgs.append(Image('voice_cost_chart.png', width=400, height=300))
+        msgs.append(Image(io.BytesIO(chart_png), width=400, height=300))
 
         # 4. Recommendation
         msgs.append(Paragraph("4. Recommendation", styles['Heading2']))
@@ -125,13 +165,133 @@ class ReportGenerator:
         msgs.append(Paragraph(rec_text, styles['Normal']))
 
         doc.build(msgs)
-        
-        # Cleanup
-        if os.path.exists('voice_cost_chart.png'): os.remove('voice_cost_chart.png')
+
+class MultiRunReportGenerator:
+    """
+    Comparative report over several simulation runs.
+
+    Each run is summarized once (RunSummaryStore, keyed by file content
+    hash); rebuilding after a new run only parses the new log.
+    """
+
+    def __init__(self, logs_files, output_pdf=None, store=None):
+        self.logs_files = list(logs_files)
+        self.output_pdf = output_pdf or f"comparison_report_{int(time.time())}.pdf"
+        self.store = store or RunSummaryStore()
+
+    @staticmethod
+    def run_row(summary):
+        sums = summary["sums"]
+        ai, stt, tts = sums.get('ai_cost', 0.0), sums.get('stt_cost', 0.0), sums.get('tts_cost', 0.0)
+        total = ai + stt + tts
+        queries = summary["count"]
+        voice = summary["groups"].get('mode', {}).get('voice', {}).get('count', 0)
+        return {
+            'run': time.strftime('%Y-%m-%d %H:%M', time.gmtime(summary["run_timestamp"])),
+            'file': os.path.basename(summary["path"]),
+            'queries': queries,
+            'voice_queries': voice,
+            'ai': ai, 'stt': stt, 'tts': tts,
+            'total': total,
+            'per_query': total / queries if queries else 0.0,
+        }
+
+    def create_pdf(self):
+        summaries = self.store.summaries(p for p in self.logs_files if os.path.exists(p))
+        runs = [self.run_row(s) for s in summaries]
+        combined = combine(summaries)
+        total_ai = combined.total('ai_cost')
+        total_stt = combined.total('stt_cost')
+        total_tts = combined.total('tts_cost')
+        grand_total = total_ai + total_stt + total_tts
+
+        doc = SimpleDocTemplate(self.output_pdf, pagesize=letter)
+        msgs = []
+        styles = getSampleStyleSheet()
+        table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 8),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ])
+
+        msgs.append(Paragraph("Lira Cosmetics Voice AI - Multi-Run Comparison", styles['Title']))
+        msgs.append(Spacer(1, 24))
+
+        # 1. Overview
+        msgs.append(Paragraph("1. Overview", styles['Heading2']))
+        if runs:
+            period = f"{runs[0]['run']} to {runs[-1]['run']}"
+        else:
+            period = "no runs selected"
+        msgs.append(Paragraph(
+            f"{len(runs)} simulation runs ({period}), {combined.count} queries, "
+            f"total cost ${grand_total:.4f}.", styles['Normal']))
+        msgs.append(Spacer(1, 12))
+
+        # 2. Per-run comparison
+        msgs.append(Paragraph("2. Per-Run Comparison", styles['Heading2']))
+        data = [['Run (UTC)', 'Queries', 'Voice', 'AI', 'STT', 'TTS', 'Total', 'Per Query']]
+        for r in runs:
+            data.append([r['run'], r['queries'], r['voice_queries'], f"${r['ai']:.4f}", f"${r['stt']:.4f}",
+                         f"${r['tts']:.4f}", f"${r['total']:.4f}", f"${r['per_query']:.6f}"])
+        t = Table(data)
+        t.setStyle(table_style)
+        msgs.append(t)
+        msgs.append(Spacer(1, 12))
+
+        # 3. Trends
+        if runs:
+            msgs.append(Paragraph("3. Trends", styles['Heading2']))
+            if len(runs) > 1:
+                first, last = runs[0]['per_query'], runs[-1]['per_query']
+                change = ((last - first) / first * 100) if first else 0.0
+                msgs.append(Paragraph(
+                    f"Cost per query moved from ${first:.6f} to ${last:.6f} ({change:+.1f}%) "
+                    f"between the first and latest run.", styles['Normal']))
+            chart_png = render_trend_chart(
+                tuple(r['run'] for r in runs),
+                tuple(round(r['total'], 8) for r in runs),
+                tuple(round(r['per_query'], 8) for r in runs),
+            )
+            msgs.append(Image(io.BytesIO(chart_png), width=450, height=260))
+            msgs.append(Spacer(1, 12))
+
+            # 4. Combined breakdown
+            msgs.append(Paragraph("4. Combined Cost Breakdown", styles['Heading2']))
+            pie_png = render_cost_chart(round(total_ai, 8), round(total_stt, 8), round(total_tts, 8))
+            msgs.append(Image(io.BytesIO(pie_png), width=400, height=300))
+
+        doc.build(msgs)
+
 
 if __name__ == "__main__":
+    import argparse
     import glob
-    
+    from run_summaries import DEFAULT_RUN_GLOB, select_runs
+
+    parser = argparse.ArgumentParser(description="Generate the voice cost PDF report")
+    parser.add_argument("--compare", action="store_true", help="Comparative report across runs")
+    parser.add_argument("--runs", default=None, help=f"Glob of run logs (default: {DEFAULT_RUN_GLOB})")
+    parser.add_argument("--since", default=None, help="First run date, YYYY-MM-DD")
+    parser.add_argument("--until", default=None, help="Last run date, YYYY-MM-DD")
+    args = parser.parse_args()
+
+    if args.compare or args.runs or args.since or args.until:
+        runs = select_runs(args.runs, args.since, args.until)
+        if not runs:
+            print("No simulation logs match.")
+        else:
+            print(f"Comparing {len(runs)} runs...")
+            rg = MultiRunReportGenerator(runs)
+            rg.create_pdf()
+            print(f"Parsed {len(rg.store.parsed_files)} new log(s), {len(runs) - len(rg.store.parsed_files)} from cache")
+            print(f"Report generated: {rg.output_pdf}")
+        raise SystemExit(0)
+
     # Find latest voice simulation log
     log_files = glob.glob("logs/voice_simulation_*.csv")
     if log_files:
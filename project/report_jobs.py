@@ -0,0 +1,167 @@
+"""
+Background PDF report generation.
+
+Reports are built by ReportGenerator in a process pool (matplotlib and
+reportlab are CPU-bound and not thread-safe) and cached on disk by a content
+hash of the input log(s), so downloading a report for the same data twice is
+instant and concurrent requests for the same data share one job.
+"""
+import hashlib
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from config import Config
+from metrics import CACHE_REQUESTS, QUEUE_WAIT
+
+# Bump when the report layout changes so cached PDFs are regenerated
+REPORT_VERSION = "1"
+
+
+def _render_report(logs_file, output_pdf):
+    """Runs in a worker process. Returns the time the job actually started."""
+    started_at = time.time()
+    from report_generator import ReportGenerator, MultiRunReportGenerator
+    tmp_pdf = f"{output_pdf}.{os.getpid()}.tmp.pdf"
+    try:
+        if isinstance(logs_file, (list, tuple)):
+            MultiRunReportGenerator(logs_file, output_pdf=tmp_pdf).create_pdf()
+        else:
+            ReportGenerator(logs_file, output_pdf=tmp_pdf).create_pdf()
+        os.replace(tmp_pdf, output_pdf)
+    finally:
+        if os.path.exists(tmp_pdf):
+            os.remove(tmp_pdf)
+    return started_at
+
+
+class ReportJob:
+    def __init__(self, content_hash, output_pdf, logs_file):
+        self.id = uuid.uuid4().hex
+        self.content_hash = content_hash
+        self.output_pdf = output_pdf
+        self.logs_file = logs_file
+        self.created_at = time.time()
+        self.finished_at = None
+        self.future = None
+        self.cached = False
+
+    @property
+    def status(self):
+        if self.cached:
+            return "done"
+        if self.future is None or not self.future.done():
+            return "running" if self.future is not None and self.future.running() else "queued"
+        return "failed" if self.future.exception() else "done"
+
+    def wait(self, timeout=None):
+        """Block until the report exists (raises the worker's exception on failure)."""
+        if self.future is not None:
+            self.future.result(timeout=timeout)
+        return self.output_pdf
+
+    def to_dict(self):
+        data = {
+            "job_id": self.id,
+            "status": self.status,
+            "content_hash": self.content_hash,
+            "cached": self.cached,
+            "created_at": self.created_at,
+        }
+        if self.status == "failed":
+            data["error"] = str(self.future.exception())
+        return data
+
+
+class ReportJobQueue:
+    def __init__(self, cache_dir=None, max_workers=None, job_ttl=3600):
+        self.cache_dir = cache_dir or Config.REPORT_CACHE_DIR
+        self.max_workers = max_workers or Config.REPORT_WORKERS
+        self.job_ttl = job_ttl
+        self._executor = None
+        self._lock = threading.Lock()
+        self._jobs = {}           # job id -> ReportJob
+        self._inflight = {}       # content hash -> ReportJob still being built
+        self._hash_cache = {}     # (path, size, mtime_ns) -> content hash
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def content_hash(self, logs_file):
+        st = os.stat(logs_file)
+        key = (os.path.abspath(logs_file), st.st_size, st.st_mtime_ns)
+        cached = self._hash_cache.get(key)
+        if cached:
+            return cached
+        h = hashlib.sha256(REPORT_VERSION.encode())
+        with open(logs_file, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        self._hash_cache[key] = digest
+        return digest
+
+    def submit(self, logs_file):
+        """
+        Queue a report for `logs_file`, or a comparison report when given a
+        list of logs; returns a ReportJob (already done on a cache hit).
+        """
+        if isinstance(logs_file, (list, tuple)):
+            logs_file = list(logs_file)
+            h = hashlib.sha256(b"compare")
+            for path in logs_file:
+                h.update(self.content_hash(path).encode())
+            digest = h.hexdigest()
+            output_pdf = os.path.join(self.cache_dir, f"comparison_report_{digest[:16]}.pdf")
+        else:
+            digest = self.content_hash(logs_file)
+            output_pdf = os.path.join(self.cache_dir, f"voice_report_{digest[:16]}.pdf")
+        with self._lock:
+            self._prune()
+            job = ReportJob(digest, output_pdf, logs_file)
+            self._jobs[job.id] = job
+
+            if os.path.exists(output_pdf):
+                CACHE_REQUESTS.labels("report", "hit").inc()
+                job.cached = True
+                job.finished_at = time.time()
+                return job
+
+            inflight = self._inflight.get(digest)
+            if inflight is not None:
+                # Same data already being rendered: share its future
+                CACHE_REQUESTS.labels("report", "coalesced").inc()
+                job.future = inflight.future
+            else:
+                CACHE_REQUESTS.labels("report", "miss").inc()
+                os.makedirs(self.cache_dir, exist_ok=True)
+                job.future = self._get_executor().submit(_render_report, logs_file, output_pdf)
+                self._inflight[digest] = job
+        job.future.add_done_callback(lambda f, job=job: self._on_done(job, f))
+        return job
+
+    def _on_done(self, job, future):
+        job.finished_at = time.time()
+        with self._lock:
+            owner = self._inflight.get(job.content_hash) is job
+            if owner:
+                del self._inflight[job.content_hash]
+        if owner and future.exception() is None:
+            QUEUE_WAIT.labels("report").observe(max(0.0, future.result() - job.created_at))
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _prune(self):
+        cutoff = time.time() - self.job_ttl
+        for job_id in [j.id for j in self._jobs.values() if j.finished_at and j.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
@@ -0,0 +1,107 @@
+"""
+Per-run summaries for multi-period reports.
+
+Each simulation log is aggregated once and its summary stored in a JSON
+file keyed by the log's content hash. A stat index (path, size, mtime)
+-> hash means unchanged logs are not even re-read, so adding one new run
+only parses that run's file.
+"""
+import glob
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from config import Config
+from log_aggregator import Aggregate, aggregate_file, run_timestamp
+
+DEFAULT_RUN_GLOB = os.path.join("logs", "*simulation_*.csv")
+
+
+def select_runs(pattern=None, since=None, until=None):
+    """
+    Log files matching `pattern`, optionally limited to runs whose start date
+    is within [since, until] (YYYY-MM-DD, inclusive). Sorted by run time.
+    """
+    paths = glob.glob(pattern or DEFAULT_RUN_GLOB)
+    selected = []
+    for path in paths:
+        day = datetime.fromtimestamp(run_timestamp(path), tz=timezone.utc).strftime("%Y-%m-%d")
+        if since and day < since:
+            continue
+        if until and day > until:
+            continue
+        selected.append(path)
+    return sorted(selected, key=run_timestamp)
+
+
+class RunSummaryStore:
+    def __init__(self, path=None):
+        self.path = path or Config.RUN_SUMMARY_PATH
+        self._lock = threading.Lock()
+        self._data = None
+        self.parsed_files = []  # logs actually aggregated by this instance (for tests / logging)
+
+    def _load(self):
+        if self._data is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._data = json.load(f)
+            except (OSError, ValueError):
+                self._data = {}
+            self._data.setdefault("hashes", {})
+            self._data.setdefault("summaries", {})
+        return self._data
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._data, f)
+        os.replace(tmp, self.path)
+
+    def file_hash(self, path):
+        """Content hash of a log, re-read only when its size or mtime changed."""
+        st = os.stat(path)
+        key = f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}"
+        with self._lock:
+            data = self._load()
+            digest = data["hashes"].get(key)
+        if digest:
+            return digest
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        with self._lock:
+            self._data["hashes"][key] = digest
+        return digest
+
+    def summary(self, path):
+        """Summary dict for one run: {path, hash, run_timestamp, count, sums, groups}."""
+        digest = self.file_hash(path)
+        with self._lock:
+            cached = self._load()["summaries"].get(digest)
+        if cached is None:
+            cached = aggregate_file(path).to_dict()
+            self.parsed_files.append(path)
+            with self._lock:
+                self._data["summaries"][digest] = cached
+        return {"path": path, "hash": digest, "run_timestamp": run_timestamp(path), **cached}
+
+    def summaries(self, paths):
+        results = [self.summary(p) for p in paths]
+        with self._lock:
+            self._save()
+        return results
+
+
+def combine(summaries):
+    """Merge run summaries into one Aggregate."""
+    total = Aggregate()
+    for s in summaries:
+        part = Aggregate()
+        part.count, part.sums, part.groups = s["count"], s["sums"], s["groups"]
+        total.merge(part)
+    return total
@@ -0,0 +1,41 @@
+"""
+Incremental sentence splitting for streamed text (LLM deltas -> whole sentences).
+
+A sentence ends at . ! ? or the Bangla danda (।), optionally followed by
+closing quotes / brackets, once whitespace follows - so "$4.50" or a
+sentence still being written is never cut.
+"""
+import re
+
+SENTENCE_END = re.compile(r'[.!?।]+["\'”’)\]]*(?=\s)')
+
+
+class SentenceSplitter:
+    def __init__(self, min_chars=3):
+        self.min_chars = min_chars  # shorter pieces ("1.") are merged into the next sentence
+        self._buffer = ""
+
+    def feed(self, text):
+        """Add streamed text; returns the sentences it completed."""
+        self._buffer += text
+        sentences = []
+        start = 0
+        for match in SENTENCE_END.finditer(self._buffer):
+            sentence = self._buffer[start:match.end()].strip()
+            if len(sentence) < self.min_chars:
+                continue
+            sentences.append(" ".join(sentence.split()))
+            start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self):
+        """End of stream: the trailing text, if any, as a final sentence."""
+        rest = " ".join(self._buffer.split())
+        self._buffer = ""
+        return [rest] if rest else []
+
+    @classmethod
+    def split(cls, text, min_chars=3):
+        splitter = cls(min_chars)
+        return splitter.feed(text) + splitter.flush()
@@ -2,6 +2,8 @@ import random
 import time
 import csv
 import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from chatbot import Chatbot
 from config import Config
 from cost_calculator import CostCalculator
@@ -20,130 +22,168 @@ QUERY_TEMPLATES = [
     "Is {product} waterproof?"
 ]
 
+CSV_FIELDS = [
+    "customer_id", "mode", "query", "response", "ai_cost",
+    "stt_cost", "tts_cost", "total_cost", "input_tokens",
+    "output_tokens", "audio_duration"
+]
+
 SKIN_TYPES = ["dry", "oily", "sensitive", "normal", "combination", "mature", "acne-prone"]
 INGREDIENTS = ["parabens", "fragrance", "alcohol", "vitamin C", "retinol", "aloe vera"]
 
-def generate_random_query(products):
-    template = random.choice(QUERY_TEMPLATES)
-    product = random.choice(products)
+def generate_random_query(products, rng=random):
+    template = rng.choice(QUERY_TEMPLATES)
+    product = rng.choice(products)
     
     query = template.format(
         product=product['name'],
-        ingredient=random.choice(INGREDIENTS),
-        skin_type=random.choice(SKIN_TYPES),
+        ingredient=rng.choice(INGREDIENTS),
+        skin_type=rng.choice(SKIN_TYPES),
         brand=product['brand']
     )
     return query
 
-def run_simulation():
-    print("Initializing Simulation for 50 customers (Text + Voice)...")
-    bot = Chatbot()
-    products = bot.products
-    calc = CostCalculator()
-    
-    num_customers = 50
-    queries_per_customer_range = (4, 5)
-    
-    # 50% Voice Users
-    voice_user_ratio = 0.5
-    
-    simulation_results = []
-    
-    start_time = time.time()
-    
-    print(f"Simulating {num_customers} customers using {Config.DEFAULT_MODEL}...")
-    
-    total_tokens_input = 0
-    total_tokens_output = 0
-    total_stt_cost = 0
-    total_tts_cost = 0
-    total_queries = 0
-    
-    # Pre-calculated costs for voice reporting
-    
+def iter_customer_plans(products, num_customers, rng, queries_per_customer_range=(4, 5), voice_user_ratio=0.5):
+    """
+    Yield every customer's mode, queries and audio durations, drawn in
+    customer order from one seeded RNG, so the simulated inputs don't
+    depend on thread scheduling. Plans are generated lazily.
+    """
     for customer_i in range(1, num_customers + 1):
-        customer_id = f"sim_user_{customer_i}"
-        num_queries = random.randint(*queries_per_customer_range)
+        num_queries = rng.randint(*queries_per_customer_range)
+        mode = "voice" if rng.random() < voice_user_ratio else "text"
+        queries = []
+        for _ in range(num_queries):
+            query = generate_random_query(products, rng)
+            # Estimate 1 sec roughly per 2 words? Or just random 5-15s
+            audio_duration = rng.uniform(5.0, 15.0) if mode == "voice" else 0
+            queries.append((query, audio_duration))
+        yield {"customer_id": f"sim_user_{customer_i}", "mode": mode, "queries": queries}
+
+def simulate_customer(bot, calc, plan):
+    """Run one customer's queries in order; returns their result rows."""
+    customer_id = plan["customer_id"]
+    mode = plan["mode"]
+    rows = []
+    for query, audio_duration in plan["queries"]:
+        # Simulate processing
+        # For the purpose of this assignment, we use the real bot logic 
+        # but we assume audio costs based on text length for simulation speed
         
-        is_voice_user = random.random() < voice_user_ratio
-        mode = "voice" if is_voice_user else "text"
+        # 1. STT Simulation (if voice)
+        stt_cost = 0
+        if mode == "voice":
+            stt_cost, _ = calc.calculate_voice_costs(audio_duration, 0)
+
+        # 2. Bot Processing
+        # We use 'groq' as per requirement
+        response, ai_cost = bot.process_query(customer_id, query, model_service="groq")
         
-        print(f"Customer {customer_i} ({mode})...", end="\r")
+        # Retrieve token counts from the bot's internal tracking (log)
+        # This is bit of a hack to get the tokens out without changing process_query signature
+        session = bot.sessions.get(customer_id)
+        if session and session.logs:
+            last_log = session.logs[-1]
+            input_tok = last_log['input_tokens']
+            output_tok = last_log['output_tokens']
+        else:
+            input_tok = 0
+            output_tok = 0
         
-        for _ in range(num_queries):
-            query = generate_random_query(products)
-            total_queries += 1
-            
-            # Simulate processing
-            # For the purpose of this assignment, we use the real bot logic 
-            # but we assume audio costs based on text length for simulation speed
-            
-            # 1. STT Simulation (if voice)
-            stt_cost = 0
-            audio_duration = 0
-            if mode == "voice":
-                # Estimate 1 sec roughly per 2 words? Or just random 5-15s
-                audio_duration = random.uniform(5.0, 15.0) 
-                stt_cost, _ = calc.calculate_voice_costs(audio_duration, 0)
-                total_stt_cost += stt_cost
+        # 3. TTS Simulation (if voice)
+        tts_cost = 0
+        if mode == "voice":
+            # Edge TTS is free, but we track it logic anyway
+            char_count = len(response)
+            _, tts_cost = calc.calculate_voice_costs(0, char_count)
 
-            # 2. Bot Processing
-            # We use 'groq' as per requirement
-            response, ai_cost = bot.process_query(customer_id, query, model_service="groq")
-            
-            # Retrieve token counts from the bot's internal tracking (log)
-            # This is bit of a hack to get the tokens out without changing process_query signature
-            if bot.sessions[customer_id].logs:
-                last_log = bot.sessions[customer_id].logs[-1]
-                input_tok = last_log['input_tokens']
-                output_tok = last_log['output_tokens']
-                total_tokens_input += input_tok
-                total_tokens_output += output_tok
-            else:
-                input_tok = 0
-                output_tok = 0
-            
-            # 3. TTS Simulation (if voice)
-            tts_cost = 0
-            if mode == "voice":
-                # Edge TTS is free, but we track it logic anyway
-                char_count = len(response)
-                _, tts_cost = calc.calculate_voice_costs(0, char_count)
-                total_tts_cost += tts_cost
+        rows.append({
+            "customer_id": customer_id,
+            "mode": mode,
+            "query": query,
+            "response": response,
+            "ai_cost": ai_cost,
+            "stt_cost": stt_cost,
+            "tts_cost": tts_cost,
+            "total_cost": ai_cost + stt_cost + tts_cost,
+            "input_tokens": input_tok,
+            "output_tokens": output_tok,
+            "audio_duration": audio_duration
+        })
+    return rows
 
-            simulation_results.append({
-                "customer_id": customer_id,
-                "mode": mode,
-                "query": query,
-                "response": response,
-                "ai_cost": ai_cost,
-                "stt_cost": stt_cost,
-                "tts_cost": tts_cost,
-                "total_cost": ai_cost + stt_cost + tts_cost,
-                "input_tokens": input_tok,
-                "output_tokens": output_tok,
-                "audio_duration": audio_duration
-            })
+def _run_customers(bot, calc, plans, concurrency):
+    """
+    Yield (plan, rows) per customer, in customer order. With concurrency > 1
+    at most 2 * concurrency customers are in flight, so memory doesn't grow
+    with the number of customers.
+    """
+    if concurrency <= 1:
+        for plan in plans:
+            yield plan, simulate_customer(bot, calc, plan)
+        return
+    window = deque()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="sim") as pool:
+        for plan in plans:
+            window.append((plan, pool.submit(simulate_customer, bot, calc, plan)))
+            if len(window) >= 2 * concurrency:
+                plan_done, future = window.popleft()
+                yield plan_done, future.result()
+        while window:
+            plan_done, future = window.popleft()
+            yield plan_done, future.result()
 
-    print(f"\nSimulation Complete! Time: {time.time() - start_time:.2f}s")
+def run_simulation(num_customers=50, concurrency=1, seed=None):
+    """
+    Simulate customers against the real bot.
+
+    Rows are streamed to the CSV as each customer finishes and only running
+    totals are kept; finished customers' sessions are released, so memory
+    stays flat in the number of customers.
+
+    Args:
+        concurrency: customers processed in parallel (thread pool); each
+                     customer's queries still run in order
+        seed: makes the generated customers / queries reproducible
+    """
+    print(f"Initializing Simulation for {num_customers} customers (Text + Voice)...")
+    bot = Chatbot()
+    products = bot.products
+    calc = CostCalculator()
+    
+    plans = iter_customer_plans(products, num_customers, random.Random(seed))
+    totals = {"queries": 0, "ai_cost": 0.0, "stt_cost": 0.0, "tts_cost": 0.0,
+              "input_tokens": 0, "output_tokens": 0}
     
-    # Export logs
     os.makedirs("logs", exist_ok=True)
     csv_filename = f"logs/voice_simulation_{int(time.time())}.csv"
+    start_time = time.time()
+    
+    print(f"Simulating {num_customers} customers using {Config.DEFAULT_MODEL} "
+          f"(concurrency {concurrency}, seed {seed})...")
     
     with open(csv_filename, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=[
-            "customer_id", "mode", "query", "response", "ai_cost", 
-            "stt_cost", "tts_cost", "total_cost", "input_tokens", 
-            "output_tokens", "audio_duration"
-        ])
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
         writer.writeheader()
-        writer.writerows(simulation_results)
-        
+        for customer_i, (plan, rows) in enumerate(_run_customers(bot, calc, plans, concurrency), 1):
+            writer.writerows(rows)
+            for row in rows:
+                totals["queries"] += 1
+                for key in ("ai_cost", "stt_cost", "tts_cost", "input_tokens", "output_tokens"):
+                    totals[key] += row[key]
+            bot.end_session(plan["customer_id"])
+            print(f"Customer {customer_i} ({plan['mode']})...", end="\r")
+
+    elapsed = time.time() - start_time
+    total_queries = totals["queries"]
+    throughput = total_queries / elapsed if elapsed else 0
+    print(f"\nSimulation Complete! Time: {elapsed:.2f}s ({throughput:.1f} queries/s)")
     print(f"Detailed logs saved to {csv_filename}")
     
     # Summary Report
-    total_ai_cost = sum(r['ai_cost'] for r in simulation_results)
+    total_ai_cost = totals["ai_cost"]
+    total_stt_cost = totals["stt_cost"]
+    total_tts_cost = totals["tts_cost"]
     grand_total = total_ai_cost + total_stt_cost + total_tts_cost
     
     print("\n--- Final Cost Analysis ---")
@@ -152,7 +192,9 @@ def run_simulation():
     print(f"STT Cost (Whisper): ${total_stt_cost:.6f}")
     print(f"TTS Cost (Edge): ${total_tts_cost:.6f}")
     print(f"GRAND TOTAL: ${grand_total:.6f}")
+    print(f"Throughput: {throughput:.2f} queries/s wall-clock")
     print("-" * 30)
+    return csv_filename
 
 if __name__ == "__main__":
     run_simulation()
@@ -0,0 +1,171 @@
+"""
+Live admin stats over Server-Sent Events.
+
+Chatbot.process_query and the voice routes publish small delta events
+(new query, voice cost). Each connected dashboard gets its own bounded
+buffer: publishing only appends to in-memory deques and never waits on a
+client, so a slow or stalled dashboard can't hold up request handling.
+When a client falls behind, its oldest events are dropped and it is told
+to resync from /api/stats.
+"""
+import json
+import threading
+import time
+from collections import deque
+from config import Config
+
+
+class Subscriber:
+    def __init__(self, maxlen):
+        self.events = deque(maxlen=maxlen)
+        self.dropped = 0
+        self.cond = threading.Condition()
+        self.closed = False
+        self.snapshot = None  # (totals, seq) taken when subscribing
+
+    def push(self, event):
+        with self.cond:
+            if len(self.events) == self.events.maxlen:
+                self.dropped += 1
+            self.events.append(event)
+            self.cond.notify()
+
+    def pop_all(self, timeout):
+        """Wait up to `timeout` seconds for events; returns (events, dropped_count)."""
+        with self.cond:
+            if not self.events and not self.closed:
+                self.cond.wait(timeout)
+            events = list(self.events)
+            self.events.clear()
+            dropped, self.dropped = self.dropped, 0
+        return events, dropped
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+
+
+class TooManySubscribersError(RuntimeError):
+    pass
+
+
+class StatsBroadcaster:
+    """Fan-out of stats deltas to SSE clients, plus running totals since start."""
+
+    def __init__(self, buffer_size=None, max_subscribers=None):
+        self.buffer_size = buffer_size or Config.STATS_STREAM_BUFFER
+        self.max_subscribers = max_subscribers or Config.STATS_STREAM_MAX_CLIENTS
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._seq = 0
+        self.totals = {
+            "queries": 0,
+            "cost": 0.0,
+            "models": {},
+            "voice": {"stt": 0.0, "tts": 0.0},
+        }
+
+    def subscribe(self):
+        """
+        New subscriber. The totals snapshot is taken under the same lock, so
+        every event it will receive is newer than the snapshot.
+        """
+        with self._lock:
+            self.check_capacity()
+            sub = Subscriber(self.buffer_size)
+            sub.snapshot = (json.loads(json.dumps(self.totals)), self._seq)
+            self._subscribers.add(sub)
+        return sub
+
+    def check_capacity(self):
+        """Raise TooManySubscribersError when subscribe() would (reserves nothing)."""
+        if len(self._subscribers) >= self.max_subscribers:
+            raise TooManySubscribersError("Too many live dashboard clients")
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+        sub.close()
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def publish(self, event_type, data):
+        with self._lock:
+            self._seq += 1
+            event = (self._seq, event_type, data)
+            self._apply_to_totals(event_type, data)
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            sub.push(event)
+
+    def _apply_to_totals(self, event_type, data):
+        if event_type == "query":
+            self.totals["queries"] += 1
+            self.totals["cost"] += data.get("cost", 0)
+            model = self.totals["models"].setdefault(data.get("model", "unknown"), {"cost": 0.0, "input": 0, "output": 0})
+            model["cost"] += data.get("cost", 0)
+            model["input"] += data.get("input_tokens", 0)
+            model["output"] += data.get("output_tokens", 0)
+        elif event_type == "voice_cost":
+            kind = data.get("kind")
+            if kind in self.totals["voice"]:
+                self.totals["voice"][kind] += data.get("cost", 0)
+
+    def publish_query(self, model, input_tokens, output_tokens, cost, response_time):
+        self.publish("query", {
+            "model": model,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "cost": cost,
+            "response_time": round(response_time, 4),
+            "timestamp": time.time(),
+        })
+
+    def publish_voice_cost(self, kind, cost, duration_seconds=0, character_count=0, service=""):
+        self.publish("voice_cost", {
+            "kind": kind,
+            "cost": cost,
+            "duration_seconds": duration_seconds,
+            "character_count": character_count,
+            "service": service,
+            "timestamp": time.time(),
+        })
+
+    def stream(self, sub=None, heartbeat=15.0):
+        """
+        Generator of SSE frames for one subscriber; unsubscribes when the client goes away.
+
+        Without `sub` it subscribes on its first read, so a response closed before
+        it was ever read (a generator that never started runs no finally) holds
+        no slot. If the last slot was taken in between, it sends one "error" frame.
+        """
+        if sub is None:
+            try:
+                sub = self.subscribe()
+            except TooManySubscribersError as e:
+                yield format_sse("error", {"error": str(e)})
+                return
+        try:
+            totals, seq = sub.snapshot
+            yield format_sse("totals", totals, seq)
+            while not sub.closed:
+                events, dropped = sub.pop_all(heartbeat)
+                if dropped:
+                    yield format_sse("resync", {"dropped": dropped})
+                for seq, event_type, data in events:
+                    yield format_sse(event_type, data, seq)
+                if not events and not dropped:
+                    yield ": keep-alive\n\n"
+        finally:
+            self.unsubscribe(sub)
+
+
+def format_sse(event_type, data, event_id=None):
+    frame = f"event: {event_type}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+    return f"id: {event_id}\n{frame}" if event_id is not None else frame
+
+
+broadcaster = StatsBroadcaster()
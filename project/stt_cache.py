@@ -0,0 +1,216 @@
+"""
+Content-addressed cache of speech-to-text results.
+
+Mobile clients retry an upload after a timeout, and every retry used to be
+another billed Whisper call. Results are keyed by a BLAKE2b hash of the
+normalized audio plus service / language / translate, and kept in two
+tiers: an in-memory LRU (STT_CACHE_SIZE entries) in front of one JSON file
+per key under STT_CACHE_DIR (pruned to STT_CACHE_DISK_ENTRIES), both expiring
+after STT_CACHE_TTL seconds. Concurrent identical uploads are coalesced:
+the first one calls the provider, the others wait for its result.
+
+Normalization hashes the audio payload only, so a retry whose container
+metadata changed (WAV LIST/INFO chunks, an ID3 tag) still hits.
+"""
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from config import Config
+from metrics import CACHE_REQUESTS
+
+# Bump when the cached result format changes
+CACHE_VERSION = "1"
+CHUNK_BYTES = 1 << 20
+PRUNE_EVERY = 100  # disk puts between quota checks
+
+
+def _read_chunks(audio):
+    """Yield the bytes of a path, bytes-like object or seekable file (its position is restored)."""
+    if isinstance(audio, (str, os.PathLike)):
+        with open(audio, "rb") as f:
+            yield from iter(lambda: f.read(CHUNK_BYTES), b"")
+    elif isinstance(audio, (bytes, bytearray, memoryview)):
+        view = memoryview(audio).cast("B")
+        for i in range(0, len(view), CHUNK_BYTES):
+            yield view[i:i + CHUNK_BYTES]
+    else:
+        start = audio.tell()
+        try:
+            yield from iter(lambda: audio.read(CHUNK_BYTES), b"")
+        finally:
+            audio.seek(start)
+
+
+def _payload_offset(head):
+    """
+    (format bytes, offset where the audio payload starts): skips WAV chunks
+    before "data" (keeping "fmt ") and ID3v2 tags; 0 for anything else.
+    """
+    if head[:4] in (b"RIFF", b"RF64") and head[8:12] == b"WAVE":
+        pos, fmt = 12, b""
+        while pos + 8 <= len(head):
+            chunk_id = head[pos:pos + 4]
+            size = struct.unpack_from("<I", head, pos + 4)[0]
+            if chunk_id == b"fmt ":
+                fmt = bytes(head[pos + 8:pos + 8 + size])
+            elif chunk_id == b"data":
+                return fmt, pos + 8
+            pos += 8 + size + (size & 1)
+    elif head[:3] == b"ID3" and len(head) >= 10:
+        tag_size = (head[6] & 0x7F) << 21 | (head[7] & 0x7F) << 14 | (head[8] & 0x7F) << 7 | (head[9] & 0x7F)
+        return b"", 10 + tag_size + (10 if head[5] & 0x10 else 0)
+    return b"", 0
+
+
+def cache_key(audio, model_service, language=None, translate=False):
+    """Hex digest of the normalized audio and the transcription options."""
+    h = hashlib.blake2b(digest_size=20)
+    h.update(json.dumps([CACHE_VERSION, model_service, language or "", bool(translate)]).encode())
+    skip = None
+    for chunk in _read_chunks(audio):
+        if skip is None:
+            fmt, skip = _payload_offset(bytes(chunk[:64 * 1024]))
+            h.update(fmt)
+        if skip >= len(chunk):
+            skip -= len(chunk)
+            continue
+        h.update(chunk[skip:])
+        skip = 0
+    return h.hexdigest()
+
+
+class STTCache:
+    def __init__(self, cache_dir=None, max_entries=None, ttl=None, max_disk_entries=None):
+        self.cache_dir = Config.STT_CACHE_DIR if cache_dir is None else cache_dir
+        self.max_entries = Config.STT_CACHE_SIZE if max_entries is None else max_entries
+        self.ttl = Config.STT_CACHE_TTL if ttl is None else ttl
+        self.max_disk_entries = Config.STT_CACHE_DISK_ENTRIES if max_disk_entries is None else max_disk_entries
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()   # key -> (created_at, result), least recently used first
+        self._inflight = {}            # key -> Future of the provider call in progress
+        self._puts = 0
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key):
+        """(result, tier) from memory or disk, or (None, None)."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if now - entry[0] < self.ttl:
+                    self._memory.move_to_end(key)
+                    return entry[1], "memory"
+                del self._memory[key]
+        if not self.cache_dir:
+            return None, None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None, None
+        if now - entry.get("created_at", 0) >= self.ttl:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None, None
+        self._remember(key, entry["created_at"], entry["result"])
+        return entry["result"], "disk"
+
+    def put(self, key, result):
+        created_at = time.time()
+        result = dict(result)  # callers annotate the dict they get back
+        self._remember(key, created_at, result)
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"created_at": created_at, "result": result}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        with self._lock:
+            self._puts += 1
+            prune = self._puts % PRUNE_EVERY == 0
+        if prune:
+            self.prune()
+
+    def _remember(self, key, created_at, result):
+        with self._lock:
+            self._memory[key] = (created_at, result)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def prune(self):
+        """Drop expired disk entries, then the oldest ones over max_disk_entries."""
+        entries = []
+        cutoff = time.time() - self.ttl
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    mtime = os.stat(path).st_mtime
+                    if mtime < cutoff:
+                        os.remove(path)
+                    else:
+                        entries.append((mtime, path))
+                except OSError:
+                    pass
+        entries.sort()
+        for _, path in entries[:max(0, len(entries) - self.max_disk_entries)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def get_or_transcribe(self, key, transcribe):
+        """
+        Cached result, or `transcribe()` shared by every concurrent caller with
+        the same key. Returns (result, how): how is "memory", "disk",
+        "coalesced" or None when this call ran the provider. Error results are
+        shared with waiting callers but not cached.
+        """
+        result, tier = self.get(key)
+        if result is not None:
+            CACHE_REQUESTS.labels("stt", "hit" if tier == "memory" else "disk_hit").inc()
+            return result, tier
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner and key in self._memory:
+                # Another caller finished between get() and taking the lock
+                CACHE_REQUESTS.labels("stt", "hit").inc()
+                return self._memory[key][1], "memory"
+            if owner:
+                future = self._inflight[key] = Future()
+        if not owner:
+            CACHE_REQUESTS.labels("stt", "coalesced").inc()
+            return future.result(), "coalesced"
+
+        CACHE_REQUESTS.labels("stt", "miss").inc()
+        try:
+            result = transcribe()
+            if not result.get("error"):
+                try:
+                    self.put(key, result)
+                except OSError as e:
+                    print(f"Warning: could not write STT cache entry: {e}")
+            future.set_result(result)
+            return result, None
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
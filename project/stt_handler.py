@@ -1,6 +1,18 @@
+import contextvars
+import io
 import os
+import tempfile
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
 from config import Config
+from metrics import STT_LATENCY, STT_REQUESTS, STT_PREPROCESS_SAVED, QUEUE_WAIT
+from tracing import span
+from cassette import get_cassette
+from cost_calculator import CostCalculator
+import audio_preprocess
+from audio_probe import probe_duration, read_head
+from stt_cache import STTCache, cache_key
 try:
     from groq import Groq
 except ImportError:
@@ -10,6 +22,200 @@ try:
 except ImportError:
     openai = None
 
+class RecordingTooLongError(ValueError):
+    pass
+
+
+class STTBusyError(RuntimeError):
+    pass
+
+
+_race_executor = None
+_race_executor_lock = threading.Lock()
+_hedge_slots = None
+
+
+def _get_race_executor():
+    """Pool for secondary (hedge) attempts only, and the slots that keep them from queueing."""
+    global _race_executor, _hedge_slots
+    with _race_executor_lock:
+        if _race_executor is None:
+            _race_executor = ThreadPoolExecutor(max_workers=Config.STT_RACE_WORKERS, thread_name_prefix="stt-race")
+            _hedge_slots = threading.BoundedSemaphore(Config.STT_RACE_WORKERS)
+    return _race_executor, _hedge_slots
+
+
+def _start_thread(fn, *args):
+    """Run fn(*args) on a new thread right away (no shared pool to queue in); returns its Future."""
+    future = Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+    threading.Thread(target=run, name="stt-primary", daemon=True).start()
+    return future
+
+
+class _BufferReader(io.RawIOBase):
+    """Seekable read-only file over a bytes-like object, without copying it."""
+
+    def __init__(self, buffer):
+        self._view = memoryview(buffer).cast("B")
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        if self.closed:
+            # Closing the reader aborts an upload still in progress (cancelled race attempt)
+            raise ValueError("I/O operation on closed file")
+        n = min(len(b), len(self._view) - self._pos)
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._view)}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+
+class _FileReader(io.RawIOBase):
+    """
+    Read-only view of a caller's file from its current position. Closing the
+    view aborts an upload still reading through it but leaves the file open.
+    """
+
+    def __init__(self, file):
+        self._file = file
+        self._start = file.tell()
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        if self.closed:
+            raise ValueError("I/O operation on closed file")
+        data = self._file.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            offset += self._start
+        return self._file.seek(offset, whence) - self._start
+
+    def tell(self):
+        return self._file.tell() - self._start
+
+
+class _DescriptorReader(io.RawIOBase):
+    """Reader with its own offset over a duplicate of `fd` (os.pread), from byte `start`."""
+
+    def __init__(self, fd, start=0):
+        self._fd = os.dup(fd)
+        self._start = start
+        self._pos = 0
+        self._fd_lock = threading.Lock()
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        # Under the lock so close() can't free the descriptor number mid-read
+        with self._fd_lock:
+            if self._fd is None:
+                raise ValueError("I/O operation on closed file")
+            data = os.pread(self._fd, len(b), self._start + self._pos)
+        b[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_END:
+            offset += os.fstat(self._fd).st_size - self._start
+        elif whence == io.SEEK_CUR:
+            offset += self._pos
+        self._pos = max(0, offset)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def close(self):
+        with self._fd_lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+        super().close()
+
+
+def _reader_factory(file):
+    """
+    Callable returning a new reader over `file` from its current position that
+    leaves `file`'s own offset alone, so a second upload can run next to one
+    streaming `file`; None when the file can't be shared that way.
+    """
+    try:
+        start = file.tell()
+    except (AttributeError, OSError, ValueError):
+        return None
+    if isinstance(file, _BufferReader):
+        view = file._view[start:]
+        return lambda: _BufferReader(view)
+    if isinstance(file, tempfile.SpooledTemporaryFile) and not file._rolled:
+        file = file._file  # still in memory (fileno() would roll it over to disk)
+    if isinstance(file, io.BytesIO):
+        return lambda: _BufferReader(file.getvalue()[start:])
+    if not hasattr(os, "pread"):
+        return None
+    try:
+        fd = file.fileno()
+    except (AttributeError, OSError, ValueError):
+        return None
+    return lambda: _DescriptorReader(fd, start)
+
+
+def _open_audio(audio):
+    """
+    (file object, size or None, should_close) for a path, bytes-like object or
+    binary file-like object (e.g. an upload's spooled stream).
+    """
+    if isinstance(audio, (str, os.PathLike)):
+        f = open(audio, "rb")
+        return f, os.fstat(f.fileno()).st_size, True
+    if isinstance(audio, (bytes, bytearray, memoryview)):
+        reader = _BufferReader(audio)
+        return reader, len(reader._view), True
+    if not hasattr(audio, "read"):
+        raise TypeError(f"Unsupported audio input: {type(audio).__name__}")
+    size = None
+    try:
+        start = audio.tell()
+        size = audio.seek(0, io.SEEK_END) - start
+        audio.seek(start)
+    except (AttributeError, OSError, ValueError):
+        pass  # non-seekable stream: duration falls back to the provider's figure
+    return audio, size, False
+
+
 class STTHandler:
     """Handles Speech-to-Text conversion using Groq Whisper or OpenAI Whisper"""
     
@@ -17,40 +223,66 @@ class STTHandler:
         # Initialize Groq
         self.groq_client = None
         if Config.GROQ_API_KEY and Groq:
-            self.groq_client = Groq(api_key=Config.GROQ_API_KEY)
+            self.groq_client = Groq(api_key=Config.GROQ_API_KEY, base_url=Config.GROQ_BASE_URL)
         else:
             print("Warning: GROQ_API_KEY not found or SDK missing.")
 
         # Initialize OpenAI
         self.openai_client = None
         if Config.OPENAI_API_KEY and openai:
-            self.openai_client = openai.OpenAI(api_key=Config.OPENAI_API_KEY)
+            self.openai_client = openai.OpenAI(api_key=Config.OPENAI_API_KEY, base_url=Config.OPENAI_BASE_URL)
         else:
             print("Warning: OPENAI_API_KEY not found or SDK missing.")
             
+        # Record / replay of provider calls (None unless CASSETTE_MODE is set)
+        self.cassette = get_cassette()
+        self.cost_calculator = CostCalculator()
+        # Retried / duplicate uploads are answered from here (None disables)
+        self.cache = STTCache() if Config.STT_CACHE else None
+        # Called with the result of a losing race attempt that finishes after the
+        # winner was returned: it was billed but isn't in that response's cost
+        self.on_late_result = None
+        # Recordings over STT_LONG_SECONDS (by header probe) share these slots
+        self._long_slots = threading.BoundedSemaphore(Config.STT_LONG_CONCURRENCY)
+
         # Pricing (approximate for estimation)
         self.cost_per_minute_groq = 0.00185 # $0.111 per hour
         self.cost_per_minute_openai = 0.006 # $0.006 per minute (Whisper)
     
-    def transcribe_audio(self, audio_file_path, model_service="groq", language=None, translate=False):
+    def transcribe_audio(self, audio, model_service="groq", language=None, translate=False, filename=None,
+                         preprocess=None, cache=True):
         """
-        Transcribe audio file to text using specified service
+        Transcribe audio to text using specified service
         
         Args:
-            audio_file_path: Path to audio file (WAV, MP3, etc.)
+            audio: Path to an audio file (WAV, MP3, etc.), bytes / memoryview,
+                or a binary file-like object; streamed to the provider as-is
             model_service: "groq" or "openai"
+            filename: Name sent to the provider (its extension tells Whisper
+                the format); defaults to the path's basename or "audio.webm"
+            preprocess: trim silence / resample before upload (audio_preprocess);
+                defaults to Config.STT_PREPROCESS
+            cache: look up / store the result in self.cache (stt_cache); a hit
+                or a coalesced duplicate costs nothing and has "cached" set
         
         Returns:
-            dict: {text, duration_seconds, cost, confidence, language}
+            dict: {text, duration_seconds, cost, confidence, language, preprocessing, cached}
+
+        Raises:
+            RecordingTooLongError: probed duration is over Config.STT_MAX_SECONDS
+            STTBusyError: no long-recording slot freed up within Config.STT_QUEUE_TIMEOUT
         """
         start_time = time.time()
         
+        # Pure replay needs no provider clients
+        replaying = self.cassette is not None and self.cassette.mode == "replay"
+
         # Fallback if requested service is not available
-        if model_service == "openai" and not self.openai_client:
+        if model_service == "openai" and not self.openai_client and not replaying:
             print("OpenAI client not ready, falling back to Groq")
             model_service = "groq"
         
-        if model_service == "groq" and not self.groq_client:
+        if model_service == "groq" and not self.groq_client and not replaying:
              return {
                 "text": "",
                 "error": "No STT service available (Keys missing)",
@@ -58,84 +290,350 @@ class STTHandler:
                 "cost": 0
             }
 
+        if filename is None:
+            filename = os.path.basename(audio) if isinstance(audio, (str, os.PathLike)) else "audio.webm"
+
+        if preprocess is None:
+            preprocess = Config.STT_PREPROCESS
+        # Cassettes record / replay provider calls, so they bypass the result cache
+        if not cache or self.cache is None or self.cassette is not None:
+            return self._transcribe(audio, model_service, language, translate, filename, preprocess)
+
+        try:
+            key = cache_key(audio, model_service, language, translate)
+        except (OSError, ValueError, AttributeError, TypeError):
+            # Unreadable / non-seekable input: transcribe without the cache
+            return self._transcribe(audio, model_service, language, translate, filename, preprocess)
+        result, how = self.cache.get_or_transcribe(
+            key, lambda: self._transcribe(audio, model_service, language, translate, filename, preprocess))
+        result = dict(result)
+        if how is not None:
+            # Already paid for by the original request
+            result.update({"cost": 0.0, "cached": how, "processing_time": time.time() - start_time})
+            result.pop("preprocessing", None)
+        else:
+            result["cached"] = False
+        return result
+
+    def _transcribe(self, audio, model_service, language, translate, filename, preprocess):
+        """transcribe_audio without the cache."""
+        start_time = time.time()
+        preprocessing = None
+
+        # Container headers only: microseconds, before any decode or provider call
+        probed_seconds = probe_duration(audio)
+        slot = self._admit(probed_seconds)
+
+        file = None
+        should_close = False
+        secondary = None
         try:
             text = ""
             duration_seconds = 0
             cost = 0
             
-            with open(audio_file_path, 'rb') as file:
-                # File size for fallback duration
-                file.seek(0, 2)
-                file_size = file.tell()
-                file.seek(0)
-                
-                if model_service == "openai":
-                    # OpenAI Whisper
-                    kwargs = {
-                        "model": "whisper-1",
-                        "file": file,
-                        "response_format": "verbose_json",
-                    }
-                    if language:
-                        kwargs["language"] = language
-                    if translate:
-                        kwargs["task"] = "translate"
-                    transcription = self.openai_client.audio.transcriptions.create(**kwargs)
-                    text = transcription.text
-                    duration_seconds = getattr(transcription, 'duration', 0)
-                    cost = (duration_seconds / 60.0) * self.cost_per_minute_openai
+            if preprocess:
+                audio, filename, preprocessing = self._preprocess(audio, filename, model_service)
+            file, file_size, should_close = _open_audio(audio)
+            # Used when the provider omits the duration: trimmed length, then header probe, then size
+            fallback_seconds = ((preprocessing or {}).get("billed_seconds") or probed_seconds
+                                or (self._estimate_duration(file_size) if file_size else 0))
+            secondary = self._race_partner(model_service)
+            if secondary is not None:
+                result = self._race(file, filename, model_service, secondary, language, translate, fallback_seconds)
+                model_service = result["service"]
+            else:
+                result = self._call_provider(file, filename, model_service, language, translate, fallback_seconds)
+            text, duration_seconds, cost = result["text"], result["duration_seconds"], result["cost"]
 
-                else:
-# Groq Whisper (Default)
-                    kwargs = {
-                        "file": (os.path.basename(audio_file_path), file.read()),
-                        "model": "whisper-large-v3",
-                        "response_format": "verbose_json",
-                    }
-                    if language:
-                        kwargs["language"] = language
-                    if translate:
-                        kwargs["task"] = "translate"
-                    if language == "bn":
-                        kwargs["prompt"] = "বাংলা ভাষা"
-                    try:
-                        transcription = self.groq_client.audio.transcriptions.create(**kwargs)
-                    except TypeError:
-                        # Retry without language if SDK doesn't support it
-                        kwargs.pop("language", None)
-                        kwargs.pop("task", None)
-                        kwargs.pop("prompt", None)
-                        transcription = self.groq_client.audio.transcriptions.create(**kwargs)
-                    text = transcription.text
-                    duration_seconds = getattr(transcription, 'duration', 0)
-                    cost = (duration_seconds / 60.0) * self.cost_per_minute_groq
-            
-            # Fallback duration calculation
-            if duration_seconds == 0:
-                duration_seconds = self._estimate_duration(file_size)
-                if cost == 0: # Recalculate cost if it was dependent on 0 duration
-                     rate = self.cost_per_minute_openai if model_service == "openai" else self.cost_per_minute_groq
-                     cost = (duration_seconds / 60.0) * rate
-
-            return {
+            processing_time = time.time() - start_time
+            if secondary is None:  # race attempts record their own
+                STT_LATENCY.labels(model_service).observe(processing_time)
+                STT_REQUESTS.labels(model_service, "success").inc()
+
+            response = {
                 "text": text,
                 "duration_seconds": round(duration_seconds, 2),
                 "cost": round(cost, 6),
-                "language": getattr(transcription, "language", None),
+                "language": result.get("language"),
                 "service": model_service,
-                "processing_time": time.time() - start_time
+                "processing_time": processing_time
             }
+            if preprocessing is not None:
+                response["preprocessing"] = preprocessing
+            if secondary is not None:
+                response["race"] = result["race"]
+            return response
             
         except Exception as e:
             print(f"STT Error ({model_service}): {e}")
+            if secondary is None:
+                STT_REQUESTS.labels(model_service, "error").inc()
             return {
                 "text": "",
                 "error": str(e),
                 "duration_seconds": 0,
                 "cost": 0
             }
-    
+        finally:
+            if should_close and file is not None:
+                file.close()
+            if slot is not None:
+                slot.release()
+
+    def _call_provider(self, file, filename, model_service, language, translate, fallback_seconds):
+        """Single provider call (through the cassette when one is active), billed."""
+        with span("stt.provider_call", service=model_service):
+            if self.cassette is not None:
+                # Fingerprinting needs the bytes
+                data = file.read()
+                reader = _BufferReader(data)
+                request = {"service": model_service, "audio": data,
+                           "language": language, "translate": bool(translate)}
+                result, _ = self.cassette.replay_or_record(
+                    "stt", request,
+                    lambda: (self._transcribe_live(reader, filename, model_service, language, translate), None),
+                    usage_keys=("duration_seconds",))
+            else:
+                result = self._transcribe_live(file, filename, model_service, language, translate)
+        return self._bill(result, model_service, fallback_seconds)
+
+    def _bill(self, result, model_service, fallback_seconds):
+        """Fill in duration / cost when the provider omitted the duration."""
+        if result["duration_seconds"] == 0 and fallback_seconds:
+            result = dict(result, duration_seconds=fallback_seconds)
+            if result["cost"] == 0:  # Recalculate cost if it was dependent on 0 duration
+                rate = self.cost_per_minute_openai if model_service == "openai" else self.cost_per_minute_groq
+                result["cost"] = (fallback_seconds / 60.0) * rate
+        return result
+
+    def _race_partner(self, model_service):
+        """The service to hedge with after STT_RACE_DEADLINE, or None when racing is off / impossible."""
+        if Config.STT_RACE_DEADLINE <= 0 or self.cassette is not None:
+            return None
+        if model_service == "groq" and self.openai_client:
+            return "openai"
+        if model_service == "openai" and self.groq_client:
+            return "groq"
+        return None
+
+    def _attempt(self, reader, filename, model_service, language, translate, fallback_seconds):
+        """One race entrant: provider call on its own reader, with metrics and billing."""
+        started = time.time()
+        try:
+            with span("stt.provider_call", service=model_service, race=True):
+                result = self._transcribe_live(reader, filename, model_service, language, translate)
+        except Exception:
+            STT_REQUESTS.labels(model_service, "cancelled" if reader.closed else "error").inc()
+            raise
+        STT_LATENCY.labels(model_service).observe(time.time() - started)
+        STT_REQUESTS.labels(model_service, "success").inc()
+        result = self._bill(result, model_service, fallback_seconds)
+        result["service"] = model_service
+        return result
+
+    def _race(self, file, filename, primary, secondary, language, translate, fallback_seconds):
+        """
+        Latency-budgeted transcription: `primary` first, `secondary` as well when
+        the primary hasn't answered within Config.STT_RACE_DEADLINE seconds of
+        starting (or failed). The first success wins; a loser still uploading is
+        cancelled by closing its reader, and one that completes anyway is
+        reported through on_late_result so its cost is logged.
+
+        The primary runs on its own thread, so racing never caps how many
+        transcriptions run at once. Secondaries share STT_RACE_WORKERS slots;
+        when all are busy the request waits for its primary instead of hedging,
+        so a loaded system doesn't double its billed calls.
+
+        Returns the winner's result plus "race": {primary, winner, attempts};
+        "cost" covers every attempt that had finished by then.
+        """
+        # The primary streams `file` itself; a hedge gets its own reader, made only if it starts
+        hedge_reader = _reader_factory(file)
+        if hedge_reader is None:
+            # Not shareable with a concurrent upload (e.g. a non-seekable stream): buffer it
+            file = _BufferReader(file.read())
+            hedge_reader = _reader_factory(file)
+        executor, hedge_slots = _get_race_executor()
+        readers = {}
+        launched = {}
+
+        def launch(model_service, hedge=False):
+            if hedge and not hedge_slots.acquire(blocking=False):
+                return False
+            if not hedge:
+                readers[model_service] = _FileReader(file)
+            else:
+                try:
+                    readers[model_service] = hedge_reader()
+                except OSError:  # e.g. out of file descriptors: no hedge
+                    hedge_slots.release()
+                    return False
+            ctx = contextvars.copy_context()  # keep the attempt's span under this request
+            args = (ctx.run, self._attempt, readers[model_service], filename, model_service,
+                    language, translate, fallback_seconds)
+            if hedge:
+                future = executor.submit(*args)
+                future.add_done_callback(lambda _: hedge_slots.release())
+            else:
+                future = _start_thread(*args)
+            launched[future] = model_service
+            return True
+
+        def first_success(done):
+            for future in done:
+                if future.exception() is None and not future.result().get("error"):
+                    return future
+            return None
+
+        with span("stt.race", primary=primary, secondary=secondary) as race_span:
+            launch(primary)
+            done, _ = wait(list(launched), timeout=Config.STT_RACE_DEADLINE)
+            winner = first_success(done)
+            if winner is None and not launch(secondary, hedge=True):
+                # Primary is slow or failed but every hedge slot is busy: no hedge under load
+                race_span.set_attribute("hedge_skipped", True)
+            pending = {f for f in launched if not f.done()}
+            while winner is None and pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                winner = first_success(done)
+            race_span.set_attribute("winner", launched[winner] if winner else None)
+
+        if winner is None:
+            for reader in readers.values():
+                reader.close()
+            raise next(iter(launched)).exception() or RuntimeError("All STT attempts failed")
+
+        result = dict(winner.result())
+        attempts = []
+        for future, model_service in launched.items():
+            attempt = {"service": model_service, "cost": 0.0}
+            if future is winner:
+                attempt.update(status="won", cost=round(result["cost"], 6))
+            elif not future.done():
+                attempt["status"] = "cancelled"
+                future.cancel()
+                future.add_done_callback(self._report_late_result)
+            elif future.exception() is not None:
+                attempt["status"] = "failed"
+            else:
+                attempt.update(status="lost", cost=round(future.result()["cost"], 6))
+                result["cost"] += future.result()["cost"]
+            # Finished attempts release their descriptor; a running loser's upload is aborted
+            readers[model_service].close()
+            attempts.append(attempt)
+        result["race"] = {"primary": primary, "winner": result["service"], "attempts": attempts}
+        return result
+
+    def _report_late_result(self, future):
+        if future.cancelled() or future.exception() is not None:
+            return  # never started, or aborted before the provider billed it
+        if self.on_late_result is not None:
+            try:
+                self.on_late_result(future.result())
+            except Exception as e:
+                print(f"STT late result callback failed: {e}")
+
+    def _admit(self, seconds):
+        """
+        Admission by probed duration. Returns the long-recording slot to release
+        (None for short or unknown durations); raises RecordingTooLongError or STTBusyError.
+        """
+        if seconds is None or seconds <= Config.STT_LONG_SECONDS:
+            return None
+        if seconds > Config.STT_MAX_SECONDS:
+            raise RecordingTooLongError(
+                f"Recording is {seconds:.0f}s long; the limit is {Config.STT_MAX_SECONDS:.0f}s")
+        waited = time.perf_counter()
+        acquired = self._long_slots.acquire(timeout=Config.STT_QUEUE_TIMEOUT)
+        QUEUE_WAIT.labels("stt_long").observe(time.perf_counter() - waited)
+        if not acquired:
+            raise STTBusyError("Too many long recordings being transcribed; try again shortly")
+        return self._long_slots
+
+    def _preprocess(self, audio, filename, model_service):
+        """
+        Run audio_preprocess in its process pool. Returns (audio, filename, stats);
+        stats include the bytes / billed seconds / STT cost saved, or None when the
+        audio was sent unchanged.
+        """
+        if not audio_preprocess.can_decode(read_head(audio, 12)):
+            # e.g. browser webm/opus without ffmpeg: keep it on the streaming upload path unread
+            return audio, filename, None
+        if isinstance(audio, (str, os.PathLike)):
+            with open(audio, "rb") as f:
+                data = f.read()
+        elif hasattr(audio, "read"):
+            data = audio.read()
+        elif isinstance(audio, (bytes, bytearray, memoryview)):
+            data = audio
+        else:
+            return audio, filename, None  # rejected by _open_audio
+        with span("stt.preprocess") as pre_span:
+            result = audio_preprocess.run(data, filename, timeout=Config.STT_PREPROCESS_TIMEOUT)
+            pre_span.set_attribute("applied", result["applied"])
+        if not result["applied"]:
+            return data, filename, None
+        stats = {k: result[k] for k in ("original_bytes", "sent_bytes", "original_seconds", "billed_seconds")}
+        stats.update(self.cost_calculator.calculate_preprocessing_savings(stats, model_service))
+        STT_PREPROCESS_SAVED.labels("bytes").inc(max(0, stats["bytes_saved"]))
+        STT_PREPROCESS_SAVED.labels("seconds").inc(max(0.0, stats["seconds_saved"]))
+        return result["audio"], result["filename"], stats
+
+    def _transcribe_live(self, file, filename, model_service, language, translate):
+        """Provider call only. Returns {text, duration_seconds, cost, language}."""
+        if model_service == "openai":
+            # OpenAI Whisper
+            kwargs = {
+                "model": "whisper-1",
+                "file": (filename, file),
+                "response_format": "verbose_json",
+            }
+            if language:
+                kwargs["language"] = language
+            if translate:
+                kwargs["task"] = "translate"
+            transcription = self.openai_client.audio.transcriptions.create(**kwargs)
+            text = transcription.text
+            duration_seconds = getattr(transcription, 'duration', 0)
+            cost = (duration_seconds / 60.0) * self.cost_per_minute_openai
+
+        else:
+            # Groq Whisper (Default); the SDK streams file objects, no full read needed
+            kwargs = {
+                "file": (filename, file),
+                "model": "whisper-large-v3",
+                "response_format": "verbose_json",
+            }
+            if language:
+                kwargs["language"] = language
+            if translate:
+                kwargs["task"] = "translate"
+            if language == "bn":
+                kwargs["prompt"] = "বাংলা ভাষা"
+            try:
+                position = file.tell()
+            except (AttributeError, OSError):
+                position = None
+            try:
+                transcription = self.groq_client.audio.transcriptions.create(**kwargs)
+            except TypeError:
+                # Retry without language if the SDK doesn't support it. That's rejected
+                # before anything is read; if the upload had started, don't resend it.
+                if position is None or file.tell() != position:
+                    raise
+                kwargs.pop("language", None)
+                kwargs.pop("task", None)
+                kwargs.pop("prompt", None)
+                transcription = self.groq_client.audio.transcriptions.create(**kwargs)
+            text = transcription.text
+            duration_seconds = getattr(transcription, 'duration', 0)
+            cost = (duration_seconds / 60.0) * self.cost_per_minute_groq
+
+        return {"text": text, "duration_seconds": duration_seconds, "cost": cost,
+                "language": getattr(transcription, "language", None)}
+
     def _estimate_duration(self, file_size_bytes):
-        """Estimate audio duration from file size (rough approximation for 128kbps mp3/wav)"""
+        """Estimate audio duration from file size (last resort when the header probe fails; ~128kbps)"""
         # 16KB per second ~ 128kbps
         return file_size_bytes / 16000
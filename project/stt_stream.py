@@ -0,0 +1,321 @@
+"""
+Streaming speech-to-text over a WebSocket (/api/voice/stream).
+
+The client sends 16-bit little-endian mono PCM in chunks of any size. A
+local energy VAD splits the stream into speech segments; every finished
+segment is transcribed by STTHandler on a shared thread pool, so a long
+utterance with pauses is transcribed while the user is still talking and
+the last segment's transcript arrives one provider round-trip after the
+VAD hangover. Optionally (STT_STREAM_PARTIAL_INTERVAL > 0; off by default
+because every partial is a billed call) the last STT_STREAM_PARTIAL_WINDOW
+seconds of a still-open segment are transcribed at that interval for
+partial results, so partials cost at most window / interval times the
+speech length instead of re-transcribing the whole segment each time.
+
+Messages sent to the client (JSON text frames):
+    {"type": "speech_start", "segment": i, "at": seconds}
+    {"type": "partial", "segment": i, "text": ..., "from": seconds into the segment}
+    {"type": "final", "segment": i, "text": ..., "start", "end", "cost", "latency_ms"}
+    {"type": "done", "text": ..., "segments", "duration_seconds", "cost"}
+Finals are emitted in segment order even when transcriptions finish out of order.
+"""
+import io
+import threading
+import time
+import wave
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from config import Config
+
+FRAME_MS = 30
+SAMPLE_RATES = (8000, 16000, 22050, 24000, 32000, 44100, 48000)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=Config.STT_STREAM_WORKERS, thread_name_prefix="stt-stream")
+    return _executor
+
+
+def pcm_to_wav(pcm, sample_rate):
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(pcm)
+    return buf.getvalue()
+
+
+class Segment:
+    def __init__(self, index, start, end, pcm):
+        self.index = index
+        self.start = start   # seconds from the start of the stream
+        self.end = end
+        self.pcm = pcm
+        self.closed_at = time.perf_counter()
+
+
+class EnergyVAD:
+    """
+    Frame-energy voice activity detector for 16-bit mono PCM.
+
+    A frame is speech when its level is above both `threshold_db` (dBFS) and
+    the running noise floor + `margin_db`. A segment opens after
+    `min_speech_ms` of consecutive speech (keeping `pre_roll_ms` of audio
+    before the onset) and closes after `hangover_ms` of non-speech, or at
+    `max_segment_s`.
+    """
+
+    def __init__(self, sample_rate=16000, threshold_db=None, hangover_ms=None, max_segment_s=None,
+                 min_speech_ms=90, pre_roll_ms=200, margin_db=10.0):
+        self.sample_rate = sample_rate
+        self.frame_samples = sample_rate * FRAME_MS // 1000
+        self.frame_bytes = self.frame_samples * 2
+        self.threshold_db = Config.STT_STREAM_VAD_DB if threshold_db is None else threshold_db
+        self.margin_db = margin_db
+        hangover_ms = Config.STT_STREAM_HANGOVER_MS if hangover_ms is None else hangover_ms
+        max_segment_s = Config.STT_STREAM_MAX_SEGMENT if max_segment_s is None else max_segment_s
+        self.hangover_frames = max(1, hangover_ms // FRAME_MS)
+        self.min_speech_frames = max(1, min_speech_ms // FRAME_MS)
+        self.max_segment_frames = max(1, int(max_segment_s * 1000 // FRAME_MS))
+        self.noise_db = -70.0
+        self._pending = bytearray()      # incomplete trailing frame
+        self._pre = deque(maxlen=self.min_speech_frames + pre_roll_ms // FRAME_MS)
+        self._onset = 0                  # consecutive speech frames before triggering
+        self._segment = None             # frames of the open segment
+        self._segment_start = 0          # frame index where the open segment starts
+        self._silence = 0
+        self._frames = 0                 # frames consumed so far
+        self._count = 0                  # segments emitted
+
+    @property
+    def in_speech(self):
+        return self._segment is not None
+
+    def current(self):
+        """(index, seconds, pcm) of the open segment, or None."""
+        if self._segment is None:
+            return None
+        return self._count, len(self._segment) * FRAME_MS / 1000, b"".join(self._segment)
+
+    def _levels(self, data):
+        samples = np.frombuffer(data, dtype="<i2").astype(np.float32).reshape(-1, self.frame_samples) / 32768.0
+        return 10 * np.log10(np.mean(samples * samples, axis=1) + 1e-10)
+
+    def _close(self, trim_silence):
+        frames = self._segment
+        if trim_silence:
+            # Keep a little of the trailing silence so words aren't clipped
+            keep = len(frames) - self._silence + min(self._silence, 3)
+            frames = frames[:keep]
+        start = self._segment_start * FRAME_MS / 1000
+        segment = Segment(self._count, start, start + len(frames) * FRAME_MS / 1000, b"".join(frames))
+        self._count += 1
+        self._segment = None
+        self._silence = 0
+        return segment
+
+    def feed(self, pcm):
+        """Consume PCM bytes. Returns events: ("speech_start", index, seconds) or ("segment", Segment)."""
+        self._pending += pcm
+        usable = len(self._pending) - len(self._pending) % self.frame_bytes
+        if not usable:
+            return []
+        data = bytes(self._pending[:usable])
+        del self._pending[:usable]
+
+        events = []
+        for i, level in enumerate(self._levels(data)):
+            frame = data[i * self.frame_bytes:(i + 1) * self.frame_bytes]
+            speech = level > max(self.threshold_db, self.noise_db + self.margin_db)
+            self._frames += 1
+            if self._segment is None:
+                self._pre.append(frame)
+                if not speech:
+                    self._onset = 0
+                    # Track the background level while nobody is speaking
+                    self.noise_db = 0.95 * self.noise_db + 0.05 * float(level)
+                    continue
+                self._onset += 1
+                if self._onset >= self.min_speech_frames:
+                    self._segment = list(self._pre)
+                    self._segment_start = self._frames - len(self._pre)
+                    self._pre.clear()
+                    self._onset = 0
+                    events.append(("speech_start", self._count, self._segment_start * FRAME_MS / 1000))
+                continue
+
+            self._segment.append(frame)
+            self._silence = 0 if speech else self._silence + 1
+            if self._silence >= self.hangover_frames:
+                events.append(("segment", self._close(trim_silence=True)))
+            elif len(self._segment) >= self.max_segment_frames:
+                events.append(("segment", self._close(trim_silence=False)))
+                # Still talking: the next frames open a new segment right away
+                self._segment, self._segment_start = [], self._frames
+                events.append(("speech_start", self._count, self._segment_start * FRAME_MS / 1000))
+        return events
+
+    def flush(self):
+        """End of stream: close the open segment (if it has any audio)."""
+        if self._pending and self._segment is not None:
+            self._segment.append(bytes(self._pending) + b"\x00" * (self.frame_bytes - len(self._pending)))
+        self._pending.clear()
+        if self._segment:
+            return [("segment", self._close(trim_silence=True))]
+        self._segment = None
+        return []
+
+
+class StreamingTranscriber:
+    """
+    Feeds PCM chunks through EnergyVAD and transcribes segments in parallel.
+
+    `emit(message_dict)` is called from the feeding thread and from pool
+    threads (serialized by a lock). `on_result(result)` is called for every
+    provider result, partials included, so callers can log the cost.
+    """
+
+    def __init__(self, stt, emit, sample_rate=16000, model_service="groq", language=None, translate=True,
+                 partial_interval=None, partial_window=None, on_result=None, vad=None, executor=None):
+        self.stt = stt
+        self.emit_fn = emit
+        self.sample_rate = sample_rate
+        self.model_service = model_service
+        self.language = language
+        self.translate = translate
+        self.partial_interval = Config.STT_STREAM_PARTIAL_INTERVAL if partial_interval is None else partial_interval
+        self.partial_window = Config.STT_STREAM_PARTIAL_WINDOW if partial_window is None else partial_window
+        self.on_result = on_result
+        self.vad = vad or EnergyVAD(sample_rate)
+        self.executor = executor or _get_executor()
+        self._lock = threading.Lock()
+        self._emit_lock = threading.Lock()
+        self._futures = []
+        self._finals = {}            # segment index -> final message, until emitted in order
+        self._next_final = 0
+        self._texts = []
+        self._duration = 0.0
+        self._cost = 0.0
+        self._segments = 0
+        self._partial_at = {}        # segment index -> open-segment seconds at the last partial request
+        self._partial_busy = set()
+
+    def emit(self, message):
+        with self._emit_lock:
+            self.emit_fn(message)
+
+    def _transcribe(self, pcm):
+        # In-memory WAV straight to the provider; segments are already trimmed 16 kHz mono
+        # and never repeat, so they skip the result cache
+        result = self.stt.transcribe_audio(pcm_to_wav(pcm, self.sample_rate), model_service=self.model_service,
+                                           language=self.language, translate=self.translate,
+                                           filename="segment.wav", preprocess=False, cache=False)
+        with self._lock:
+            self._cost += result.get("cost", 0) or 0
+        if self.on_result:
+            self.on_result(result)
+        return result
+
+    def _final_job(self, segment):
+        result = self._transcribe(segment.pcm)
+        message = {
+            "type": "final",
+            "segment": segment.index,
+            "text": (result.get("text") or "").strip(),
+            "start": round(segment.start, 3),
+            "end": round(segment.end, 3),
+            "cost": result.get("cost", 0),
+        }
+        if result.get("error"):
+            message["error"] = result["error"]
+        with self._lock:
+            self._finals[segment.index] = (message, segment, result)
+            ready = []
+            while self._next_final in self._finals:
+                ready.append(self._finals.pop(self._next_final))
+                self._next_final += 1
+            for message, segment, result in ready:
+                if message["text"]:
+                    self._texts.append(message["text"])
+                self._duration += result.get("duration_seconds", 0) or 0
+        for message, segment, _ in ready:
+            message["latency_ms"] = round((time.perf_counter() - segment.closed_at) * 1000, 1)
+            self.emit(message)
+
+    def _partial_job(self, index, offset, pcm):
+        try:
+            result = self._transcribe(pcm)
+        finally:
+            with self._lock:
+                self._partial_busy.discard(index)
+        with self._lock:
+            stale = index < self._next_final or index in self._finals
+        if not stale and result.get("text"):
+            self.emit({"type": "partial", "segment": index, "text": result["text"].strip(),
+                       "from": round(offset, 3)})
+
+    def _submit(self, fn, *args):
+        future = self.executor.submit(fn, *args)
+        with self._lock:
+            self._futures = [f for f in self._futures if not f.done()]
+            self._futures.append(future)
+        return future
+
+    def _handle(self, events):
+        for event in events:
+            if event[0] == "speech_start":
+                self.emit({"type": "speech_start", "segment": event[1], "at": round(event[2], 3)})
+            else:
+                segment = event[1]
+                self._segments += 1
+                self._submit(self._final_job, segment)
+
+    def feed(self, pcm):
+        self._handle(self.vad.feed(pcm))
+        current = self.vad.current() if self.partial_interval > 0 else None
+        if current is None:
+            return
+        index, seconds, pcm_so_far = current
+        with self._lock:
+            due = (index not in self._partial_busy
+                   and seconds - self._partial_at.get(index, 0.0) >= self.partial_interval)
+            if due:
+                self._partial_busy.add(index)
+                self._partial_at[index] = seconds
+        if due:
+            # Only the recent window: re-sending the whole open segment each time would bill it over and over
+            keep = int(self.partial_window * self.sample_rate) * 2 if self.partial_window > 0 else len(pcm_so_far)
+            tail = pcm_so_far[-keep:] if keep < len(pcm_so_far) else pcm_so_far
+            offset = (len(pcm_so_far) - len(tail)) / 2 / self.sample_rate
+            self._submit(self._partial_job, index, offset, tail)
+
+    def finish(self, timeout=None):
+        """Close the stream, wait for outstanding transcriptions and emit the summary."""
+        self._handle(self.vad.flush())
+        with self._lock:
+            futures = list(self._futures)
+        for future in futures:
+            future.result(timeout=timeout)
+        with self._lock:
+            summary = {
+                "type": "done",
+                "text": " ".join(self._texts),
+                "segments": self._segments,
+                "duration_seconds": round(self._duration, 2),
+                "cost": round(self._cost, 6),
+            }
+        self.emit(summary)
+        return summary
+
+    def cancel(self):
+        with self._lock:
+            for future in self._futures:
+                future.cancel()
@@ -0,0 +1,14 @@
+"""
+pytest setup: trace exports (tracing.py) go to a scratch dir instead of
+logs/traces, and the app's first request doesn't prewarm the TTS cache
+with real synthesis.
+"""
+import atexit
+import os
+import shutil
+import tempfile
+
+_trace_dir = tempfile.mkdtemp(prefix="lira_traces_")
+os.environ.setdefault("TRACE_DIR", _trace_dir)
+atexit.register(shutil.rmtree, _trace_dir, True)
+os.environ.setdefault("TTS_PREWARM", "0")
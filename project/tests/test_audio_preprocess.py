@@ -0,0 +1,87 @@
+import unittest
+import sys
+import os
+import io
+import wave
+import numpy as np
+from unittest import mock
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import audio_preprocess
+from cost_calculator import CostCalculator
+from config import Config
+
+def stereo_wav(parts, rate=48000):
+    """parts: list of (seconds, amplitude); a 300 Hz tone, or silence when amplitude is 0."""
+    chunks = []
+    for seconds, amplitude in parts:
+        t = np.arange(int(seconds * rate)) / rate
+        chunks.append(amplitude * np.sin(2 * np.pi * 300 * t))
+    mono = (np.concatenate(chunks) * 32767).astype("<i2")
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(2)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(np.column_stack((mono, mono)).tobytes())
+    return buf.getvalue()
+
+class TestAudioPreprocess(unittest.TestCase):
+    def test_trims_downmixes_and_resamples(self):
+        data = stereo_wav([(1.5, 0.0), (1.0, 0.3), (2.0, 0.0)])
+        result = audio_preprocess.preprocess(data, "clip.wav")
+        self.assertTrue(result["applied"], result["reason"])
+        self.assertAlmostEqual(result["original_seconds"], 4.5, places=2)
+        # ~1 s of speech plus padding on both sides
+        self.assertGreater(result["billed_seconds"], 1.0)
+        self.assertLess(result["billed_seconds"], 1.8)
+        self.assertLess(result["sent_bytes"], result["original_bytes"] / 5)
+        if result["filename"].endswith(".wav"):
+            with wave.open(io.BytesIO(result["audio"]), "rb") as w:
+                self.assertEqual((w.getnchannels(), w.getframerate(), w.getsampwidth()), (1, 16000, 2))
+                self.assertAlmostEqual(w.getnframes() / 16000, result["billed_seconds"], places=2)
+
+    def test_resample_keeps_tone_and_length(self):
+        rate = 44100
+        x = np.sin(2 * np.pi * 440 * np.arange(rate) / rate).astype(np.float32)
+        y = audio_preprocess.resample(x, rate)
+        self.assertEqual(len(y), 16000)
+        self.assertAlmostEqual(float(np.sqrt(np.mean(y[100:-100] ** 2))), 1 / np.sqrt(2), delta=0.02)
+
+    def test_passthrough_cases(self):
+        silent = stereo_wav([(2.0, 0.0)])
+        self.assertEqual(audio_preprocess.preprocess(silent, "clip.wav")["reason"], "No speech detected")
+        tight = stereo_wav([(1.0, 0.3)], rate=16000)
+        # Already 16 kHz; mono re-encode still halves the bytes
+        self.assertTrue(audio_preprocess.preprocess(tight, "clip.wav")["applied"])
+        if audio_preprocess._audio_segment() is None:
+            result = audio_preprocess.preprocess(b"\x1aE\xdf\xa3 not really webm", "clip.webm")
+            self.assertFalse(result["applied"])
+            self.assertIn("ffmpeg", result["reason"])
+
+    def test_pool_run_and_savings(self):
+        data = stereo_wav([(2.0, 0.0), (1.0, 0.3), (1.0, 0.0)])
+        result = audio_preprocess.run(data, "clip.wav", timeout=30)
+        self.assertTrue(result["applied"])
+        silent = stereo_wav([(0.5, 0.0)])
+        self.assertIs(audio_preprocess.run(silent, "clip.wav", timeout=30)["audio"], silent)
+
+        savings = CostCalculator().calculate_preprocessing_savings(result, "openai")
+        self.assertEqual(savings["bytes_saved"], result["original_bytes"] - result["sent_bytes"])
+        seconds = result["original_seconds"] - result["billed_seconds"]
+        self.assertAlmostEqual(savings["seconds_saved"], seconds, places=3)
+        self.assertAlmostEqual(savings["stt_cost_saved"], seconds / 60 * Config.STT_PRICING["openai"], places=7)
+
+    def test_undecodable_upload_stays_on_the_streaming_path(self):
+        from stt_handler import STTHandler
+        self.assertTrue(audio_preprocess.can_decode(stereo_wav([(0.1, 0.0)])[:12]))
+        upload = io.BytesIO(b"\x1aE\xdf\xa3" + b"\x00" * 4096)
+        with mock.patch("audio_preprocess.shutil.which", return_value=None), \
+                mock.patch("audio_preprocess.run") as run:
+            audio, filename, stats = STTHandler()._preprocess(upload, "clip.webm", "groq")
+        run.assert_not_called()
+        self.assertIs(audio, upload)
+        self.assertEqual(upload.tell(), 0)
+        self.assertIsNone(stats)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import unittest
+import sys
+import os
+import io
+import struct
+import tempfile
+import time
+import wave
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from audio_probe import probe_duration
+from fake_provider import MP3_FRAME, MP3_FRAME_SECONDS
+
+def wav_bytes(seconds, rate=16000, channels=1, width=2):
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(width)
+        w.setframerate(rate)
+        w.writeframes(b"\x00" * int(seconds * rate) * channels * width)
+    return buf.getvalue()
+
+def ogg_page(granule, payload, header_type=0):
+    segments = [255] * (len(payload) // 255) + [len(payload) % 255]
+    return (b"OggS" + bytes([0, header_type]) + struct.pack("<qIII", granule, 1, 0, 0)
+            + bytes([len(segments)]) + bytes(segments) + payload)
+
+def opus_file(seconds, pre_skip=312):
+    head = b"OpusHead" + bytes([1, 1]) + struct.pack("<HIhB", pre_skip, 48000, 0, 0)
+    pages = [ogg_page(0, head, 2), ogg_page(0, b"OpusTags" + b"\x00" * 8)]
+    per_page = 48000  # one second of 48 kHz samples per page
+    for i in range(1, int(seconds) + 1):
+        pages.append(ogg_page(pre_skip + i * per_page, b"\xfc" * 200))
+    return b"".join(pages)
+
+def ebml(element_id, payload, unknown_size=False):
+    id_bytes = element_id.to_bytes((element_id.bit_length() + 7) // 8, "big")
+    if unknown_size:
+        return id_bytes + b"\x01\xff\xff\xff\xff\xff\xff\xff" + payload
+    return id_bytes + (0x10000000 | len(payload)).to_bytes(4, "big") + payload
+
+def webm_file(seconds, with_duration, block_ms=20, cluster_ms=1000):
+    header = ebml(0x1A45DFA3, ebml(0x4282, b"webm"))
+    info = ebml(0x2AD7B1, (1_000_000).to_bytes(3, "big"))
+    if with_duration:
+        info += ebml(0x4489, struct.pack(">d", seconds * 1000.0))
+    body = ebml(0x1549A966, info) + ebml(0x1654AE6B, b"\x00" * 16)
+    total_ms = int(seconds * 1000)
+    for cluster_start in range(0, total_ms, cluster_ms):
+        blocks = ebml(0xE7, cluster_start.to_bytes(4, "big"))
+        for rel in range(0, min(cluster_ms, total_ms - cluster_start), block_ms):
+            blocks += ebml(0xA3, b"\x81" + struct.pack(">h", rel) + b"\x80" + b"\xaa" * 60)
+        # MediaRecorder writes clusters with unknown size
+        body += ebml(0x1F43B675, blocks, unknown_size=True)
+    return header + ebml(0x18538067, body, unknown_size=True)
+
+class TestAudioProbe(unittest.TestCase):
+    def test_wav(self):
+        self.assertAlmostEqual(probe_duration(wav_bytes(2.5)), 2.5)
+        self.assertAlmostEqual(probe_duration(wav_bytes(1.0, rate=48000, channels=2)), 1.0)
+        # Streaming writers leave the data size at 0
+        data = bytearray(wav_bytes(3.0))
+        data[40:44] = b"\x00\x00\x00\x00"
+        self.assertAlmostEqual(probe_duration(bytes(data)), 3.0)
+
+    def test_mp3_cbr_id3_and_xing(self):
+        frames = 400
+        cbr = MP3_FRAME * frames
+        self.assertAlmostEqual(probe_duration(cbr), frames * MP3_FRAME_SECONDS, delta=0.05)
+        id3 = b"ID3\x04\x00\x00\x00\x00\x02\x00" + b"\x00" * 256
+        self.assertAlmostEqual(probe_duration(id3 + cbr), frames * MP3_FRAME_SECONDS, delta=0.05)
+        # VBR: Xing header in the first frame carries the exact frame count
+        xing = bytearray(MP3_FRAME)
+        xing[4 + 32:4 + 32 + 12] = b"Xing" + struct.pack(">II", 1, 1000)
+        self.assertAlmostEqual(probe_duration(bytes(xing) + cbr), 1000 * MP3_FRAME_SECONDS, places=3)
+
+    def test_ogg_opus(self):
+        self.assertAlmostEqual(probe_duration(opus_file(7)), 7.0, places=3)
+
+    def test_webm_with_and_without_duration(self):
+        self.assertAlmostEqual(probe_duration(webm_file(4.2, with_duration=True)), 4.2, places=3)
+        self.assertAlmostEqual(probe_duration(webm_file(4.2, with_duration=False)), 4.2, delta=0.021)
+        # Last cluster further back than the first tail window
+        self.assertAlmostEqual(probe_duration(webm_file(60, with_duration=False, cluster_ms=30000)), 60.0,
+                               delta=0.021)
+
+    def test_sources_and_unknown(self):
+        data = wav_bytes(1.5)
+        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
+            f.write(data)
+        try:
+            self.assertAlmostEqual(probe_duration(f.name), 1.5)
+        finally:
+            os.remove(f.name)
+        stream = io.BytesIO(data)
+        stream.seek(10)
+        self.assertAlmostEqual(probe_duration(stream), 1.5)
+        self.assertEqual(stream.tell(), 10)  # position restored
+        self.assertAlmostEqual(probe_duration(memoryview(data)), 1.5)
+        self.assertIsNone(probe_duration(b"not audio at all" * 10))
+        self.assertIsNone(probe_duration(b""))
+
+    def test_probe_is_cheap(self):
+        data = webm_file(120, with_duration=False)
+        start = time.perf_counter()
+        for _ in range(200):
+            probe_duration(data)
+        # Header + tail only: far below a millisecond, independent of file length
+        self.assertLess((time.perf_counter() - start) / 200, 0.002)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import bench_suite
+
+class TestBenchSuite(unittest.TestCase):
+    def test_compare_scales_baseline_by_calibration(self):
+        baseline = {"calibration_us": 100.0, "results": {"a": {"per_call_us": 10.0}, "b": {"per_call_us": 10.0}}}
+        # Machine is 2x slower: 'a' at 20us is on par, 'b' at 40us is a 2x regression
+        current = {"calibration_us": 200.0, "results": {"a": {"per_call_us": 20.0}, "b": {"per_call_us": 40.0},
+                                                        "new": {"per_call_us": 1.0}}}
+        rows = {r["name"]: r for r in bench_suite.compare(current, baseline, threshold=1.5)}
+        self.assertEqual(set(rows), {"a", "b"})
+        self.assertAlmostEqual(rows["a"]["ratio"], 1.0)
+        self.assertFalse(rows["a"]["regressed"])
+        self.assertAlmostEqual(rows["b"]["ratio"], 2.0)
+        self.assertTrue(rows["b"]["regressed"])
+
+    def test_per_case_calibration_and_noise_band(self):
+        baseline = {"calibration_us": 100.0, "results": {
+            "a": {"per_call_us": 10.0, "calibration_us": 100.0, "noise": 0.0},
+            "b": {"per_call_us": 10.0, "calibration_us": 100.0, "noise": 0.1}}}
+        # The clock slowed down while 'a' ran: its own calibration explains the 1.8x
+        current = {"calibration_us": 100.0, "results": {
+            "a": {"per_call_us": 18.0, "calibration_us": 180.0, "noise": 0.0},
+            "b": {"per_call_us": 17.0, "calibration_us": 100.0, "noise": 0.05}}}
+        rows = {r["name"]: r for r in bench_suite.compare(current, baseline, threshold=1.5)}
+        self.assertAlmostEqual(rows["a"]["ratio"], 1.0)
+        self.assertAlmostEqual(rows["b"]["limit"], 1.5 * 1.3)
+        self.assertFalse(rows["b"]["regressed"])  # 1.7x is inside the noise band
+
+        retry = {"calibration_us": 100.0, "results": {"b": {"per_call_us": 11.0, "calibration_us": 100.0}}}
+        merged = bench_suite.merge_fastest(current, retry)
+        self.assertEqual(merged["results"]["b"]["per_call_us"], 11.0)
+        self.assertEqual(merged["results"]["a"]["per_call_us"], 18.0)
+        self.assertEqual(current["results"]["b"]["per_call_us"], 17.0)
+
+    def test_run_and_baseline_round_trip(self):
+        old_target = bench_suite.TARGET_SECONDS
+        bench_suite.TARGET_SECONDS = 0.001
+        tmp = tempfile.mkdtemp()
+        cwd = os.getcwd()
+        try:
+            current = bench_suite.run(["calculate_cost", "token_tracker"], repeat=2)
+            self.assertEqual(os.getcwd(), cwd)  # token_tracker ran in (and left) a scratch dir
+            self.assertGreater(current["results"]["calculate_cost"]["per_call_us"], 0)
+            self.assertGreater(current["results"]["calculate_cost"]["calibration_us"], 0)
+            path = os.path.join(tmp, "baseline.json")
+            bench_suite.save_baseline(current, path)
+            self.assertEqual(bench_suite.load_baseline(path)["results"], current["results"])
+            self.assertIsNone(bench_suite.load_baseline(os.path.join(tmp, "missing.json")))
+            with self.assertRaises(ValueError):
+                bench_suite.run(["nope"])
+        finally:
+            bench_suite.TARGET_SECONDS = old_target
+            shutil.rmtree(tmp)
+
+if __name__ == '__main__':
+    unittest.main()
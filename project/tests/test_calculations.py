@@ -1,4 +1,5 @@
 import unittest
+import numpy as np
 from cost_calculator import CostCalculator
 
 class TestCalculations(unittest.TestCase):
@@ -39,5 +40,32 @@ class TestCalculations(unittest.TestCase):
         # Total: 0.0221625 -> round to 6: 0.022163
         self.assertAlmostEqual(results['daily_total_cost'], 0.022163, places=5)
 
+    def test_reprice_batch_matches_scalar(self):
+        """Vectorized pricing agrees with calculate_cost for every table"""
+        inputs = np.array([1000, 0, 123456])
+        outputs = np.array([500, 42, 7890])
+        names, costs = self.calc.reprice_batch(inputs, outputs)
+        self.assertEqual(costs.shape, (3, len(names)))
+        for j, name in enumerate(names):
+            for i in range(3):
+                expected = self.calc.calculate_cost(name, int(inputs[i]), int(outputs[i]))
+                self.assertAlmostEqual(costs[i, j], expected, places=8)
+
+    def test_compare_pricing(self):
+        """What-if totals across LLM, STT and TTS tables"""
+        usage = {
+            "input_tokens": np.full(100, 1000.0),
+            "output_tokens": np.full(100, 500.0),
+            "audio_duration": np.full(100, 60.0),
+            "tts_chars": np.full(100, 1000.0),
+        }
+        result = self.calc.compare_pricing(usage, tts_rates={"openai": 0.000015, "edge-tts": 0.0})
+        self.assertEqual(result["rows"], 100)
+        self.assertAlmostEqual(result["llm"]["groq"]["total"], 0.0985, places=8)
+        self.assertAlmostEqual(result["llm"]["groq"]["p95"], 0.000985, places=8)
+        self.assertAlmostEqual(result["stt"]["openai"]["total"], 0.6, places=8)
+        self.assertAlmostEqual(result["tts"]["openai"]["per_query"], 0.015, places=8)
+        self.assertEqual(result["tts"]["edge-tts"]["total"], 0.0)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+import sys
+import os
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from capacity_planner import Profile, simulate, diurnal_weights, parse_mix
+
+def _profile():
+    n = 200
+    return Profile(np.full(n, 1000.0), np.full(n, 500.0),
+                   np.where(np.arange(n) % 2, 60.0, 0.0), np.zeros(n),
+                   latencies={"llm": {"groq": np.array([1.0, 1.0])}})
+
+class TestCapacityPlanner(unittest.TestCase):
+    def test_diurnal_weights(self):
+        w = diurnal_weights(peak_hour=14)
+        self.assertAlmostEqual(w.sum(), 1.0)
+        self.assertEqual(int(np.argmax(w)), 14 * 60)
+
+    def test_daily_cost_matches_expectation(self):
+        # Fixed per-query cost: groq LLM 0.000985 + half the queries with 1 minute of groq STT
+        per_query = 0.000985 + 0.5 * 0.111 / 60
+        result = simulate(_profile(), 2000, trajectories=400, seed=7, day_cv=0, batch=100)
+        bands = result["providers"]["groq"]["daily_cost"]
+        self.assertAlmostEqual(bands["p50"], 2000 * per_query, delta=2000 * per_query * 0.05)
+        self.assertLessEqual(bands["p5"], bands["p95"])
+        self.assertTrue(result["exact"])
+        # 1s LLM + half of (0.5s STT + 0.6s TTS defaults)
+        self.assertAlmostEqual(result["providers"]["groq"]["service_time"], 1.55)
+
+    def test_seeded_and_split_by_mix(self):
+        mix = parse_mix("groq=0.75,openai=0.25")
+        first = simulate(_profile(), 1000, trajectories=200, mix=mix, seed=3, batch=50)
+        second = simulate(_profile(), 1000, trajectories=200, mix=mix, seed=3, batch=50)
+        self.assertEqual(first, second)
+        groq, openai = (first["providers"][p]["peak_rpm"]["p50"] for p in ("groq", "openai"))
+        self.assertGreater(groq, openai)
+        # CLT path gives the same order of magnitude
+        approx = simulate(_profile(), 1000, trajectories=200, mix=mix, seed=3, batch=50, max_exact_draws=0)
+        self.assertFalse(approx["exact"])
+        self.assertAlmostEqual(approx["total"]["daily_cost"]["p50"], first["total"]["daily_cost"]["p50"],
+                               delta=first["total"]["daily_cost"]["p50"] * 0.1)
+
+    def test_monthly_horizon(self):
+        result = simulate(_profile(), 2000, trajectories=200, seed=5, batch=100, days=30)
+        self.assertEqual(result["days"], 30)
+        daily, monthly = result["total"]["daily_cost"], result["total"]["horizon_cost"]
+        self.assertAlmostEqual(monthly["p50"], 30 * daily["p50"], delta=30 * daily["p50"] * 0.05)
+        # Independent days average out: the month's band is relatively narrower than a day's
+        self.assertLess((monthly["p95"] - monthly["p5"]) / monthly["p50"], (daily["p95"] - daily["p5"]) / daily["p50"])
+        one_day = simulate(_profile(), 2000, trajectories=100, seed=5, batch=100)
+        self.assertEqual(one_day["total"]["horizon_cost"], one_day["total"]["daily_cost"])
+        with self.assertRaises(ValueError):
+            simulate(_profile(), 2000, trajectories=10, days=0)
+
+    def test_unknown_provider(self):
+        with self.assertRaises(ValueError):
+            parse_mix("claude=1")
+
+if __name__ == '__main__':
+    unittest.main()
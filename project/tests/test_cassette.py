@@ -0,0 +1,124 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+from werkzeug.serving import make_server
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config
+from cassette import Cassette, CassetteMissError, fingerprint
+from fake_provider import FakeProviderConfig, Latency, create_app
+from loadtest import sample_wav
+
+class TestCassette(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.path = os.path.join(self.tmp, "cassette")
+
+    def test_fingerprint_hashes_bytes(self):
+        a = fingerprint("stt", {"audio": b"abc", "language": None})
+        self.assertEqual(a, fingerprint("stt", {"language": None, "audio": bytearray(b"abc")}))
+        self.assertNotEqual(a, fingerprint("stt", {"audio": b"abd", "language": None}))
+
+    def test_record_then_replay_with_latency(self):
+        def live():
+            time.sleep(0.05)
+            return {"text": "hi", "input_tokens": 3}, b"\x01\x02"
+
+        recorder = Cassette(self.path, "record")
+        recorder.replay_or_record("llm", {"prompt": "x"}, live, usage_keys=("input_tokens",))
+
+        fast = Cassette(self.path, "replay")
+        start = time.perf_counter()
+        response, blob = fast.replay_or_record("llm", {"prompt": "x"}, self.fail)
+        self.assertLess(time.perf_counter() - start, 0.04)
+        self.assertEqual((response, blob), ({"text": "hi", "input_tokens": 3}, b"\x01\x02"))
+
+        timed = Cassette(self.path, "replay", latency_scale=1.0)
+        start = time.perf_counter()
+        timed.replay_or_record("llm", {"prompt": "x"}, self.fail)
+        self.assertGreaterEqual(time.perf_counter() - start, 0.045)
+
+        with self.assertRaises(CassetteMissError):
+            fast.replay_or_record("llm", {"prompt": "other"}, self.fail)
+
+        auto = Cassette(self.path, "auto")
+        auto.replay_or_record("llm", {"prompt": "other"}, lambda: ({"text": "new"}, None))
+        self.assertEqual(len(Cassette(self.path, "replay")), 2)
+
+    def test_handlers_record_against_fake_provider_and_replay_offline(self):
+        from api_handler import APIHandler
+        from stt_handler import STTHandler
+        from tts_handler import TTSHandler
+
+        config = FakeProviderConfig(chat_latency=Latency(1), transcription_latency=Latency(1),
+                                    speech_latency=Latency(1), seed=1)
+        server = make_server("127.0.0.1", 0, create_app(config), threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        audio_path = os.path.join(self.tmp, "clip.wav")
+        with open(audio_path, "wb") as f:
+            f.write(sample_wav(seconds=2.0))
+
+        def run(api, stt, tts):
+            llm = api.generate_response("Price of serum?", model_service="openai", system_prompt="sys")
+            transcript = stt.transcribe_audio(audio_path, model_service="openai", language="en")
+            speech = tts.synthesize_speech("Hello there!", os.path.join(self.tmp, "out.mp3"), "nova", model_service="openai")
+            with open(os.path.join(self.tmp, "out.mp3"), "rb") as f:
+                return llm, transcript, speech, f.read()
+
+        with mock.patch.object(Config, "OPENAI_API_KEY", "fake"), \
+                mock.patch.object(Config, "OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_port}/v1"):
+            handlers = APIHandler(), STTHandler(), TTSHandler()
+        recorder = Cassette(self.path, "record")
+        for h in handlers:
+            h.cassette = recorder
+        recorded = run(*handlers)
+        server.shutdown()
+        self.assertIsNone(recorded[0][3])
+        self.assertEqual(recorded[1]["duration_seconds"], 2.0)
+        self.assertTrue(recorded[2]["success"])
+
+        with mock.patch.object(Config, "OPENAI_API_KEY", None), mock.patch.object(Config, "GROQ_API_KEY", None):
+            handlers = APIHandler(), STTHandler(), TTSHandler()
+        replayer = Cassette(self.path, "replay")
+        for h in handlers:
+            h.cassette = replayer
+        replayed = run(*handlers)
+        self.assertEqual(replayed[0], recorded[0])
+        self.assertEqual(replayed[1]["text"], recorded[1]["text"])
+        self.assertEqual(replayed[1]["cost"], recorded[1]["cost"])
+        self.assertEqual(replayed[2]["cost"], recorded[2]["cost"])
+        self.assertEqual(replayed[3], recorded[3])
+
+    def test_chat_route_replays_without_keys(self):
+        import openai
+        import app as app_module
+        bot = app_module.bot
+        server = make_server("127.0.0.1", 0, create_app(FakeProviderConfig(seed=3)), threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        client = app_module.app.test_client()
+        fake_openai = openai.OpenAI(api_key="fake", base_url=f"http://127.0.0.1:{server.server_port}/v1", max_retries=0)
+
+        with mock.patch.object(Config, "OPENAI_API_KEY", "fake"), mock.patch.object(Config, "GROQ_API_KEY", None), \
+                mock.patch.object(bot.api_handler, "openai_client", fake_openai), \
+                mock.patch.object(bot.api_handler, "cassette", Cassette(self.path, "record")), \
+                mock.patch.object(bot.token_tracker, "log_dir", self.tmp):
+            recorded = client.post("/chat", json={"message": "Price of serum?", "session_id": "cassette-rec"}).get_json()
+        server.shutdown()
+        self.assertEqual(recorded["mode"], "openai")
+
+        with mock.patch.object(Config, "OPENAI_API_KEY", None), mock.patch.object(Config, "GROQ_API_KEY", None), \
+                mock.patch.object(bot.api_handler, "openai_client", None), \
+                mock.patch.object(bot.api_handler, "cassette", Cassette(self.path, "replay")), \
+                mock.patch.object(bot.token_tracker, "log_dir", self.tmp):
+            replayed = client.post("/chat", json={"message": "Price of serum?", "session_id": "cassette-rep"}).get_json()
+        self.assertEqual(replayed["mode"], "openai")
+        self.assertEqual(replayed["response"], recorded["response"])
+        self.assertEqual(replayed["cost"], recorded["cost"])
+
+if __name__ == '__main__':
+    unittest.main()
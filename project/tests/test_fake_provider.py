@@ -0,0 +1,81 @@
+import unittest
+import sys
+import os
+import io
+import threading
+import wave
+from werkzeug.serving import make_server
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fake_provider import FakeProviderConfig, Latency, create_app, MP3_FRAME
+import openai
+from groq import Groq
+
+def _wav(seconds):
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(16000)
+        w.writeframes(b"\x00\x00" * int(16000 * seconds))
+    return buf.getvalue()
+
+class TestFakeProvider(unittest.TestCase):
+    def _serve(self, **kwargs):
+        config = FakeProviderConfig(chat_latency=Latency(1), token_latency=Latency(0),
+                                    transcription_latency=Latency(1), speech_latency=Latency(1), seed=1, **kwargs)
+        server = make_server("127.0.0.1", 0, create_app(config), threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.shutdown)
+        base = f"http://127.0.0.1:{server.server_port}"
+        return config, base
+
+    def test_openai_sdk_chat_stream_and_audio(self):
+        config, base = self._serve()
+        client = openai.OpenAI(api_key="fake", base_url=f"{base}/v1", max_retries=0)
+        completion = client.chat.completions.create(
+            model="gpt-4o-mini", messages=[{"role": "user", "content": "Price of serum?"}], max_tokens=220)
+        self.assertTrue(completion.choices[0].message.content)
+        self.assertEqual(completion.usage.total_tokens,
+                         completion.usage.prompt_tokens + completion.usage.completion_tokens)
+
+        chunks = list(client.chat.completions.create(
+            model="gpt-4o-mini", messages=[{"role": "user", "content": "Hi"}], stream=True,
+            stream_options={"include_usage": True}))
+        text = "".join(c.choices[0].delta.content or "" for c in chunks if c.choices)
+        self.assertTrue(text)
+        self.assertEqual(chunks[-1].usage.completion_tokens, -(-len(text) // 4))
+
+        transcription = client.audio.transcriptions.create(
+            model="whisper-1", file=("clip.wav", _wav(3.0)), response_format="verbose_json")
+        self.assertAlmostEqual(transcription.duration, 3.0)
+        self.assertTrue(transcription.text)
+
+        speech = client.audio.speech.create(model="tts-1", voice="nova", input="Hello there, welcome!")
+        self.assertTrue(speech.content.startswith(MP3_FRAME[:4]))
+        self.assertEqual(config.stats["chat"]["200"], 2)
+
+    def test_groq_sdk_paths(self):
+        _, base = self._serve()
+        client = Groq(api_key="fake", base_url=base, max_retries=0)
+        completion = client.chat.completions.create(
+            model="llama-3.3-70b-versatile", messages=[{"role": "user", "content": "Hi"}])
+        self.assertGreater(completion.usage.prompt_tokens, 0)
+        transcription = client.audio.transcriptions.create(
+            model="whisper-large-v3", file=("clip.wav", _wav(1.5)), response_format="verbose_json")
+        self.assertAlmostEqual(transcription.duration, 1.5)
+
+    def test_rate_limit_injection(self):
+        config, base = self._serve(rate_limit_rate=1.0, retry_after=2)
+        client = openai.OpenAI(api_key="fake", base_url=f"{base}/v1", max_retries=0)
+        with self.assertRaises(openai.RateLimitError) as ctx:
+            client.chat.completions.create(model="gpt-4o-mini", messages=[{"role": "user", "content": "Hi"}])
+        self.assertEqual(ctx.exception.response.headers["Retry-After"], "2")
+        self.assertEqual(config.stats["chat"], {"429": 1})
+
+    def test_latency_parse(self):
+        latency = Latency.parse("200,0.5")
+        self.assertEqual((latency.median_ms, latency.sigma), (200.0, 0.5))
+        self.assertEqual(Latency.parse("50").sample(None), 0.05)
+
+if __name__ == '__main__':
+    unittest.main()
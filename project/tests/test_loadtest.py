@@ -0,0 +1,110 @@
+import unittest
+import sys
+import os
+import io
+import json
+import random
+import threading
+import wave
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from loadtest import LoadTest, arrival_times, sample_wav
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path == "/api/voice/transcribe":
+            status, body = 500, {"error": "boom"}
+        else:
+            status, body = 200, {"response": "ok", "success": True}
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+class TestLoadTest(unittest.TestCase):
+    def test_arrival_schedules(self):
+        constant = arrival_times(10, 5)
+        self.assertEqual(len(constant), 49)
+        self.assertAlmostEqual(constant[1] - constant[0], 0.2)
+        poisson = arrival_times(100, 5, poisson=True, rng=random.Random(1))
+        self.assertAlmostEqual(len(poisson) / 100, 5, delta=0.75)
+        # Ramp-up sends fewer requests early on
+        ramped = arrival_times(20, 10, ramp=10)
+        self.assertLess(sum(1 for t in ramped if t < 5), sum(1 for t in ramped if 15 <= t < 20))
+
+    def test_sample_wav(self):
+        with wave.open(io.BytesIO(sample_wav(seconds=1.0)), "rb") as w:
+            self.assertEqual((w.getnchannels(), w.getframerate(), w.getnframes()), (1, 16000, 16000))
+
+    def test_run_against_local_server(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        target = f"http://127.0.0.1:{server.server_address[1]}"
+        test = LoadTest(target=target, rate=40, duration=1.0, poisson=False,
+                        mix={"chat": 1, "transcribe": 1, "synthesize": 1}, max_inflight=8, seed=3)
+        summary = test.run()
+        endpoints = summary["endpoints"]
+        self.assertEqual(sum(e["requests"] for e in endpoints.values()), summary["scheduled"])
+        self.assertEqual(endpoints["chat"]["error_rate"], 0.0)
+        self.assertEqual(endpoints["transcribe"]["error_rate"], 1.0)
+        self.assertEqual(endpoints["transcribe"]["status_codes"], {"500": endpoints["transcribe"]["requests"]})
+        self.assertLessEqual(endpoints["chat"]["p50_ms"], endpoints["chat"]["p99_ms"])
+
+    def test_mock_target_never_reaches_real_providers(self):
+        import app as app_module
+        from config import Config
+        from loadtest import _Client
+        with mock.patch.object(Config, "OPENAI_API_KEY", "real-key"), \
+                mock.patch.object(app_module.stt, "openai_client", "real-client"):
+            client = _Client("mock")
+            try:
+                self.assertEqual(Config.OPENAI_API_KEY, "fake")
+                self.assertTrue(str(app_module.stt.openai_client.base_url).startswith("http://127.0.0.1:"))
+                status, body = client.post("/api/voice/transcribe", files={"audio": ("a.wav", sample_wav(1.0))},
+                                           data={"model_service": "openai"})
+                self.assertEqual(status, 200, body)
+            finally:
+                client.close()
+            self.assertEqual(Config.OPENAI_API_KEY, "real-key")
+            self.assertEqual(app_module.stt.openai_client, "real-client")
+
+    def test_mock_run_leaves_real_ledgers_alone(self):
+        import glob
+        import app as app_module
+
+        def snapshot():
+            paths = [app_module.VOICE_LOG_PATH] + glob.glob(os.path.join("logs", "verification_*.txt"))
+            state = {}
+            for path in paths:
+                with open(path, "rb") as f:
+                    state[path] = f.read()
+            return state
+        before = snapshot()
+        audio_before = set(os.listdir(app_module.AUDIO_DIR))
+        test = LoadTest(target="mock", rate=20, duration=0.5, poisson=False,
+                        mix={"chat": 1, "transcribe": 1, "synthesize": 1}, max_inflight=4, seed=1)
+        self.assertEqual(test.tts_service, "openai")
+        with mock.patch("edge_tts.Communicate", side_effect=AssertionError("edge-tts called")):
+            summary = test.run()
+        self.assertEqual(sum(e["errors"] for e in summary["endpoints"].values()), 0, summary)
+        self.assertEqual(snapshot(), before)
+        self.assertEqual(set(os.listdir(app_module.AUDIO_DIR)), audio_before)
+        self.assertEqual(app_module.VOICE_LOG_PATH, os.path.join("logs", "voice_costs.csv"))
+        self.assertEqual(app_module.bot.token_tracker.log_dir, "logs")
+
+    def test_unknown_endpoint(self):
+        with self.assertRaises(ValueError):
+            LoadTest(mix={"stats": 1})
+
+if __name__ == '__main__':
+    unittest.main()
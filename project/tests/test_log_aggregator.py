@@ -0,0 +1,87 @@
+import unittest
+import sys
+import os
+import csv
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from log_aggregator import aggregate_file, aggregate_files, load_usage
+
+FIELDS = ["customer_id", "mode", "query", "response", "ai_cost", "stt_cost", "tts_cost",
+          "total_cost", "input_tokens", "output_tokens", "audio_duration"]
+
+def _rows(n, multiline=False):
+    rows = []
+    for i in range(n):
+        voice = i % 3 == 0
+        rows.append({
+            "customer_id": f"sim_user_{i}", "mode": "voice" if voice else "text",
+            "query": f"Price, please #{i}?",
+            "response": "Line one\nline two" if multiline and i % 5 == 0 else "It is $45.",
+            "ai_cost": 0.0001 * (i % 4), "stt_cost": 0.0003 if voice else 0, "tts_cost": 0.0,
+            "total_cost": 0.0, "input_tokens": 900 + i, "output_tokens": 50, "audio_duration": 9.5 if voice else 0,
+        })
+    return rows
+
+class TestLogAggregator(unittest.TestCase):
+    def _write(self, rows, name="voice_simulation_1769699639.csv"):
+        d = tempfile.mkdtemp()
+        path = os.path.join(d, name)
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+        self.addCleanup(lambda: (os.remove(path), os.rmdir(d)))
+        return path
+
+    def test_sums_and_group_by(self):
+        rows = _rows(300)
+        agg = aggregate_file(self._write(rows), parallel=False)
+        self.assertEqual(agg.count, 300)
+        self.assertAlmostEqual(agg.total("ai_cost"), sum(r["ai_cost"] for r in rows))
+        self.assertEqual(agg.total("input_tokens"), sum(r["input_tokens"] for r in rows))
+        voice = agg.group("mode")["voice"]
+        self.assertEqual(voice["count"], 100)
+        self.assertAlmostEqual(voice["sums"]["stt_cost"], 0.03)
+        # Day comes from the run timestamp in the filename
+        self.assertEqual(list(agg.group("day")), ["2026-01-29"])
+
+    def test_chunked_pool_matches_serial(self):
+        path = self._write(_rows(500))
+        serial = aggregate_file(path, parallel=False)
+        chunked = aggregate_file(path, parallel=True, workers=2, chunk_bytes=4096)
+        self.assertEqual(chunked.count, serial.count)
+        self.assertEqual(chunked.group("mode").keys(), serial.group("mode").keys())
+        for col, value in serial.sums.items():
+            self.assertAlmostEqual(chunked.sums[col], value)
+
+    def test_quoted_newlines_fall_back_safely(self):
+        path = self._write(_rows(200, multiline=True))
+        agg = aggregate_file(path, parallel=True, workers=2, chunk_bytes=1024)
+        self.assertEqual(agg.count, 200)
+
+    def test_timestamp_days_and_merge(self):
+        d = tempfile.mkdtemp()
+        path = os.path.join(d, "voice_costs.csv")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("timestamp,kind,cost,duration_seconds,character_count,service\n")
+            f.write("1770217869.18,stt,0.000133,4.32,0,groq\n")
+            f.write("1770304269.18,tts,0.0,0,98,edge-tts\n")
+            f.write("1770304270.00,stt,,2.0,0,groq\n")  # empty cost -> csv fallback
+        self.addCleanup(lambda: (os.remove(path), os.rmdir(d)))
+        agg = aggregate_files([path, path])
+        self.assertEqual(agg.count, 6)
+        self.assertEqual(agg.group("day")["2026-02-04"]["count"], 2)
+        self.assertEqual(agg.group("kind")["stt"]["count"], 4)
+        self.assertAlmostEqual(agg.group("kind")["stt"]["sums"]["cost"], 0.000266)
+
+    def test_load_usage_arrays(self):
+        rows = _rows(30, multiline=True)
+        usage = load_usage(self._write(rows))
+        self.assertEqual(list(usage["input_tokens"]), [r["input_tokens"] for r in rows])
+        self.assertEqual(usage["audio_duration"].sum(), 95.0)
+        # TTS characters only for voice rows
+        expected = [len(r["response"]) if r["mode"] == "voice" else 0 for r in rows]
+        self.assertEqual(list(usage["tts_chars"]), expected)
+
+if __name__ == '__main__':
+    unittest.main()
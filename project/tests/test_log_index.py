@@ -0,0 +1,81 @@
+import unittest
+import sys
+import os
+import csv
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from log_index import LogIndex, STRIDE
+
+FIELDS = ["customer_id", "mode", "query", "response", "input_tokens", "output_tokens"]
+
+def _row(i):
+    return {
+        "customer_id": f"sim_user_{i}",
+        "mode": "voice" if i % 3 == 0 else "text",
+        "query": f"Question {i}",
+        # Quoted commas and newlines must not break row boundaries
+        "response": f"Answer {i}, line one\nline \"two\"" if i % 7 == 0 else f"Answer {i}",
+        "input_tokens": str(i),
+        "output_tokens": "2",
+    }
+
+class TestLogIndex(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".csv")
+        os.close(fd)
+        self.rows = [_row(i) for i in range(STRIDE * 3 + 5)]
+        with open(self.path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(self.rows)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_pages_match_csv_reader(self):
+        index = LogIndex(self.path).refresh()
+        self.assertEqual(index.row_count, len(self.rows))
+        result = index.page(page=3, per_page=70)
+        self.assertEqual(result["total"], len(self.rows))
+        self.assertEqual(result["pages"], 3)
+        self.assertEqual(result["rows"], self.rows[140:])
+
+    def test_filter_and_search(self):
+        index = LogIndex(self.path).refresh()
+        voice = [r for r in self.rows if r["mode"] == "voice"]
+        result = index.page(page=2, per_page=10, filters={"mode": "voice"})
+        self.assertEqual(result["total"], len(voice))
+        self.assertEqual(result["rows"], voice[10:20])
+
+        result = index.page(per_page=5, search="line \"TWO\"")
+        self.assertEqual([r["customer_id"] for r in result["rows"]], [f"sim_user_{i}" for i in range(0, 35, 7)])
+
+        with self.assertRaises(ValueError):
+            index.page(filters={"query": "x"})
+
+    def test_incremental_refresh_and_totals(self):
+        index = LogIndex(self.path).refresh()
+        extra = [_row(i) for i in range(1000, 1010)]
+        with open(self.path, "a", newline="", encoding="utf-8") as f:
+            csv.DictWriter(f, fieldnames=FIELDS).writerows(extra)
+            f.write("partial,row")  # not yet terminated
+        index.refresh()
+        all_rows = self.rows + extra
+        self.assertEqual(index.row_count, len(all_rows))
+        self.assertEqual(index.totals["input_tokens"], sum(int(r["input_tokens"]) for r in all_rows))
+        self.assertEqual(list(index.iter_rows()), all_rows)
+
+    def test_truncated_file_is_rebuilt_under_the_same_lock(self):
+        index = LogIndex(self.path).refresh()
+        lock = index._lock
+        with open(self.path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(self.rows[:3])
+        index.refresh()
+        self.assertIs(index._lock, lock)
+        self.assertEqual(index.row_count, 3)
+        self.assertEqual(list(index.iter_rows()), self.rows[:3])
+
+if __name__ == '__main__':
+    unittest.main()
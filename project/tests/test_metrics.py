@@ -0,0 +1,63 @@
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from metrics import Histogram, Registry
+
+class TestHistogram(unittest.TestCase):
+    def test_bucket_contains_value(self):
+        # Every value must land in a bucket whose upper bound is >= the value
+        # and whose previous bucket's upper bound is below it.
+        for value in [0.000001, 0.00003, 0.0004, 0.0123, 0.5, 1.7, 42.0]:
+            h = Histogram()
+            h.observe(value)
+            idx = h.counts.index(1)
+            self.assertGreaterEqual(Histogram.bucket_upper_bound(idx) + 1e-6, value)
+            if idx > 0:
+                self.assertLess(Histogram.bucket_upper_bound(idx - 1), value)
+
+    def test_relative_error(self):
+        h = Histogram()
+        h.observe(2.0)
+        self.assertAlmostEqual(h.percentile(50), 2.0, delta=2.0 * 0.07)
+
+    def test_percentiles_and_mean(self):
+        h = Histogram()
+        for i in range(1, 101):
+            h.observe(i / 100.0)
+        self.assertEqual(h.count, 100)
+        self.assertAlmostEqual(h.mean(), 0.505, places=6)
+        self.assertAlmostEqual(h.percentile(50), 0.5, delta=0.04)
+        self.assertAlmostEqual(h.percentile(99), 0.99, delta=0.07)
+
+    def test_out_of_range_values_are_clamped(self):
+        h = Histogram()
+        h.observe(-1)
+        h.observe(1e9)
+        self.assertEqual(h.counts[0], 1)
+        self.assertEqual(h.counts[-1], 1)
+
+class TestRegistry(unittest.TestCase):
+    def test_prometheus_text_format(self):
+        registry = Registry()
+        hist = registry.histogram("test_seconds", "Test latency.", ("service",))
+        counter = registry.counter("test_total", "Test counter.", ("cache", "result"))
+        hist.labels("groq").observe(0.3)
+        hist.labels("groq").observe(7.0)
+        counter.labels("tts", "hit").inc(2)
+
+        text = registry.render()
+        self.assertIn("# TYPE test_seconds histogram", text)
+        self.assertIn('test_seconds_bucket{service="groq",le="0.5"} 1', text)
+        self.assertIn('test_seconds_bucket{service="groq",le="+Inf"} 2', text)
+        self.assertIn('test_seconds_count{service="groq"} 2', text)
+        self.assertIn('test_total{cache="tts",result="hit"} 2.0', text)
+
+    def test_wrong_label_count(self):
+        registry = Registry()
+        hist = registry.histogram("test_seconds", "Test latency.", ("service",))
+        with self.assertRaises(ValueError):
+            hist.labels("groq", "extra")
+
+if __name__ == '__main__':
+    unittest.main()
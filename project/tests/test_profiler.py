@@ -0,0 +1,87 @@
+import unittest
+import sys
+import os
+import threading
+import time
+from unittest import mock
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from profiler import SamplingProfiler, MemoryTracker, ProfilerBusyError
+
+def _spin(stop):
+    while not stop.is_set():
+        sum(range(100))
+
+class TestSamplingProfiler(unittest.TestCase):
+    def test_collapsed_stacks_include_other_threads(self):
+        stop = threading.Event()
+        worker = threading.Thread(target=_spin, args=(stop,), name="spin-worker")
+        worker.start()
+        try:
+            result = SamplingProfiler().profile(seconds=0.2, interval=0.005)
+        finally:
+            stop.set()
+            worker.join()
+
+        self.assertGreater(result["samples"], 0)
+        lines = result["collapsed"].splitlines()
+        spin_lines = [l for l in lines if l.startswith("spin-worker;")]
+        self.assertTrue(spin_lines)
+        stack, count = spin_lines[0].rsplit(" ", 1)
+        self.assertIn("_spin (test_profiler.py", stack)
+        self.assertGreater(int(count), 0)
+
+    def test_only_one_profile_at_a_time(self):
+        profiler = SamplingProfiler()
+        profiler._lock.acquire()
+        try:
+            with self.assertRaises(ProfilerBusyError):
+                profiler.profile(seconds=0.1)
+        finally:
+            profiler._lock.release()
+
+class TestMemoryTracker(unittest.TestCase):
+    def test_snapshot_diff_reports_growth(self):
+        tracker = MemoryTracker()
+        tracker.start()
+        try:
+            leak = [bytearray(1024) for _ in range(200)]
+            result = tracker.snapshot(top=5)
+        finally:
+            tracker.stop()
+        self.assertTrue(any("test_profiler.py" in s["location"] and s["size_diff"] > 100_000
+                            for s in result["top"]))
+        self.assertEqual(len(leak), 200)
+
+class TestAdminRoutes(unittest.TestCase):
+    def test_disabled_without_token_and_login_never_returns_it(self):
+        import app as app_module
+        from config import Config
+        client = app_module.app.test_client()
+        with mock.patch.object(Config, "ADMIN_TOKEN", None):
+            self.assertEqual(client.post("/api/admin/memory/stop").status_code, 404)
+        with mock.patch.object(Config, "ADMIN_TOKEN", "s3cret"):
+            login = client.post("/api/login", json={"username": "admin"}).get_json()
+            self.assertNotEqual(login["token"], "s3cret")
+            self.assertEqual(client.post("/api/admin/memory/stop",
+                                         headers={"Authorization": f"Bearer {login['token']}"}).status_code, 401)
+            self.assertEqual(client.post("/api/admin/memory/stop",
+                                         headers={"Authorization": "Bearer s3cret"}).status_code, 200)
+
+    def test_bad_memory_parameters_are_rejected(self):
+        import app as app_module
+        from config import Config
+        client = app_module.app.test_client()
+        headers = {"Authorization": "Bearer s3cret"}
+        with mock.patch.object(Config, "ADMIN_TOKEN", "s3cret"):
+            for query in ("frames=abc", "frames=0", "frames=-3", "frames=70000"):
+                response = client.post(f"/api/admin/memory/start?{query}", headers=headers)
+                self.assertEqual(response.status_code, 400, query)
+                self.assertIn("frames", response.get_json()["error"])
+            for query in ("top=x", "top=0", "top=-1"):
+                response = client.post(f"/api/admin/memory/snapshot?{query}", headers=headers)
+                self.assertEqual(response.status_code, 400, query)
+                self.assertIn("top", response.get_json()["error"])
+            self.assertFalse(app_module.memory_tracker.running)
+
+if __name__ == '__main__':
+    unittest.main()
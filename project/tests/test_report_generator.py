@@ -0,0 +1,26 @@
+import unittest
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from report_generator import render_cost_chart
+
+PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
+
+class TestChartRendering(unittest.TestCase):
+    def test_chart_is_png_bytes_and_memoized(self):
+        render_cost_chart.cache_clear()
+        first = render_cost_chart(0.5, 0.3, 0.0)
+        self.assertTrue(first.startswith(PNG_MAGIC))
+        self.assertIs(render_cost_chart(0.5, 0.3, 0.0), first)
+        self.assertEqual(render_cost_chart.cache_info().hits, 1)
+
+    def test_concurrent_rendering_writes_no_files(self):
+        before = set(os.listdir("."))
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            charts = list(pool.map(lambda i: render_cost_chart(0.1 * i, 0.2, 0.01), range(1, 9)))
+        self.assertTrue(all(c.startswith(PNG_MAGIC) for c in charts))
+        self.assertEqual(set(os.listdir(".")), before)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from report_jobs import ReportJobQueue
+
+LOG = """customer_id,mode,query,response,ai_cost,stt_cost,tts_cost,total_cost,input_tokens,output_tokens,audio_duration
+sim_user_1,voice,Hi,Hello,0.0001,0.0003,0.0,0.0004,900,40,9.2
+sim_user_2,text,Price?,$45,0.0002,0,0,0.0002,950,55,0
+"""
+
+class TestReportJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.log = os.path.join(self.tmp, "voice_simulation_1.csv")
+        with open(self.log, "w", encoding="utf-8") as f:
+            f.write(LOG)
+        self.queue = ReportJobQueue(cache_dir=os.path.join(self.tmp, "reports"), max_workers=1)
+
+    def tearDown(self):
+        self.queue.shutdown()
+        shutil.rmtree(self.tmp)
+
+    def test_same_content_is_built_once(self):
+        first = self.queue.submit(self.log)
+        second = self.queue.submit(self.log)  # coalesced with the running job
+        self.assertIs(first.future, second.future)
+        pdf = first.wait(timeout=120)
+        self.assertTrue(os.path.getsize(pdf) > 0)
+
+        third = self.queue.submit(self.log)
+        self.assertTrue(third.cached)
+        self.assertEqual(third.status, "done")
+        self.assertEqual(third.output_pdf, pdf)
+        self.assertIs(self.queue.get(third.id), third)
+
+    def test_hash_changes_with_content(self):
+        before = self.queue.content_hash(self.log)
+        with open(self.log, "a", encoding="utf-8") as f:
+            f.write("sim_user_3,text,Hi,Hey,0.0001,0,0,0.0001,800,20,0\n")
+        self.assertNotEqual(before, self.queue.content_hash(self.log))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from run_summaries import RunSummaryStore, select_runs, combine
+from report_generator import MultiRunReportGenerator
+
+HEADER = "customer_id,mode,query,response,ai_cost,stt_cost,tts_cost,total_cost,input_tokens,output_tokens,audio_duration\n"
+ROW = "sim_user_{i},{mode},Hi,Hello,0.0001,{stt},0.0,0.0004,900,40,9.2\n"
+
+# 2026-01-01, 2026-01-02, 2026-01-03 (UTC)
+RUN_TIMES = (1767225600, 1767312000, 1767398400)
+
+class TestRunSummaries(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.runs = []
+        for n, ts in enumerate(RUN_TIMES):
+            path = os.path.join(self.tmp, f"voice_simulation_{ts}.csv")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(HEADER)
+                for i in range(n + 2):
+                    f.write(ROW.format(i=i, mode="voice" if i % 2 else "text", stt="0.0003" if i % 2 else "0"))
+            self.runs.append(path)
+        self.store_path = os.path.join(self.tmp, "summaries.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_select_by_glob_and_date(self):
+        pattern = os.path.join(self.tmp, "*simulation_*.csv")
+        self.assertEqual(select_runs(pattern), self.runs)
+        self.assertEqual(select_runs(pattern, since="2026-01-02"), self.runs[1:])
+        self.assertEqual(select_runs(pattern, since="2026-01-02", until="2026-01-02"), [self.runs[1]])
+
+    def test_each_file_parsed_once(self):
+        store = RunSummaryStore(self.store_path)
+        first = store.summaries(self.runs[:2])
+        self.assertEqual(store.parsed_files, self.runs[:2])
+        self.assertEqual([s["count"] for s in first], [2, 3])
+
+        # New run added: a fresh store (new process) parses only the new file
+        store = RunSummaryStore(self.store_path)
+        summaries = store.summaries(self.runs)
+        self.assertEqual(store.parsed_files, [self.runs[2]])
+        self.assertEqual(combine(summaries).count, 9)
+
+    def test_comparison_pdf(self):
+        out = os.path.join(self.tmp, "compare.pdf")
+        rg = MultiRunReportGenerator(self.runs, output_pdf=out, store=RunSummaryStore(self.store_path))
+        rg.create_pdf()
+        with open(out, "rb") as f:
+            self.assertTrue(f.read(5).startswith(b"%PDF"))
+        row = MultiRunReportGenerator.run_row(rg.store.summary(self.runs[0]))
+        self.assertEqual(row["queries"], 2)
+        self.assertEqual(row["voice_queries"], 1)
+        self.assertAlmostEqual(row["total"], 0.0005)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+import sys
+import os
+import csv
+import random
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+from unittest import mock
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import simulation
+
+PRODUCTS = [{"name": "Hydra Glow Serum", "brand": "Lira"}, {"name": "Volumizing Mascara", "brand": "Lumen"}]
+
+class FakeSession:
+    def __init__(self):
+        self.logs = []
+
+class FakeBot:
+    """Stands in for Chatbot: random latency, records per-customer call order."""
+    def __init__(self):
+        self.products = PRODUCTS
+        self.sessions = {}
+        self.calls = {}
+        self.max_active = 0
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def process_query(self, customer_id, query, model_service="groq"):
+        with self._lock:
+            self._active += 1
+            self.max_active = max(self.max_active, self._active)
+        time.sleep(random.uniform(0, 0.005))
+        with self._lock:
+            self._active -= 1
+            self.calls.setdefault(customer_id, []).append(query)
+            self.sessions.setdefault(customer_id, FakeSession()).logs.append({"input_tokens": 900, "output_tokens": 40})
+        return f"Answer to {query}", 0.0005
+
+    def end_session(self, customer_id):
+        with self._lock:
+            self.sessions.pop(customer_id, None)
+
+class TestSimulation(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp()
+        os.chdir(self.tmp)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp)
+
+    def _run(self, concurrency, seed):
+        bot = FakeBot()
+        with mock.patch.object(simulation, "Chatbot", return_value=bot), redirect_stdout(StringIO()):
+            path = simulation.run_simulation(num_customers=12, concurrency=concurrency, seed=seed)
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        os.remove(path)
+        return bot, rows
+
+    def test_seed_makes_plans_reproducible(self):
+        first = list(simulation.iter_customer_plans(PRODUCTS, 10, random.Random(42)))
+        second = list(simulation.iter_customer_plans(PRODUCTS, 10, random.Random(42)))
+        self.assertEqual(first, second)
+
+    def test_concurrent_run_matches_serial(self):
+        _, serial = self._run(concurrency=1, seed=7)
+        bot, concurrent = self._run(concurrency=6, seed=7)
+        self.assertGreater(bot.max_active, 1)
+        key = lambda r: (r["customer_id"], r["query"], r["audio_duration"])
+        self.assertEqual([key(r) for r in concurrent], [key(r) for r in serial])
+        # Each customer's queries reached the bot in plan order
+        for customer_id, queries in bot.calls.items():
+            self.assertEqual(queries, [r["query"] for r in concurrent if r["customer_id"] == customer_id])
+
+    def test_finished_sessions_are_released(self):
+        bot, rows = self._run(concurrency=3, seed=1)
+        self.assertEqual(bot.sessions, {})
+        self.assertEqual(len({r["customer_id"] for r in rows}), 12)
+
+if __name__ == '__main__':
+    unittest.main()
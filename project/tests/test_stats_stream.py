@@ -0,0 +1,98 @@
+import unittest
+import sys
+import os
+import json
+from unittest import mock
+from werkzeug.test import EnvironBuilder
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stats_stream import StatsBroadcaster, TooManySubscribersError
+
+def _parse(frame):
+    fields = dict(line.split(": ", 1) for line in frame.strip().splitlines() if not line.startswith(":"))
+    return fields.get("event"), json.loads(fields["data"]) if "data" in fields else None
+
+class TestStatsBroadcaster(unittest.TestCase):
+    def test_totals_then_deltas(self):
+        b = StatsBroadcaster(buffer_size=10, max_subscribers=5)
+        b.publish_query("groq", 100, 50, 0.001, 0.4)
+        sub = b.subscribe()
+        stream = b.stream(sub, heartbeat=0.01)
+
+        event, data = _parse(next(stream))
+        self.assertEqual(event, "totals")
+        self.assertEqual(data["queries"], 1)
+        self.assertEqual(data["models"]["groq"]["input"], 100)
+
+        b.publish_voice_cost("stt", 0.0002, duration_seconds=6)
+        event, data = _parse(next(stream))
+        self.assertEqual(event, "voice_cost")
+        self.assertEqual(data["kind"], "stt")
+        self.assertAlmostEqual(b.totals["voice"]["stt"], 0.0002)
+
+        stream.close()
+        self.assertEqual(b.subscriber_count, 0)
+
+    def test_event_between_subscribe_and_first_read_is_counted_once(self):
+        b = StatsBroadcaster(buffer_size=10, max_subscribers=5)
+        sub = b.subscribe()
+        b.publish_query("groq", 100, 50, 0.001, 0.4)
+        stream = b.stream(sub, heartbeat=0.01)
+        event, data = _parse(next(stream))
+        self.assertEqual((event, data["queries"]), ("totals", 0))
+        event, data = _parse(next(stream))
+        self.assertEqual(event, "query")
+        stream.close()
+
+    def test_slow_client_buffer_is_bounded(self):
+        b = StatsBroadcaster(buffer_size=3, max_subscribers=5)
+        sub = b.subscribe()
+        # Publishing never blocks, even though nobody is reading
+        for i in range(100):
+            b.publish_query("groq", i, 0, 0.0, 0.1)
+        self.assertEqual(len(sub.events), 3)
+
+        stream = b.stream(sub, heartbeat=0.01)
+        next(stream)  # totals
+        event, data = _parse(next(stream))
+        self.assertEqual(event, "resync")
+        self.assertEqual(data["dropped"], 97)
+        inputs = [_parse(next(stream))[1]["input_tokens"] for _ in range(3)]
+        self.assertEqual(inputs, [97, 98, 99])
+        stream.close()
+
+    def test_max_subscribers(self):
+        b = StatsBroadcaster(buffer_size=3, max_subscribers=1)
+        b.subscribe()
+        with self.assertRaises(TooManySubscribersError):
+            b.subscribe()
+
+    def test_slot_taken_between_check_and_first_read(self):
+        b = StatsBroadcaster(buffer_size=3, max_subscribers=1)
+        stream = b.stream()
+        b.subscribe()
+        event, data = _parse(next(stream))
+        self.assertEqual(event, "error")
+        self.assertIn("Too many", data["error"])
+        self.assertEqual(b.subscriber_count, 1)
+
+class TestStatsStreamRoute(unittest.TestCase):
+    def test_aborted_responses_release_their_slot(self):
+        import app as app_module
+        client = app_module.app.test_client()
+        broadcaster = app_module.broadcaster
+        with mock.patch.object(broadcaster, "max_subscribers", broadcaster.subscriber_count + 1):
+            for _ in range(3):
+                # The server closes the body before ever reading it (client aborted early)
+                environ = EnvironBuilder(path="/api/stats/stream").get_environ()
+                app_module.app(environ, lambda status, headers, exc_info=None: None).close()
+            self.assertEqual(broadcaster.subscriber_count, broadcaster.max_subscribers - 1)
+
+            response = client.get("/api/stats/stream", buffered=False)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(_parse(next(response.response).decode())[0], "totals")
+            self.assertEqual(client.get("/api/stats/stream").status_code, 503)
+            response.close()
+            self.assertEqual(broadcaster.subscriber_count, broadcaster.max_subscribers - 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,378 @@
+import unittest
+import sys
+import os
+import io
+import shutil
+import tempfile
+import threading
+import time
+import wave
+from werkzeug.serving import make_server
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest import mock
+from config import Config
+from fake_provider import FakeProviderConfig, Latency, create_app
+from stt_handler import STTHandler, RecordingTooLongError, STTBusyError
+from stt_cache import STTCache, cache_key
+import openai
+from groq import Groq
+
+def _wav(seconds):
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(16000)
+        w.writeframes(b"\x00\x00" * int(16000 * seconds))
+    return buf.getvalue()
+
+class TestSTTHandlerInputs(unittest.TestCase):
+    def setUp(self):
+        config = FakeProviderConfig(transcription_latency=Latency(0), seed=1)
+        server = make_server("127.0.0.1", 0, create_app(config), threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.shutdown)
+        base = f"http://127.0.0.1:{server.server_port}"
+        self.stt = STTHandler()
+        self.stt.cassette = None
+        self.stt.cache = None  # every call below must reach the provider
+        self.stt.groq_client = Groq(api_key="fake", base_url=base, max_retries=0)
+        self.stt.openai_client = openai.OpenAI(api_key="fake", base_url=f"{base}/v1", max_retries=0)
+
+    def test_bytes_memoryview_file_and_path(self):
+        data = _wav(2.0)
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        path = os.path.join(tmp, "clip.wav")
+        with open(path, "wb") as f:
+            f.write(data)
+        spooled = tempfile.SpooledTemporaryFile(max_size=1 << 20)
+        spooled.write(data)
+        spooled.seek(0)
+
+        inputs = [data, bytearray(data), memoryview(data), io.BytesIO(data), spooled, path]
+        for service in ("groq", "openai"):
+            for audio in inputs:
+                if hasattr(audio, "seek"):
+                    audio.seek(0)
+                result = self.stt.transcribe_audio(audio, model_service=service, language="en", filename="clip.wav")
+                self.assertNotIn("error", result, f"{service} / {type(audio).__name__}")
+                self.assertAlmostEqual(result["duration_seconds"], 2.0)
+                self.assertTrue(result["text"])
+        # Caller-owned file objects are left open
+        self.assertFalse(spooled.closed)
+        spooled.close()
+
+    def test_preprocessing_trims_billed_audio(self):
+        import numpy as np
+        t = np.arange(16000) / 16000
+        speech = (0.3 * 32767 * np.sin(2 * np.pi * 300 * t)).astype("<i2").tobytes()
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(16000)
+            w.writeframes(b"\x00\x00" * 32000 + speech + b"\x00\x00" * 32000)
+        result = self.stt.transcribe_audio(buf.getvalue(), model_service="groq", filename="clip.wav",
+                                           preprocess=True)
+        stats = result["preprocessing"]
+        self.assertAlmostEqual(stats["original_seconds"], 5.0)
+        # The provider billed the trimmed clip, not the 5 s upload
+        self.assertAlmostEqual(result["duration_seconds"], stats["billed_seconds"], places=1)
+        self.assertGreater(stats["seconds_saved"], 3.0)
+        self.assertGreater(stats["stt_cost_saved"], 0)
+
+    def test_duration_fallback_uses_header_probe(self):
+        # Provider omits the duration: a 3 s WAV of 96 KB must not be billed as 6 s
+        create = mock.Mock(return_value=SimpleNamespace(text="hi", duration=0, language="en"))
+        self.stt.groq_client = SimpleNamespace(audio=SimpleNamespace(transcriptions=SimpleNamespace(create=create)))
+        result = self.stt.transcribe_audio(_wav(3.0), model_service="groq", filename="clip.wav", preprocess=False)
+        self.assertAlmostEqual(result["duration_seconds"], 3.0)
+        self.assertAlmostEqual(result["cost"], 3.0 / 60 * self.stt.cost_per_minute_groq, places=6)
+
+    def test_long_recording_admission(self):
+        create = mock.Mock(return_value=SimpleNamespace(text="hi", duration=3.0, language="en"))
+        self.stt.groq_client = SimpleNamespace(audio=SimpleNamespace(transcriptions=SimpleNamespace(create=create)))
+        with mock.patch.object(Config, "STT_MAX_SECONDS", 2.0), mock.patch.object(Config, "STT_LONG_SECONDS", 1.0):
+            with self.assertRaises(RecordingTooLongError):
+                self.stt.transcribe_audio(_wav(3.0), preprocess=False)
+        create.assert_not_called()
+
+        with mock.patch.object(Config, "STT_LONG_SECONDS", 1.0), mock.patch.object(Config, "STT_QUEUE_TIMEOUT", 0.05):
+            self.stt._long_slots = threading.BoundedSemaphore(1)
+            self.stt._long_slots.acquire()  # another long recording in flight
+            with self.assertRaises(STTBusyError):
+                self.stt.transcribe_audio(_wav(3.0), preprocess=False)
+            # Short clips don't queue behind long ones
+            self.assertNotIn("error", self.stt.transcribe_audio(_wav(0.5), preprocess=False))
+            self.stt._long_slots.release()
+            self.assertNotIn("error", self.stt.transcribe_audio(_wav(3.0), preprocess=False))
+            # The slot is returned after the call
+            self.assertTrue(self.stt._long_slots.acquire(blocking=False))
+
+    def test_unsupported_input(self):
+        result = self.stt.transcribe_audio(12345)
+        self.assertIn("Unsupported audio input", result["error"])
+
+def _stub_client(delay=0.0, duration=2.0, text="hello", read_chunk=None, calls=None):
+    """Whisper stub: reads the upload (in read_chunk pieces, pausing between them when set), then waits."""
+    def create(file, **kwargs):
+        name, content = file
+        if calls is not None:
+            calls.append(kwargs)
+        if read_chunk:
+            for _ in iter(lambda: content.read(read_chunk), b""):
+                time.sleep(delay / 10)
+        else:
+            content.read()
+            time.sleep(delay)
+        return SimpleNamespace(text=text, duration=duration, language="en")
+    return SimpleNamespace(audio=SimpleNamespace(transcriptions=SimpleNamespace(create=create)))
+
+class TestSTTRace(unittest.TestCase):
+    def setUp(self):
+        self.stt = STTHandler()
+        self.stt.cassette = None
+        self.stt.cache = None
+        self.late = []
+        self.stt.on_late_result = self.late.append
+        patcher = mock.patch.object(Config, "STT_RACE_DEADLINE", 0.1)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_fast_primary_never_starts_secondary(self):
+        openai_calls = []
+        self.stt.groq_client = _stub_client(text="groq")
+        self.stt.openai_client = _stub_client(text="openai", calls=openai_calls)
+        result = self.stt.transcribe_audio(_wav(2.0), preprocess=False)
+        self.assertEqual((result["service"], result["text"]), ("groq", "groq"))
+        self.assertEqual([a["status"] for a in result["race"]["attempts"]], ["won"])
+        self.assertEqual(openai_calls, [])
+
+    def test_slow_primary_is_hedged_and_its_late_cost_reported(self):
+        self.stt.groq_client = _stub_client(delay=0.6, text="groq")
+        self.stt.openai_client = _stub_client(text="openai")
+        start = time.perf_counter()
+        result = self.stt.transcribe_audio(_wav(2.0), preprocess=False)
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertEqual((result["service"], result["text"]), ("openai", "openai"))
+        self.assertAlmostEqual(result["cost"], 2.0 / 60 * self.stt.cost_per_minute_openai, places=6)
+        self.assertEqual({a["service"]: a["status"] for a in result["race"]["attempts"]},
+                         {"groq": "cancelled", "openai": "won"})
+        # Groq had the whole upload already: it finishes, bills, and is reported late
+        deadline = time.time() + 3
+        while not self.late and time.time() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(len(self.late), 1)
+        self.assertEqual(self.late[0]["service"], "groq")
+        self.assertAlmostEqual(self.late[0]["cost"], 2.0 / 60 * self.stt.cost_per_minute_groq, places=6)
+
+    def test_no_hedge_when_hedge_slots_are_busy(self):
+        openai_calls = []
+        self.stt.groq_client = _stub_client(delay=0.3, text="groq")
+        self.stt.openai_client = _stub_client(text="openai", calls=openai_calls)
+        slots = threading.BoundedSemaphore(1)
+        slots.acquire()  # another request is hedging
+        with mock.patch("stt_handler._get_race_executor", return_value=(ThreadPoolExecutor(1), slots)):
+            result = self.stt.transcribe_audio(_wav(2.0), preprocess=False)
+        self.assertEqual(result["service"], "groq")
+        self.assertEqual(openai_calls, [])
+
+    def test_primaries_are_not_capped_by_the_hedge_pool(self):
+        self.stt.groq_client = _stub_client(delay=0.05, text="groq")
+        self.stt.openai_client = _stub_client(text="openai")
+        with mock.patch("stt_handler._get_race_executor",
+                        return_value=(ThreadPoolExecutor(1), threading.BoundedSemaphore(1))):
+            with ThreadPoolExecutor(6) as pool:
+                results = list(pool.map(lambda _: self.stt.transcribe_audio(_wav(1.0), preprocess=False), range(6)))
+        # Six concurrent primaries answer well inside the 0.1 s deadline: nobody hedges
+        self.assertEqual({r["service"] for r in results}, {"groq"})
+
+    def test_upload_is_streamed_and_only_the_hedge_gets_a_second_reader(self):
+        received = {}
+
+        def client(name, delay):
+            def create(file, **kwargs):
+                received[name] = (type(file[1]).__name__, file[1].read())
+                time.sleep(delay)
+                return SimpleNamespace(text=name, duration=2.0, language="en")
+            return SimpleNamespace(audio=SimpleNamespace(transcriptions=SimpleNamespace(create=create)))
+        audio = _wav(2.0)
+        for on_disk, hedge_reader in ((False, "_BufferReader"), (True, "_DescriptorReader")):
+            with tempfile.SpooledTemporaryFile(max_size=1 << 20) as upload:
+                upload.write(audio)
+                upload.seek(0)
+                if on_disk:
+                    upload.rollover()
+                received.clear()
+                self.stt.groq_client = client("groq", 0.3)
+                self.stt.openai_client = client("openai", 0)
+                result = self.stt.transcribe_audio(upload, preprocess=False)
+                self.assertEqual(result["service"], "openai")
+                # The primary read the upload itself, not a buffered copy
+                self.assertEqual(received["groq"], ("_FileReader", audio))
+                self.assertEqual(received["openai"], (hedge_reader, audio))
+
+    def test_loser_still_uploading_is_aborted(self):
+        self.stt.groq_client = _stub_client(delay=1.0, read_chunk=4096)  # slow upload
+        self.stt.openai_client = _stub_client(text="openai")
+        result = self.stt.transcribe_audio(_wav(2.0), preprocess=False)
+        self.assertEqual(result["service"], "openai")
+        time.sleep(0.3)
+        self.assertEqual(self.late, [])  # aborted mid-upload: nothing billed
+
+    def test_failed_primary_falls_over_immediately(self):
+        def broken(**kwargs):
+            raise RuntimeError("503 from provider")
+        self.stt.groq_client = SimpleNamespace(audio=SimpleNamespace(transcriptions=SimpleNamespace(create=broken)))
+        self.stt.openai_client = _stub_client(text="openai")
+        result = self.stt.transcribe_audio(_wav(1.0), preprocess=False)
+        self.assertEqual(result["text"], "openai")
+        self.assertEqual({a["service"]: a["status"] for a in result["race"]["attempts"]},
+                         {"groq": "failed", "openai": "won"})
+
+    def test_type_error_retry_only_before_upload(self):
+        calls = []
+
+        def old_sdk(file, **kwargs):
+            calls.append(kwargs)
+            if "language" in kwargs:
+                raise TypeError("unexpected keyword argument 'language'")
+            return SimpleNamespace(text=file[1].read() and "ok", duration=1.0, language=None)
+        self.stt.openai_client = None
+        self.stt.groq_client = SimpleNamespace(audio=SimpleNamespace(transcriptions=SimpleNamespace(create=old_sdk)))
+        result = self.stt.transcribe_audio(_wav(1.0), language="bn", preprocess=False)
+        self.assertEqual(result["text"], "ok")
+        self.assertEqual(len(calls), 2)
+
+        def fails_after_upload(file, **kwargs):
+            calls.append(kwargs)
+            file[1].read()
+            raise TypeError("bad response")
+        calls.clear()
+        self.stt.groq_client.audio.transcriptions.create = fails_after_upload
+        result = self.stt.transcribe_audio(_wav(1.0), language="bn", preprocess=False)
+        self.assertIn("error", result)
+        self.assertEqual(len(calls), 1)  # not resent
+
+class TestSTTCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+
+        def create(**kwargs):
+            self.calls += 1
+            self.release.wait(5)
+            return SimpleNamespace(text="hello", duration=2.0, language="en")
+
+        self.stt = STTHandler()
+        self.stt.cassette = None
+        self.stt.cache = STTCache(cache_dir=self.tmp)
+        self.stt.groq_client = SimpleNamespace(audio=SimpleNamespace(transcriptions=SimpleNamespace(create=create)))
+
+    def test_key_ignores_container_metadata(self):
+        data = _wav(1.0)
+        # Same samples with a LIST/INFO chunk before "data", as some recorders write
+        info = b"LIST" + (12).to_bytes(4, "little") + b"INFOISFT" + (0).to_bytes(4, "little")
+        with_info = data[:36] + info + data[36:]
+        self.assertEqual(cache_key(data, "groq"), cache_key(with_info, "groq"))
+        self.assertEqual(cache_key(data, "groq"), cache_key(io.BytesIO(data), "groq"))
+        self.assertNotEqual(cache_key(data, "groq"), cache_key(data, "openai"))
+        self.assertNotEqual(cache_key(data, "groq"), cache_key(data, "groq", translate=True))
+        self.assertNotEqual(cache_key(data, "groq"), cache_key(_wav(1.01), "groq"))
+
+    def test_retry_is_free_and_survives_restart(self):
+        data = _wav(2.0)
+        first = self.stt.transcribe_audio(data, preprocess=False)
+        self.assertFalse(first["cached"])
+        self.assertGreater(first["cost"], 0)
+        retry = self.stt.transcribe_audio(io.BytesIO(data), preprocess=False)
+        self.assertEqual((retry["cached"], retry["cost"], retry["text"]), ("memory", 0.0, "hello"))
+        self.assertEqual(retry["duration_seconds"], first["duration_seconds"])
+        # New process: memory tier is empty, disk tier answers
+        self.stt.cache = STTCache(cache_dir=self.tmp)
+        self.assertEqual(self.stt.transcribe_audio(data, preprocess=False)["cached"], "disk")
+        self.assertEqual(self.calls, 1)
+        # Different options are a different transcription
+        self.stt.transcribe_audio(data, preprocess=False, language="bn")
+        self.assertEqual(self.calls, 2)
+
+    def test_expiry_and_lru(self):
+        self.stt.cache = STTCache(cache_dir="", max_entries=2, ttl=60)
+        clips = [_wav(1.0 + i / 10) for i in range(3)]
+        for clip in clips:
+            self.stt.transcribe_audio(clip, preprocess=False)
+        self.stt.transcribe_audio(clips[0], preprocess=False)  # evicted by the third clip
+        self.assertEqual(self.calls, 4)
+        with mock.patch("stt_cache.time.time", return_value=time.time() + 120):
+            self.stt.transcribe_audio(clips[0], preprocess=False)
+        self.assertEqual(self.calls, 5)
+
+    def test_concurrent_duplicates_share_one_call(self):
+        self.release.clear()
+        data = _wav(1.5)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.stt.transcribe_audio(data, preprocess=False)))
+                   for _ in range(4)]
+        for t in threads:
+            t.start()
+        deadline = time.time() + 5
+        while self.calls == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.05)  # let the duplicates reach the in-flight wait
+        self.release.set()
+        for t in threads:
+            t.join(5)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(sorted(r["cached"] or "" for r in results), ["", "coalesced", "coalesced", "coalesced"])
+        self.assertEqual(sum(r["cost"] > 0 for r in results), 1)
+
+class TestTranscribeRoute(unittest.TestCase):
+    def test_upload_is_not_written_to_public_audio_dir(self):
+        import app as app_module
+        seen = {}
+
+        class RecordingSTT:
+            def transcribe_audio(self, audio, model_service="groq", language=None, translate=False, filename=None):
+                seen["filename"] = filename
+                seen["data"] = audio.read()
+                return {"text": "hi", "duration_seconds": 1.0, "cost": 0.0, "service": model_service}
+
+        old_stt, app_module.stt = app_module.stt, RecordingSTT()
+        before = set(os.listdir(app_module.AUDIO_DIR))
+        cwd = os.getcwd()
+        tmp = tempfile.mkdtemp()
+        try:
+            client = app_module.app.test_client()
+            os.chdir(tmp)  # voice cost log
+            data = _wav(0.5)
+            response = client.post("/api/voice/transcribe",
+                                   data={"audio": (io.BytesIO(data), "blob"), "model_service": "groq"},
+                                   content_type="multipart/form-data")
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(tmp)
+            app_module.stt = old_stt
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(seen["data"], data)
+        self.assertEqual(seen["filename"], "audio.webm")  # extension-less browser blob
+        self.assertEqual(set(os.listdir(app_module.AUDIO_DIR)), before)
+
+    def test_too_long_and_busy_statuses(self):
+        import app as app_module
+        client = app_module.app.test_client()
+        for error, status in ((RecordingTooLongError("too long"), 413), (STTBusyError("busy"), 503)):
+            with mock.patch.object(app_module.stt, "transcribe_audio", side_effect=error):
+                response = client.post("/api/voice/transcribe",
+                                       data={"audio": (io.BytesIO(_wav(0.1)), "clip.wav")},
+                                       content_type="multipart/form-data")
+            self.assertEqual(response.status_code, status)
+            self.assertEqual(response.get_json()["text"], "")
+
+if __name__ == '__main__':
+    unittest.main()
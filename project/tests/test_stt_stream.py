@@ -0,0 +1,180 @@
+import unittest
+import sys
+import os
+import io
+import json
+import threading
+import time
+import wave
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stt_stream import EnergyVAD, StreamingTranscriber
+from concurrent.futures import ThreadPoolExecutor
+
+RATE = 16000
+
+def tone(seconds, amplitude=8000):
+    t = np.arange(int(seconds * RATE)) / RATE
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype("<i2").tobytes()
+
+def silence(seconds):
+    return b"\x00\x00" * int(seconds * RATE)
+
+def noise(seconds, seed=0):
+    # Quiet background (~ -60 dBFS) that must not trigger the VAD
+    return np.random.default_rng(seed).normal(0, 30, int(seconds * RATE)).astype("<i2").tobytes()
+
+class FakeSTT:
+    """Transcribes a WAV to its duration; the first segment is slowest to test ordering."""
+    def __init__(self, delays=None):
+        self.delays = delays or {}
+        self.calls = []
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+
+    def transcribe_audio(self, audio, model_service="groq", language=None, translate=False, filename=None, preprocess=None,
+                         cache=True):
+        with wave.open(io.BytesIO(audio), "rb") as w:
+            seconds = w.getnframes() / w.getframerate()
+        with self.lock:
+            index = len(self.calls)
+            self.calls.append((filename, seconds))
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delays.get(index, 0.02))
+        with self.lock:
+            self.active -= 1
+        return {"text": f"{seconds:.1f}s", "duration_seconds": seconds, "cost": seconds / 60 * 0.00185,
+                "service": model_service}
+
+def chunks(data, size=3200):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+class TestEnergyVAD(unittest.TestCase):
+    def test_segments_speech_between_pauses(self):
+        vad = EnergyVAD(RATE, threshold_db=-45, hangover_ms=300, max_segment_s=15)
+        audio = noise(0.5) + tone(1.0) + silence(0.6) + tone(0.5) + noise(0.4, seed=1)
+        events = []
+        for chunk in chunks(audio, 1234):  # chunk sizes not aligned to frames
+            events += vad.feed(chunk)
+        events += vad.flush()
+
+        segments = [e[1] for e in events if e[0] == "segment"]
+        starts = [e for e in events if e[0] == "speech_start"]
+        self.assertEqual(len(segments), 2)
+        self.assertEqual(len(starts), 2)
+        # Onset is found within a couple of frames, including the pre-roll
+        self.assertAlmostEqual(segments[0].start, 0.5 - 0.2, delta=0.1)
+        self.assertAlmostEqual(segments[0].end, 1.5, delta=0.15)
+        self.assertAlmostEqual(segments[1].start, 2.1 - 0.2, delta=0.1)
+        self.assertEqual([s.index for s in segments], [0, 1])
+        self.assertEqual(len(segments[0].pcm), int(round((segments[0].end - segments[0].start) * RATE)) * 2)
+
+    def test_long_speech_is_cut_at_max_segment(self):
+        vad = EnergyVAD(RATE, max_segment_s=1.0)
+        events = vad.feed(tone(2.5)) + vad.flush()
+        segments = [e[1] for e in events if e[0] == "segment"]
+        self.assertEqual(len(segments), 3)
+        self.assertAlmostEqual(segments[0].end - segments[0].start, 1.0, delta=0.05)
+
+class TestStreamingTranscriber(unittest.TestCase):
+    def test_parallel_segments_emit_finals_in_order(self):
+        stt = FakeSTT(delays={0: 0.3})
+        messages = []
+        results = []
+        transcriber = StreamingTranscriber(stt, messages.append, RATE, partial_interval=0,
+                                           on_result=results.append, executor=ThreadPoolExecutor(4))
+        audio = tone(0.6) + silence(0.5) + tone(0.6) + silence(0.5) + tone(0.6) + silence(0.5)
+        for chunk in chunks(audio):
+            transcriber.feed(chunk)
+        summary = transcriber.finish(timeout=5)
+
+        finals = [m for m in messages if m["type"] == "final"]
+        self.assertEqual([m["segment"] for m in finals], [0, 1, 2])
+        self.assertGreater(stt.max_active, 1)  # later segments ran while the first was in flight
+        self.assertEqual(summary["segments"], 3)
+        self.assertEqual(summary["text"], " ".join(m["text"] for m in finals))
+        self.assertAlmostEqual(summary["cost"], sum(r["cost"] for r in results), places=6)
+        self.assertEqual(messages[-1]["type"], "done")
+        self.assertEqual({name for name, _ in stt.calls}, {"segment.wav"})
+
+    def test_partials_while_speaking(self):
+        stt = FakeSTT()
+        messages = []
+        transcriber = StreamingTranscriber(stt, messages.append, RATE, partial_interval=0.5, partial_window=0.6,
+                                           executor=ThreadPoolExecutor(2))
+        for chunk in chunks(tone(2.0) + silence(0.5)):
+            transcriber.feed(chunk)
+            time.sleep(0.005)
+        transcriber.finish(timeout=5)
+        kinds = [m["type"] for m in messages]
+        self.assertIn("partial", kinds)
+        self.assertLess(kinds.index("partial"), kinds.index("final"))
+        # Partials are billed like any other call, so each covers only the recent window
+        self.assertGreater(len(stt.calls), 1)
+        finals = [m for m in messages if m["type"] == "final"]
+        partial_seconds = sum(seconds for _, seconds in stt.calls) - sum(m["end"] - m["start"] for m in finals)
+        self.assertLessEqual(max(seconds for _, seconds in stt.calls[:-1]), 0.6 + 1e-6)
+        self.assertGreater(max(m["from"] for m in messages if m["type"] == "partial"), 0)
+        self.assertLess(partial_seconds, 0.6 * len(stt.calls))
+
+    def test_partials_off_by_default(self):
+        stt = FakeSTT()
+        transcriber = StreamingTranscriber(stt, lambda m: None, RATE, executor=ThreadPoolExecutor(2))
+        for chunk in chunks(tone(2.0) + silence(0.5)):
+            transcriber.feed(chunk)
+        transcriber.finish(timeout=5)
+        self.assertEqual(len(stt.calls), 1)
+
+class TestVoiceStreamRoute(unittest.TestCase):
+    def test_websocket_round_trip(self):
+        try:
+            import simple_websocket
+        except ImportError:
+            self.skipTest("flask-sock not installed")
+        from werkzeug.serving import make_server
+        import app as app_module
+        stt = FakeSTT()
+        old_stt, app_module.stt = app_module.stt, stt
+        server = make_server("127.0.0.1", 0, app_module.app, threaded=True)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        cwd = os.getcwd()
+        import tempfile, shutil
+        tmp = tempfile.mkdtemp()
+        os.chdir(tmp)  # voice cost log goes to the scratch dir
+        try:
+            for bad_rate in ("abc", 0):
+                ws = simple_websocket.Client(f"ws://127.0.0.1:{server.server_port}/api/voice/stream")
+                ws.send(json.dumps({"sample_rate": bad_rate}))
+                self.assertEqual(json.loads(ws.receive(timeout=5))["type"], "error")
+                try:
+                    ws.close()
+                except simple_websocket.ConnectionClosed:
+                    pass
+
+            ws = simple_websocket.Client(f"ws://127.0.0.1:{server.server_port}/api/voice/stream")
+            ws.send(json.dumps({"sample_rate": RATE, "model_service": "groq"}))
+            self.assertEqual(json.loads(ws.receive(timeout=5))["type"], "ready")
+            for chunk in chunks(tone(0.6) + silence(0.5)):
+                ws.send(chunk)
+            ws.send(json.dumps({"type": "stop"}))
+            messages = []
+            while not messages or messages[-1]["type"] != "done":
+                messages.append(json.loads(ws.receive(timeout=5)))
+            try:
+                ws.close()
+            except simple_websocket.ConnectionClosed:
+                pass  # server already closed after "done"
+            self.assertEqual([m["type"] for m in messages], ["speech_start", "final", "done"])
+            self.assertEqual(messages[-1]["segments"], 1)
+            self.assertTrue(os.path.exists(os.path.join("logs", "voice_costs.csv")))
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(tmp)
+            server.shutdown()
+            app_module.stt = old_stt
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import threading
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from token_tracker import TokenTracker
+
+class TestTokenTracker(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp()
+        os.chdir(self.tmp)  # log_query appends to logs/verification_<model>.txt
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp)
+
+    def test_averages_survive_log_bound(self):
+        tracker = TokenTracker(max_logs=5)
+        for i in range(20):
+            tracker.log_query("groq", 1000 + i, 50, 0.0001, 0.5)
+        tracker.log_query("openai", 10, 10, 0.01, 0.5)
+        self.assertEqual(len(tracker.query_logs), 5)
+
+        avg = tracker.get_averages("groq")
+        self.assertEqual(avg["total_queries"], 20)
+        self.assertEqual(avg["total_input_tokens"], sum(1000 + i for i in range(20)))
+        self.assertEqual(avg["avg_input_tokens"], 1009.5)
+        self.assertAlmostEqual(avg["total_cost"], 0.002)
+        self.assertEqual(tracker.get_averages("gemini")["total_queries"], 0)
+
+    def test_concurrent_logging_loses_no_updates(self):
+        tracker = TokenTracker(max_logs=5)
+        tracker._append_to_verification_log = lambda *args: None
+
+        def worker():
+            for _ in range(2000):
+                tracker.log_query("groq", 3, 2, 0.0, 0.1)
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        avg = tracker.get_averages("groq")
+        self.assertEqual((avg["total_queries"], avg["total_input_tokens"]), (16000, 48000))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+import sys
+import os
+from unittest import mock
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import tracing
+
+class TestTracing(unittest.TestCase):
+    def test_trace_id_for_request_id(self):
+        # Same request ID -> same trace ID, so the three voice calls correlate
+        self.assertEqual(tracing.trace_id_for("abc"), tracing.trace_id_for("abc"))
+        self.assertEqual(len(tracing.trace_id_for("abc")), 32)
+        uid = "3f2b8c1e-0000-4000-8000-1234567890ab"
+        self.assertEqual(tracing.trace_id_for(uid), uid.replace("-", ""))
+
+    def test_nested_spans_export_once_with_parent_ids(self):
+        exported = []
+        with mock.patch.object(tracing, "export_spans", side_effect=exported.append):
+            root = tracing.start_span("http chat", request_id="req-1")
+            with tracing.span("llm.call", service="mock"):
+                with tracing.span("inner"):
+                    pass
+            self.assertEqual(tracing.current_request_id(), "req-1")
+            root.end()
+
+        self.assertEqual(len(exported), 1)
+        spans = {s.name: s.to_otlp() for s in exported[0]}
+        self.assertEqual(set(spans), {"http chat", "llm.call", "inner"})
+        self.assertNotIn("parentSpanId", spans["http chat"])
+        self.assertEqual(spans["llm.call"]["parentSpanId"], spans["http chat"]["spanId"])
+        self.assertEqual(spans["inner"]["parentSpanId"], spans["llm.call"]["spanId"])
+        self.assertEqual({s["traceId"] for s in spans.values()}, {tracing.trace_id_for("req-1")})
+        self.assertIsNone(tracing.current_request_id())
+
+    def test_error_is_recorded(self):
+        exported = []
+        with mock.patch.object(tracing, "export_spans", side_effect=exported.append):
+            with self.assertRaises(RuntimeError):
+                with tracing.span("stt.provider_call"):
+                    raise RuntimeError("boom")
+        self.assertEqual(exported[0][0].to_otlp()["status"], {"code": 2, "message": "boom"})
+
+if __name__ == '__main__':
+    unittest.main()
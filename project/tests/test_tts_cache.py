@@ -0,0 +1,125 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+from unittest import mock
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tts_cache import TTSCache, cache_key, normalize_text
+from tts_handler import TTSHandler
+
+class TestTTSCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+
+    def test_key_normalization(self):
+        self.assertEqual(normalize_text("  Hello\n  there!  "), "Hello there!")
+        self.assertEqual(cache_key("Hello  there", "v", "edge-tts"), cache_key("Hello there ", "v", "edge-tts"))
+        self.assertNotEqual(cache_key("Hello", "v", "edge-tts"), cache_key("Hello", "w", "edge-tts"))
+        self.assertNotEqual(cache_key("Hello", "v", "edge-tts", "-5%"), cache_key("Hello", "v", "edge-tts", "+0%"))
+
+    def test_content_addressed_lru_and_quota(self):
+        cache = TTSCache(self.tmp, max_bytes=250)
+        path_a = cache.put("a", b"A" * 100)
+        path_b = cache.put("b", b"A" * 100)   # same audio, different key: one file
+        self.assertEqual(path_a, path_b)
+        self.assertEqual(cache.stats()["files"], 1)
+        path_c = cache.put("c", b"C" * 100)
+        cache.get("a")                        # a (and its shared file) recently used
+        cache.put("d", b"D" * 100)            # over quota: c is the least recently used file
+        self.assertIsNone(cache.get("c"))
+        self.assertFalse(os.path.exists(path_c))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertLessEqual(cache.stats()["bytes"], 250)
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 1))
+        self.assertAlmostEqual(stats["hit_ratio"], 2 / 3, places=3)
+
+        # Index survives a restart; entries whose file vanished are dropped
+        os.remove(cache.get("d", count=False)["path"])
+        reloaded = TTSCache(self.tmp, max_bytes=250)
+        self.assertIsNotNone(reloaded.get("a"))
+        self.assertIsNone(reloaded.get("d"))
+
+class TestTTSHandlerCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.tts = TTSHandler()
+        self.tts.cassette = None
+        self.tts.cache = TTSCache(os.path.join(self.tmp, "cache"))
+        self.calls = []
+
+        def live(text, voice, model_service):
+            self.calls.append(text)
+            return ({"cost": len(text) * 0.000015, "voice_used": voice or "nova", "service": model_service,
+                     "characters": len(text)}, b"ID3" + text.encode())
+        patcher = mock.patch.object(self.tts, "_synthesize_live", side_effect=live)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_hit_is_free_and_reuses_the_file(self):
+        out = os.path.join(self.tmp, "resp.mp3")
+        first = self.tts.synthesize_speech("Hello there!", out, model_service="gtts")
+        self.assertFalse(first["cached"])
+        self.assertFalse(os.path.exists(out))  # stored in the cache instead
+        second = self.tts.synthesize_speech("Hello  there! ", out, model_service="gtts")
+        self.assertTrue(second["cached"])
+        self.assertEqual(second["cost"], 0.0)
+        self.assertEqual(second["audio_path"], first["audio_path"])
+        self.assertEqual(len(self.calls), 1)
+        # A different service is a different voice: no hit
+        self.tts.synthesize_speech("Hello there!", out, voice="alloy", model_service="openai")
+        self.assertEqual(len(self.calls), 2)
+
+    def test_edge_fallback_audio_is_not_cached(self):
+        self.tts._synthesize_live.side_effect = lambda text, voice, service: (
+            {"cost": 0.0, "voice_used": "Google TTS", "service": service, "characters": len(text)}, b"gtts")
+        out = os.path.join(self.tmp, "resp.mp3")
+        with mock.patch("tts_handler.edge_tts", object()):
+            result = self.tts.synthesize_speech("Hi", out, model_service="edge-tts")
+        self.assertEqual(result["audio_path"], out)
+        self.assertTrue(os.path.exists(out))
+        self.assertEqual(self.tts.cache.stats()["entries"], 0)
+
+    def test_prewarm(self):
+        phrases = ["Hello!", "Goodbye!"]
+        self.assertEqual(self.tts.prewarm(phrases, model_service="gtts"), 2)
+        self.assertEqual(self.tts.prewarm(phrases, model_service="gtts"), 0)
+        self.assertEqual(self.tts.cache.stats()["misses"], 0)  # prewarm lookups don't count
+        self.assertTrue(self.tts.synthesize_speech("Hello!", model_service="gtts")["cached"])
+
+class TestSynthesizeRoute(unittest.TestCase):
+    def test_hits_served_from_audio_dir(self):
+        import app as app_module
+        tmp = tempfile.mkdtemp(dir=app_module.AUDIO_DIR)
+        self.addCleanup(shutil.rmtree, tmp)
+        live = lambda text, voice, service: (
+            {"cost": 0.0, "voice_used": "Google TTS", "service": service, "characters": len(text)}, b"ID3audio")
+        with mock.patch.object(app_module.tts, "cache", TTSCache(tmp)), \
+                mock.patch.object(app_module.tts, "cassette", None), \
+                mock.patch.object(app_module.tts, "_synthesize_live", side_effect=live), \
+                mock.patch.object(app_module, "log_voice_cost") as log_cost:
+            client = app_module.app.test_client()
+            first = client.post("/api/voice/synthesize", json={"text": "Hello!", "model_service": "gtts"}).get_json()
+            second = client.post("/api/voice/synthesize", json={"text": "Hello!", "model_service": "gtts"}).get_json()
+            stats = client.get("/api/stats").get_json()["tts_cache"]
+            self.assertEqual(first["audio_url"], second["audio_url"])
+            self.assertTrue(second["audio_url"].startswith(f"/audio/{os.path.basename(tmp)}/"))
+            self.assertTrue(second["cached"])
+            self.assertEqual(client.get(second["audio_url"]).data, b"ID3audio")
+        self.assertEqual(log_cost.call_args_list[-1].args[:2], ("tts", 0.0))
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_prewarm_runs_once_per_process_on_first_request(self):
+        import app as app_module
+        with mock.patch.object(app_module, "_prewarmed_pid", None), \
+                mock.patch.object(app_module, "prewarm_tts_cache") as prewarm:
+            client = app_module.app.test_client()
+            client.get("/metrics")
+            client.get("/metrics")
+        prewarm.assert_called_once_with()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,210 @@
+import unittest
+import sys
+import os
+import json
+import base64
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from werkzeug.serving import make_server
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config
+from sentences import SentenceSplitter
+from tts_pipeline import TTSPipeline
+from fake_provider import FakeProviderConfig, Latency, create_app
+
+class SlowTTS:
+    """synthesize_audio stub: `delay` seconds per sentence, records concurrency."""
+    def __init__(self, delay=0.1):
+        self.delay = delay
+        self.started = []
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def synthesize_audio(self, text, voice=None, model_service="edge-tts"):
+        with self.lock:
+            self.started.append(text)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        return {"success": True, "cost": 0.001, "cached": False, "character_count": len(text)}, text.encode()
+
+class TestSentenceSplitter(unittest.TestCase):
+    def test_incremental_feed(self):
+        splitter = SentenceSplitter()
+        self.assertEqual(splitter.feed("The serum costs $4"), [])
+        self.assertEqual(splitter.feed(".50 today. It's "), ["The serum costs $4.50 today."])
+        self.assertEqual(splitter.feed("great! Want one"), ["It's great!"])
+        self.assertEqual(splitter.flush(), ["Want one"])
+        self.assertEqual(SentenceSplitter.split('He said "hi." 1. Then left.  '),
+                         ['He said "hi."', "1. Then left."])
+        self.assertEqual(SentenceSplitter.split("দাম ৫০০ টাকা। আর কিছু?"), ["দাম ৫০০ টাকা।", "আর কিছু?"])
+
+class TestTTSPipeline(unittest.TestCase):
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(max_workers=4)
+        self.addCleanup(self.executor.shutdown)
+
+    def test_ordered_and_overlapping(self):
+        tts = SlowTTS(delay=0.1)
+        pipeline = TTSPipeline(tts, executor=self.executor, max_ahead=4)
+        start = time.perf_counter()
+        events = list(pipeline.stream_text("One here. Two here. Three here. Four here."))
+        total = time.perf_counter() - start
+        self.assertEqual([e["text"] for e in events], ["One here.", "Two here.", "Three here.", "Four here."])
+        self.assertEqual([e["index"] for e in events], [0, 1, 2, 3])
+        self.assertEqual(events[2]["audio"], b"Three here.")
+        self.assertGreater(tts.peak, 1)
+        self.assertLess(total, 0.35)  # serial synthesis would take 0.4 s
+        self.assertLess(events[0]["ready_at"] - start, total)
+
+    def test_synthesis_overlaps_generation_and_respects_max_ahead(self):
+        tts = SlowTTS(delay=0.05)
+
+        def llm():
+            for i in range(6):
+                time.sleep(0.02)
+                yield f"Sentence {i}."
+        pipeline = TTSPipeline(tts, executor=self.executor, max_ahead=2)
+        events = pipeline.stream(llm())
+        first = next(events)
+        self.assertEqual(first["text"], "Sentence 0.")
+        self.assertLessEqual(len(tts.started), 3)  # delivered one + at most two ahead
+        self.assertEqual(len(list(events)), 5)
+        self.assertLessEqual(tts.peak, 2)
+
+    def test_close_stops_the_producer(self):
+        tts = SlowTTS(delay=0.05)
+        closed = threading.Event()
+
+        def llm():
+            try:
+                for i in range(100):
+                    yield f"Sentence {i}."
+            finally:
+                closed.set()
+        events = TTSPipeline(tts, executor=self.executor, max_ahead=2).stream(llm())
+        next(events)
+        events.close()
+        self.assertTrue(closed.wait(2))
+        time.sleep(0.1)
+        self.assertLessEqual(len(tts.started), 4)
+
+class TestLLMStream(unittest.TestCase):
+    def setUp(self):
+        config = FakeProviderConfig(chat_latency=Latency(1), token_latency=Latency(0), seed=1)
+        server = make_server("127.0.0.1", 0, create_app(config), threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.shutdown)
+        self.base = f"http://127.0.0.1:{server.server_port}"
+
+    def test_openai_and_groq_streams_report_usage(self):
+        from api_handler import APIHandler
+        with mock.patch.object(Config, "OPENAI_API_KEY", "fake"), \
+                mock.patch.object(Config, "OPENAI_BASE_URL", f"{self.base}/v1"), \
+                mock.patch.object(Config, "GROQ_API_KEY", "fake"), \
+                mock.patch.object(Config, "GROQ_BASE_URL", self.base):
+            api = APIHandler()
+            api.cassette = None
+            for service in ("openai", "groq"):
+                usage = {}
+                deltas = list(api.generate_response_stream("Price of serum?", model_service=service,
+                                                           system_prompt="sys", usage=usage))
+                self.assertGreater(len(deltas), 1)
+                self.assertIsNone(usage["error"])
+                self.assertEqual(usage["output_tokens"], -(-len("".join(deltas)) // 4))
+
+    def test_process_query_stream_records_what_was_spoken(self):
+        import app as app_module
+        bot = app_module.bot
+
+        def stream(prompt, model_service="groq", system_prompt="", usage=None):
+            usage.update(input_tokens=100, output_tokens=40, error=None)
+            yield from ["Hello there. We have ", "serums. And creams! And ", "toners. And more."]
+        result = {}
+        with mock.patch.object(bot.api_handler, "generate_response_stream", side_effect=stream), \
+                mock.patch.object(bot.token_tracker, "log_query") as log_query:
+            sentences = list(bot.process_query_stream("stream-test", "What do you sell?", "groq",
+                                                      ui_language="bn", result=result))
+        self.assertEqual(sentences, ["Hello there.", "We have serums."])
+        self.assertEqual(result["response"], "Hello there. We have serums.")
+        self.assertIsNone(result["error"])
+        self.assertEqual(log_query.call_args.args[:3], ("groq", 100, 40))
+        self.assertEqual(bot.get_session("stream-test").history[-1]["content"], result["response"])
+
+    def test_stream_failing_midway_still_records_billed_tokens(self):
+        import app as app_module
+        bot = app_module.bot
+
+        def stream(prompt, model_service="groq", system_prompt="", usage=None):
+            usage.update(input_tokens=0, output_tokens=0, error=None)
+            try:
+                yield "Hello there. We have "
+                raise ConnectionError("stream reset")
+            except ConnectionError as e:
+                usage.update(error=str(e), input_tokens=90, output_tokens=5)  # estimated, as the handler does
+        result = {}
+        with mock.patch.object(bot.api_handler, "generate_response_stream", side_effect=stream), \
+                mock.patch.object(bot.token_tracker, "log_query") as log_query:
+            sentences = list(bot.process_query_stream("stream-error", "Hi", "groq", result=result))
+        self.assertEqual(sentences, ["Hello there.", "We have"])
+        self.assertEqual(result["error"], "stream reset")
+        self.assertGreater(result["cost"], 0)
+        self.assertEqual(log_query.call_args.args[:3], ("groq", 90, 5))
+
+class TestStreamRoute(unittest.TestCase):
+    def test_ndjson_and_mp3(self):
+        import app as app_module
+        tts = SlowTTS(delay=0.01)
+        with mock.patch.object(app_module.tts, "synthesize_audio", side_effect=tts.synthesize_audio), \
+                mock.patch.object(app_module, "log_voice_cost") as log_cost:
+            client = app_module.app.test_client()
+            response = client.post("/api/voice/synthesize/stream", json={"text": "Hi there. Bye now."})
+            lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+            self.assertEqual([line["type"] for line in lines], ["audio", "audio", "done"])
+            self.assertEqual(base64.b64decode(lines[1]["audio"]), b"Bye now.")
+            self.assertEqual(lines[-1]["sentences"], 2)
+            self.assertIsNotNone(lines[-1]["time_to_first_audio_ms"])
+            self.assertEqual(log_cost.call_args.args[:2], ("tts", 0.002))
+
+            raw = client.post("/api/voice/synthesize/stream?format=mp3", json={"text": "Hi there. Bye now."})
+            self.assertEqual(raw.mimetype, "audio/mpeg")
+            self.assertEqual(raw.data, b"Hi there.Bye now.")
+            self.assertEqual(client.post("/api/voice/synthesize/stream", json={}).status_code, 400)
+
+    def test_sentence_spans_join_the_request_trace(self):
+        import app as app_module
+        from tracing import span
+        tts = SlowTTS(delay=0.01)
+
+        def traced_synthesis(*args, **kwargs):
+            with span("tts.synthesize"):
+                return tts.synthesize_audio(*args, **kwargs)
+
+        def stream(prompt, model_service="groq", system_prompt="", usage=None):
+            usage.update(input_tokens=10, output_tokens=5, error=None)
+            yield "Hi there. Bye now."
+        exported = []
+        with mock.patch.object(app_module.tts, "synthesize_audio", side_effect=traced_synthesis), \
+                mock.patch.object(app_module.bot.api_handler, "generate_response_stream", side_effect=stream), \
+                mock.patch.object(app_module.bot, "_record_query", return_value=0.0), \
+                mock.patch.object(app_module, "log_voice_cost"), \
+                mock.patch("tracing.export_spans", side_effect=exported.append):
+            response = app_module.app.test_client().post(
+                "/api/voice/synthesize/stream", json={"message": "Hi", "session_id": "trace-test"},
+                headers={"X-Request-ID": "turn-42"})
+            self.assertEqual(len(response.get_data(as_text=True).splitlines()), 3)
+            response.close()
+        # One export: the request span, with the prompt build and both sentences under it
+        self.assertEqual(len(exported), 1)
+        names = sorted(s.name for s in exported[0])
+        self.assertEqual(names, ["chat.prompt_build", "http voice_synthesize_stream",
+                                 "tts.synthesize", "tts.synthesize"])
+        self.assertEqual({s.request_id for s in exported[0]}, {"turn-42"})
+
+if __name__ == '__main__':
+    unittest.main()
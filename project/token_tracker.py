@@ -1,11 +1,20 @@
+from collections import deque
 from datetime import datetime
 import os
+import threading
 
 class TokenTracker:
     """Track and calculate accurate token averages across all queries."""
     
-    def __init__(self):
-        self.query_logs = []
+    def __init__(self, max_logs=10000, log_dir="logs"):
+        # Recent queries only; averages come from running per-model totals,
+        # so memory stays flat however many queries are logged
+        self.query_logs = deque(maxlen=max_logs)
+        self.totals = {}
+        # log_query runs on Flask request threads and concurrent simulation workers
+        self._lock = threading.Lock()
+        # verification_<model>.txt files are written here
+        self.log_dir = log_dir
     
     def log_query(self, model: str, input_tokens: int, output_tokens: int, 
                   cost: float, response_time: float):
@@ -18,13 +27,19 @@ class TokenTracker:
             "response_time": response_time,
             "timestamp": datetime.now()
         })
+        with self._lock:
+            totals = self.totals.setdefault(model, {"queries": 0, "input_tokens": 0, "output_tokens": 0, "cost": 0})
+            totals["queries"] += 1
+            totals["input_tokens"] += input_tokens
+            totals["output_tokens"] += output_tokens
+            totals["cost"] += cost
         
         # Also append to a persistent verification file immediately
         self._append_to_verification_log(model, input_tokens, output_tokens, cost)
     
     def _append_to_verification_log(self, model, input_tok, output_tok, cost):
-        os.makedirs("logs", exist_ok=True)
-        filename = f"logs/verification_{model}.txt"
+        os.makedirs(self.log_dir, exist_ok=True)
+        filename = os.path.join(self.log_dir, f"verification_{model}.txt")
         with open(filename, "a", encoding="utf-8") as f:
             f.write(f"[{datetime.now()}] In: {input_tok} | Out: {output_tok} | Cost: ${cost:.8f}\n")
 
@@ -32,9 +47,10 @@ class TokenTracker:
         """
         Calculate averages using ONLY actual measured values.
         """
-        model_queries = [q for q in self.query_logs if q["model"] == model]
+        with self._lock:
+            totals = dict(self.totals.get(model) or {})
         
-        if not model_queries:
+        if not totals:
             # Return zeros if no queries yet to avoid divide by zero
             return {
                 "total_queries": 0,
@@ -46,10 +62,10 @@ class TokenTracker:
                 "total_cost": 0
             }
         
-        total_queries = len(model_queries)
-        total_input = sum(q["input_tokens"] for q in model_queries)
-        total_output = sum(q["output_tokens"] for q in model_queries)
-        total_cost = sum(q["cost"] for q in model_queries)
+        total_queries = totals["queries"]
+        total_input = totals["input_tokens"]
+        total_output = totals["output_tokens"]
+        total_cost = totals["cost"]
         
         return {
             "total_queries": total_queries,
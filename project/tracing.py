@@ -0,0 +1,305 @@
+"""
+Request-correlated tracing for the voice pipeline.
+
+A voice interaction is three HTTP calls (transcribe -> chat -> synthesize).
+A client that sends the same `X-Request-ID` header on all three gets their
+spans under one trace ID, shown as a single waterfall (the bundled chat page
+sends a fresh ID per turn). Requests without the header get their own trace,
+and the ID used is echoed back in the `X-Request-ID` response header.
+
+Spans are written as OTLP-JSON lines (one `resourceSpans` export per finished
+root span) to a size-rotated file under Config.TRACE_DIR.
+
+CLI:
+    python tracing.py                      # list recent traces
+    python tracing.py --trace <id>         # waterfall for one trace / request ID
+    python tracing.py --slowest 10         # slowest stages across all traces
+"""
+import argparse
+import contextvars
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import secrets
+import time
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+from config import Config
+
+SERVICE_NAME = "lira-backend"
+TRACE_FILE = "traces.jsonl"
+
+_current_span = contextvars.ContextVar("lira_current_span", default=None)
+_exporter = None
+
+
+def trace_id_for(request_id):
+    """Map a client request ID to a 32-hex OTLP trace ID (stable for the same ID)."""
+    if request_id and re.fullmatch(r"[0-9a-f]{32}", request_id.replace("-", "").lower()):
+        return request_id.replace("-", "").lower()
+    if request_id:
+        return hashlib.md5(request_id.encode("utf-8")).hexdigest()
+    return secrets.token_hex(16)
+
+
+class Span:
+    """One timed stage. Root spans collect their children and export them on end."""
+
+    def __init__(self, name, parent=None, request_id=None, attributes=None):
+        self.name = name
+        self.parent = parent
+        self.span_id = secrets.token_hex(8)
+        if parent is not None:
+            self.trace_id = parent.trace_id
+            self.request_id = parent.request_id
+            self.batch = parent.batch
+        else:
+            self.trace_id = trace_id_for(request_id)
+            self.request_id = request_id or self.trace_id
+            self.batch = []
+        self.attributes = dict(attributes or {})
+        self.error = None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self._token = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def record_error(self, error):
+        self.error = str(error)
+
+    def end(self):
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if self._token is not None:
+            try:
+                _current_span.reset(self._token)
+            except ValueError:
+                # Ended from a different context (e.g. a streamed response); just unset
+                _current_span.set(self.parent)
+        self.batch.append(self)
+        if self.parent is None:
+            export_spans(self.batch)
+
+    def to_otlp(self):
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 2 if self.parent is None else 1,  # SERVER for roots, INTERNAL otherwise
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute("request.id", self.request_id)]
+                          + [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent is not None:
+            span["parentSpanId"] = self.parent.span_id
+        return span
+
+
+class _NoopSpan:
+    def set_attribute(self, key, value):
+        pass
+
+    def record_error(self, error):
+        pass
+
+    def end(self):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def start_span(name, request_id=None, root=False, **attributes):
+    """
+    Start a span as a child of the current one (or a new root) and make it current.
+    root=True always starts a new trace (HTTP request spans).
+    """
+    if not Config.TRACING_ENABLED:
+        return NOOP_SPAN
+    span = Span(name, None if root else _current_span.get(), request_id, attributes)
+    span._token = _current_span.set(span)
+    return span
+
+
+@contextmanager
+def span(name, **attributes):
+    s = start_span(name, **attributes)
+    try:
+        yield s
+    except Exception as e:
+        s.record_error(e)
+        raise
+    finally:
+        s.end()
+
+
+def current_request_id():
+    s = _current_span.get()
+    return s.request_id if s is not None else None
+
+
+def _otlp_attribute(key, value):
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def _get_exporter():
+    global _exporter
+    if _exporter is None:
+        os.makedirs(Config.TRACE_DIR, exist_ok=True)
+        logger = logging.getLogger("lira.traces")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        if not logger.handlers:
+            handler = RotatingFileHandler(
+                os.path.join(Config.TRACE_DIR, TRACE_FILE),
+                maxBytes=Config.TRACE_MAX_BYTES,
+                backupCount=Config.TRACE_BACKUP_COUNT,
+                encoding="utf-8",
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+        _exporter = logger
+    return _exporter
+
+
+def export_spans(spans):
+    """Write spans as one OTLP-JSON `ExportTraceServiceRequest` line."""
+    payload = {
+        "resourceSpans": [{
+            "resource": {"attributes": [_otlp_attribute("service.name", SERVICE_NAME)]},
+            "scopeSpans": [{
+                "scope": {"name": "lira.tracing"},
+                "spans": [s.to_otlp() for s in spans],
+            }],
+        }]
+    }
+    try:
+        _get_exporter().info(json.dumps(payload, ensure_ascii=False, separators=(",", ":")))
+    except Exception as e:
+        print(f"Warning: could not export trace: {e}")
+
+
+# ---------------------------------------------------------------------------
+# Reading traces back (CLI)
+# ---------------------------------------------------------------------------
+
+def load_spans(trace_dir=None):
+    """Read all spans from the current and rotated trace files."""
+    trace_dir = trace_dir or Config.TRACE_DIR
+    spans = []
+    for path in sorted(glob.glob(os.path.join(trace_dir, TRACE_FILE + "*"))):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    payload = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                for rs in payload.get("resourceSpans", []):
+                    for ss in rs.get("scopeSpans", []):
+                        for s in ss.get("spans", []):
+                            attrs = {a["key"]: next(iter(a["value"].values())) for a in s.get("attributes", [])}
+                            spans.append({
+                                "trace_id": s["traceId"],
+                                "span_id": s["spanId"],
+                                "parent_id": s.get("parentSpanId"),
+                                "name": s["name"],
+                                "start": int(s["startTimeUnixNano"]),
+                                "end": int(s["endTimeUnixNano"]),
+                                "request_id": attrs.get("request.id"),
+                                "error": s.get("status", {}).get("code") == 2,
+                                "attributes": attrs,
+                            })
+    return spans
+
+
+def group_traces(spans):
+    traces = {}
+    for s in spans:
+        traces.setdefault(s["trace_id"], []).append(s)
+    return traces
+
+
+def print_waterfall(trace_spans, width=40):
+    trace_spans = sorted(trace_spans, key=lambda s: s["start"])
+    t0 = trace_spans[0]["start"]
+    total = max(s["end"] for s in trace_spans) - t0 or 1
+    by_id = {s["span_id"]: s for s in trace_spans}
+
+    def depth(s):
+        d = 0
+        while s.get("parent_id") in by_id:
+            s = by_id[s["parent_id"]]
+            d += 1
+        return d
+
+    print(f"Trace {trace_spans[0]['trace_id']} (request {trace_spans[0]['request_id']}) - {total / 1e6:.1f} ms")
+    for s in trace_spans:
+        offset = (s["start"] - t0) / total
+        length = max((s["end"] - s["start"]) / total, 1 / width)
+        bar = " " * int(offset * width) + "#" * max(1, int(length * width))
+        name = "  " * depth(s) + s["name"] + (" !" if s["error"] else "")
+        print(f"{name:<36} {(s['start'] - t0) / 1e6:9.1f} {(s['end'] - s['start']) / 1e6:9.1f} ms |{bar:<{width}}|")
+
+
+def print_slowest_stages(spans, limit=10):
+    stages = {}
+    for s in spans:
+        stages.setdefault(s["name"], []).append((s["end"] - s["start"]) / 1e6)
+    rows = []
+    for name, durations in stages.items():
+        durations.sort()
+        p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+        rows.append((name, len(durations), sum(durations), durations[len(durations) // 2], p95, durations[-1]))
+    rows.sort(key=lambda r: r[2], reverse=True)
+    print(f"{'Stage':<32} {'Count':>6} {'Total ms':>10} {'p50 ms':>9} {'p95 ms':>9} {'Max ms':>9}")
+    for name, count, total, p50, p95, worst in rows[:limit]:
+        print(f"{name:<32} {count:>6} {total:>10.1f} {p50:>9.1f} {p95:>9.1f} {worst:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect request traces")
+    parser.add_argument("--dir", default=None, help="Trace directory (default: Config.TRACE_DIR)")
+    parser.add_argument("--trace", help="Trace ID or request ID to show as a waterfall")
+    parser.add_argument("--slowest", type=int, metavar="N", help="Show the N slowest stages across all traces")
+    parser.add_argument("--last", type=int, default=10, help="Number of recent traces to list")
+    args = parser.parse_args()
+
+    spans = load_spans(args.dir)
+    if not spans:
+        print("No traces found.")
+        return
+    traces = group_traces(spans)
+
+    if args.trace:
+        wanted = trace_id_for(args.trace)
+        matches = [t for tid, t in traces.items() if tid == wanted or tid == args.trace
+                   or any(s["request_id"] == args.trace for s in t)]
+        if not matches:
+            print(f"Trace {args.trace} not found.")
+            return
+        print_waterfall(matches[0])
+    elif args.slowest:
+        print_slowest_stages(spans, args.slowest)
+    else:
+        recent = sorted(traces.values(), key=lambda t: min(s["start"] for s in t))[-args.last:]
+        for t in recent:
+            print_waterfall(t)
+            print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Content-addressed cache of synthesized speech.
+
+Greetings, apologies and canned catalog answers are synthesized over and
+over. Entries are keyed by (normalized text, voice, service, rate/pitch);
+the audio itself is stored once per distinct content (SHA-256 file name)
+under the cache directory, which the app places inside the public audio
+folder so hits are served by /audio/ without copying. An LRU index
+(index.json) tracks keys, and the least recently used entries are evicted
+when the stored audio exceeds TTS_CACHE_MAX_BYTES.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from config import Config
+from metrics import CACHE_REQUESTS
+
+INDEX_NAME = "index.json"
+INDEX_SAVE_INTERVAL = 5.0  # seconds between index writes for LRU-order-only changes
+
+# Synthesized at startup (app.py) so the first visitors get instant audio
+PREWARM_PHRASES = [
+    "Hello! Welcome to Lira Cosmetics. How can I help you today?",
+    "Sorry, I didn't catch that. Could you please repeat?",
+    "Sorry, something went wrong. Please try again.",
+    "Is there anything else I can help you with?",
+    "Thank you for contacting Lira Cosmetics. Have a lovely day!",
+    "We have several great brands like Lira Luxe, PureBasics, and EyeCatch. Each offers unique products for different skin needs.",
+    "আসসালামু আলাইকুম! লিরা কসমেটিকসে আপনাকে স্বাগতম। আমি কীভাবে সাহায্য করতে পারি?",
+    "দুঃখিত, আবার বলবেন কি?",
+]
+
+
+def normalize_text(text):
+    """NFC with runs of whitespace collapsed, so trivially different spellings share an entry."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(text, voice, service, rate="", pitch=""):
+    payload = json.dumps([normalize_text(text), voice or "", service, rate or "", pitch or ""], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    def __init__(self, cache_dir, max_bytes=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = Config.TTS_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self._lock = threading.Lock()
+        self._index = OrderedDict()   # key -> entry dict, least recently used first
+        self._refs = {}               # audio file name -> number of keys using it
+        self._sizes = {}              # audio file name -> bytes
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        self._saved_at = 0.0
+        self._load()
+
+    def _index_path(self):
+        return os.path.join(self.cache_dir, INDEX_NAME)
+
+    def path(self, entry):
+        return os.path.join(self.cache_dir, entry["file"])
+
+    def _load(self):
+        try:
+            with open(self._index_path(), "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        for key, entry in sorted(entries.items(), key=lambda item: item[1].get("last_used", 0)):
+            if os.path.exists(self.path(entry)):
+                self._add(key, entry)
+
+    def _add(self, key, entry):
+        self._index[key] = entry
+        self._index.move_to_end(key)
+        self._refs[entry["file"]] = self._refs.get(entry["file"], 0) + 1
+        self._sizes[entry["file"]] = entry["bytes"]
+
+    def _remove(self, key):
+        entry = self._index.pop(key)
+        name = entry["file"]
+        self._refs[name] -= 1
+        if self._refs[name] == 0:
+            del self._refs[name]
+            del self._sizes[name]
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+
+    @property
+    def total_bytes(self):
+        return sum(self._sizes.values())
+
+    def get(self, key, count=True):
+        """The entry (with "path") for `key`, or None. `count=False` keeps it out of the hit ratio."""
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is not None and not os.path.exists(self.path(entry)):
+                self._remove(key)  # deleted from under us
+                entry = None
+            if entry is not None:
+                entry["last_used"] = time.time()
+                self._index.move_to_end(key)
+                self._dirty = True
+            if count:
+                if entry is not None:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+            save = self._dirty and time.time() - self._saved_at >= INDEX_SAVE_INTERVAL
+        if count:
+            CACHE_REQUESTS.labels("tts", "hit" if entry is not None else "miss").inc()
+        if save:
+            self._save()
+        return dict(entry, path=self.path(entry)) if entry is not None else None
+
+    def put(self, key, audio_bytes, voice_used="", service="", characters=0):
+        """Store audio for `key`; returns its path. Identical audio is stored once."""
+        name = f"{hashlib.sha256(audio_bytes).hexdigest()[:40]}.mp3"
+        path = os.path.join(self.cache_dir, name)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        if not os.path.exists(path):
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(audio_bytes)
+            os.replace(tmp, path)
+        entry = {"file": name, "bytes": len(audio_bytes), "voice_used": voice_used, "service": service,
+                 "characters": characters, "last_used": time.time()}
+        with self._lock:
+            if key in self._index:
+                self._remove(key)
+            self._add(key, entry)
+            # Evict least recently used, never the entry just added
+            while self.total_bytes > self.max_bytes and len(self._index) > 1:
+                self._remove(next(iter(self._index)))
+            self._dirty = True
+        self._save()
+        return path
+
+    def _save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = json.dumps(self._index, ensure_ascii=False)
+            self._dirty = False
+            self._saved_at = time.time()
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = f"{self._index_path()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(snapshot)
+            os.replace(tmp, self._index_path())
+        except OSError as e:
+            print(f"Warning: could not save TTS cache index: {e}")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._index),
+                "files": len(self._sizes),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
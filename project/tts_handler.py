@@ -1,9 +1,14 @@
 # Using Edge TTS (neural), Google TTS (fallback), and OpenAI TTS
 
 import asyncio
+import io
 import os
 import time
 from config import Config
+from metrics import TTS_LATENCY, TTS_REQUESTS
+from tracing import span
+from cassette import get_cassette
+from tts_cache import cache_key
 try:
     import openai
 except ImportError:
@@ -31,14 +36,24 @@ class TTSHandler:
         # OpenAI TTS
         self.openai_client = None
         if Config.OPENAI_API_KEY and openai:
-            self.openai_client = openai.OpenAI(api_key=Config.OPENAI_API_KEY)
+            self.openai_client = openai.OpenAI(api_key=Config.OPENAI_API_KEY, base_url=Config.OPENAI_BASE_URL)
 
         # Pricing: $0.015 per 1K characters (standard) = $0.000015 per char
         self.cost_per_character_openai = 0.000015
 
+        # Record / replay of provider calls (None unless CASSETTE_MODE is set)
+        self.cassette = get_cassette()
+
+        # Content-addressed audio cache (tts_cache.TTSCache); the app sets it up
+        # inside its public audio folder so hits are served from there
+        self.cache = None
+
         # Default neural voices
         self.default_voice_en = "en-US-JennyNeural"
         self.default_voice_bn = "bn-BD-NabanitaNeural"
+        # Edge TTS prosody (part of the cache key)
+        self.edge_rate = "-5%"
+        self.edge_pitch = "+2Hz"
 
     def _detect_language(self, text: str) -> str:
         return "bn" if any('\u0980' <= char <= '\u09ff' for char in text) else "en"
@@ -49,6 +64,21 @@ class TTSHandler:
         lang = self._detect_language(text)
         return self.default_voice_bn if lang == "bn" else self.default_voice_en
 
+    def _openai_voice(self, voice):
+        return voice if voice in ["alloy", "echo", "fable", "onyx", "nova", "shimmer"] else "nova"
+
+    def _cache_key(self, text, voice, model_service):
+        """Key of the audio `model_service` would produce for this text / voice / prosody."""
+        if model_service == "openai":
+            return cache_key(text, self._openai_voice(voice), model_service)
+        if model_service == "edge-tts":
+            return cache_key(text, self._resolve_voice(text, voice), model_service, self.edge_rate, self.edge_pitch)
+        return cache_key(text, self._detect_language(text), model_service)
+
+    def _cacheable(self, result, model_service):
+        # Edge TTS answered by the gTTS fallback: don't pin the degraded audio under the Edge key
+        return not (model_service == "edge-tts" and result["voice_used"] == "Google TTS")
+
     def _run_async(self, coro):
         try:
             loop = asyncio.get_running_loop()
@@ -64,10 +94,85 @@ class TTSHandler:
                 new_loop.close()
         return asyncio.run(coro)
 
-    async def _synthesize_edge_tts(self, text: str, output_path: str, voice: str):
+    async def _synthesize_edge_tts(self, text: str, voice: str) -> bytes:
         # Use built-in rate/pitch controls to avoid SSML being read aloud
-        communicate = edge_tts.Communicate(text, voice, rate="-5%", pitch="+2Hz")
-        await communicate.save(output_path)
+        communicate = edge_tts.Communicate(text, voice, rate=self.edge_rate, pitch=self.edge_pitch)
+        chunks = []
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                chunks.append(chunk["data"])
+        return b"".join(chunks)
+
+    def _synthesize_gtts(self, text: str) -> bytes:
+        if not gTTS:
+            raise Exception("gTTS not installed. Run: pip install gTTS")
+        buf = io.BytesIO()
+        gTTS(text=text, lang=self._detect_language(text), slow=False).write_to_fp(buf)
+        return buf.getvalue()
+
+    def _synthesize_live(self, text, voice, model_service):
+        """Provider call only. Returns ({cost, voice_used, service, characters}, audio bytes)."""
+        character_count = len(text)
+        if model_service == "openai":
+            # OpenAI TTS
+            selected_voice = self._openai_voice(voice)
+
+            response = self.openai_client.audio.speech.create(
+                model="tts-1",
+                voice=selected_voice,
+                input=text
+            )
+            audio_bytes = response.content
+            cost = character_count * self.cost_per_character_openai
+            voice_used = selected_voice
+
+        elif model_service == "edge-tts":
+            # Edge TTS (Neural)
+            selected_voice = self._resolve_voice(text, voice)
+            try:
+                audio_bytes = self._run_async(self._synthesize_edge_tts(text, selected_voice))
+                cost = character_count * self.cost_per_character_edge
+                voice_used = selected_voice
+            except Exception as edge_error:
+                # If Edge TTS fails (e.g., 403), fall back to Google TTS
+                print(f"Edge TTS failed ({edge_error}), falling back to Google TTS")
+                audio_bytes = self._synthesize_gtts(text)
+                cost = character_count * self.cost_per_character_gtts
+                voice_used = "Google TTS"
+
+        else:
+            # Google TTS (Fallback)
+            print(f"Generating Google TTS with lang: {self._detect_language(text)}")
+            audio_bytes = self._synthesize_gtts(text)
+            cost = character_count * self.cost_per_character_gtts
+            voice_used = "Google TTS"
+        return {"cost": cost, "voice_used": voice_used, "service": model_service,
+                "characters": character_count}, audio_bytes
+
+    def _available_service(self, model_service):
+        # Pure replay needs no provider clients
+        replaying = self.cassette is not None and self.cassette.mode == "replay"
+
+        # Fallback if OpenAI requested but not available
+        if model_service == "openai" and not self.openai_client and not replaying:
+            print("OpenAI client not ready, falling back to Edge TTS")
+            model_service = "edge-tts"
+
+        # Fallback if Edge TTS requested but not available
+        if model_service == "edge-tts" and not edge_tts:
+            print("edge-tts not installed, falling back to Google TTS")
+            model_service = "gtts"
+        return model_service
+
+    def _call_provider(self, text, voice, model_service):
+        """Provider call (through the cassette when one is active). Returns (result, audio bytes)."""
+        with span("tts.synthesize", service=model_service, characters=len(text)):
+            if self.cassette is not None:
+                request = {"service": model_service, "text": text, "voice": voice}
+                return self.cassette.replay_or_record(
+                    "tts", request, lambda: self._synthesize_live(text, voice, model_service),
+                    usage_keys=("characters",))
+            return self._synthesize_live(text, voice, model_service)
 
     def synthesize_speech(self, text, output_path="response.mp3", voice=None, model_service="edge-tts"):
         """
@@ -79,86 +184,70 @@ class TTSHandler:
             voice: Voice model (Edge/OpenAI)
             model_service: "edge-tts", "gtts" or "openai"
 
+        With self.cache set, audio is stored in (or served from) the cache and
+        audio_path points there; output_path is only written when the result
+        can't be cached. Cache hits cost nothing and have "cached" set.
+
         Returns:
-            dict: {audio_path, character_count, cost, duration}
+            dict: {audio_path, character_count, cost, duration, cached}
         """
         start_time = time.time()
+        model_service = self._available_service(model_service)
 
-        # Fallback if OpenAI requested but not available
-        if model_service == "openai" and not self.openai_client:
-            print("OpenAI client not ready, falling back to Edge TTS")
-            model_service = "edge-tts"
-
-        # Fallback if Edge TTS requested but not available
-        if model_service == "edge-tts" and not edge_tts:
-            print("edge-tts not installed, falling back to Google TTS")
-            model_service = "gtts"
+        # Cassettes record / replay provider calls, so they bypass the audio cache
+        use_cache = self.cache is not None and self.cassette is None
+        key = self._cache_key(text, voice, model_service) if use_cache else None
+        if use_cache:
+            entry = self.cache.get(key)
+            if entry is not None:
+                return {
+                    "audio_path": entry["path"],
+                    "character_count": len(text),
+                    "cost": 0.0,
+                    "voice_used": entry["voice_used"],
+                    "service": model_service,
+                    "processing_time": time.time() - start_time,
+                    "success": True,
+                    "cached": True
+                }
 
         try:
             character_count = len(text)
             cost = 0
 
-            if model_service == "openai":
-                # OpenAI TTS
-                selected_voice = voice if voice in ["alloy", "echo", "fable", "onyx", "nova", "shimmer"] else "nova"
-
-                response = self.openai_client.audio.speech.create(
-                    model="tts-1",
-                    voice=selected_voice,
-                    input=text
-                )
-                response.stream_to_file(output_path)
-                cost = character_count * self.cost_per_character_openai
-                voice_used = selected_voice
-
-            elif model_service == "edge-tts":
-                # Edge TTS (Neural)
-                selected_voice = self._resolve_voice(text, voice)
-                try:
-                    self._run_async(self._synthesize_edge_tts(text, output_path, selected_voice))
-                    cost = character_count * self.cost_per_character_edge
-                    voice_used = selected_voice
-                except Exception as edge_error:
-                    # If Edge TTS fails (e.g., 403), fall back to Google TTS
-                    print(f"Edge TTS failed ({edge_error}), falling back to Google TTS")
-                    lang = self._detect_language(text)
-                    if not gTTS:
-                        raise Exception("gTTS not installed. Run: pip install gTTS")
-                    tts = gTTS(text=text, lang=lang, slow=False)
-                    tts.save(output_path)
-                    cost = character_count * self.cost_per_character_gtts
-                    voice_used = "Google TTS"
-
-            else:
-                # Google TTS (Fallback)
-                lang = self._detect_language(text)
-                print(f"Generating Google TTS with lang: {lang}")
-
-                if not gTTS:
-                    raise Exception("gTTS not installed. Run: pip install gTTS")
-
-                tts = gTTS(text=text, lang=lang, slow=False)
-                tts.save(output_path)
-                cost = character_count * self.cost_per_character_gtts
-                voice_used = "Google TTS"
+            result, audio_bytes = self._call_provider(text, voice, model_service)
+            cost, voice_used = result["cost"], result["voice_used"]
+
+            with span("tts.file_write", bytes=len(audio_bytes)):
+                if use_cache and self._cacheable(result, model_service):
+                    output_path = self.cache.put(key, audio_bytes, voice_used, model_service, character_count)
+                else:
+                    with open(output_path, "wb") as f:
+                        f.write(audio_bytes)
 
             # Verify file was created
             if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
                 raise Exception(f"TTS file not created or is empty: {output_path}")
 
+            processing_time = time.time() - start_time
+            TTS_LATENCY.labels(model_service).observe(processing_time)
+            TTS_REQUESTS.labels(model_service, "success").inc()
+
             return {
                 "audio_path": output_path,
                 "character_count": character_count,
                 "cost": cost,
                 "voice_used": voice_used,
                 "service": model_service,
-                "processing_time": time.time() - start_time,
-                "success": True
+                "processing_time": processing_time,
+                "success": True,
+                "cached": False
             }
 
         except Exception as e:
             error_msg = str(e)
             print(f"TTS Error: {error_msg}")
+            TTS_REQUESTS.labels(model_service, "error").inc()
             import traceback
             traceback.print_exc()
             return {
@@ -168,6 +257,66 @@ class TTSHandler:
                 "success": False
             }
 
+    def synthesize_audio(self, text, voice=None, model_service="edge-tts"):
+        """
+        Like synthesize_speech, but returns (result, audio bytes) instead of
+        writing a file - for streaming (tts_pipeline). Uses self.cache the same
+        way; on failure the result has success False and the audio is b"".
+        """
+        start_time = time.time()
+        model_service = self._available_service(model_service)
+        use_cache = self.cache is not None and self.cassette is None
+        key = self._cache_key(text, voice, model_service) if use_cache else None
+        if use_cache:
+            entry = self.cache.get(key)
+            if entry is not None:
+                try:
+                    with open(entry["path"], "rb") as f:
+                        audio_bytes = f.read()
+                    return {"character_count": len(text), "cost": 0.0, "voice_used": entry["voice_used"],
+                            "service": model_service, "processing_time": time.time() - start_time,
+                            "success": True, "cached": True}, audio_bytes
+                except OSError:
+                    pass  # evicted meanwhile: synthesize again
+
+        try:
+            result, audio_bytes = self._call_provider(text, voice, model_service)
+            if not audio_bytes:
+                raise Exception("TTS returned no audio")
+            if use_cache and self._cacheable(result, model_service):
+                self.cache.put(key, audio_bytes, result["voice_used"], model_service, len(text))
+            processing_time = time.time() - start_time
+            TTS_LATENCY.labels(model_service).observe(processing_time)
+            TTS_REQUESTS.labels(model_service, "success").inc()
+            return {"character_count": len(text), "cost": result["cost"], "voice_used": result["voice_used"],
+                    "service": model_service, "processing_time": processing_time,
+                    "success": True, "cached": False}, audio_bytes
+        except Exception as e:
+            print(f"TTS Error: {e}")
+            TTS_REQUESTS.labels(model_service, "error").inc()
+            return {"error": str(e), "cost": 0, "success": False}, b""
+
+    def prewarm(self, phrases, voice=None, model_service="edge-tts"):
+        """Synthesize phrases missing from the cache ahead of the first request. Returns how many were added."""
+        if self.cache is None:
+            return 0
+        if model_service == "edge-tts" and not edge_tts:
+            model_service = "gtts"
+        added = 0
+        for text in phrases:
+            key = self._cache_key(text, voice, model_service)
+            if self.cache.get(key, count=False) is not None:
+                continue
+            try:
+                result, audio_bytes = self._synthesize_live(text, voice, model_service)
+            except Exception as e:
+                print(f"TTS prewarm failed for {text[:40]!r}: {e}")
+                continue
+            if audio_bytes and self._cacheable(result, model_service):
+                self.cache.put(key, audio_bytes, result["voice_used"], model_service, result["characters"])
+                added += 1
+        return added
+
     def get_available_voices(self):
         """Get list of available voices"""
         return [
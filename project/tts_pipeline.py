@@ -0,0 +1,108 @@
+"""
+Sentence-pipelined text-to-speech.
+
+Instead of waiting for the whole answer and synthesizing it as one mp3,
+sentences are handed to a thread pool as soon as they exist (from
+Chatbot.process_query_stream while the LLM is still writing, or from a
+finished answer) and their audio is yielded in order as each one is ready.
+Time to first audio becomes roughly first sentence + its TTS instead of
+whole answer + whole TTS; later sentences are synthesized while earlier
+ones play.
+
+Each sentence is a complete mp3, so clients can play chunks back to back
+(or concatenate them: MP3 frames need no container).
+"""
+import contextvars
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from sentences import SentenceSplitter
+
+_executor = None
+_executor_lock = threading.Lock()
+_DONE = object()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=Config.TTS_PIPELINE_WORKERS, thread_name_prefix="tts-pipeline")
+    return _executor
+
+
+class TTSPipeline:
+    """
+    Synthesizes a stream of sentences with TTSHandler.synthesize_audio, at
+    most `max_ahead` sentences ahead of the one being delivered.
+    """
+
+    def __init__(self, tts, voice=None, model_service="edge-tts", executor=None, max_ahead=None):
+        self.tts = tts
+        self.voice = voice
+        self.model_service = model_service
+        self.executor = executor or _get_executor()
+        self.max_ahead = max_ahead or Config.TTS_PIPELINE_AHEAD
+
+    def stream_text(self, text):
+        """Pipeline a finished answer."""
+        return self.stream(SentenceSplitter.split(text))
+
+    def stream(self, sentences):
+        """
+        Yields {"index", "text", "audio", "result", "ready_at"} per sentence, in
+        order. `sentences` (any iterable, e.g. a generator waiting on the LLM)
+        is consumed on a producer thread, so synthesis of sentence n overlaps
+        with generation of sentence n + 1. Closing this generator stops the
+        producer and closes `sentences`. The producer and every synthesis run
+        in copies of the caller's context, so their spans stay under its trace.
+        """
+        jobs = queue.Queue()
+        slots = threading.Semaphore(self.max_ahead)
+        stop = threading.Event()
+
+        def produce():
+            try:
+                for index, sentence in enumerate(sentences):
+                    while not slots.acquire(timeout=0.1):
+                        if stop.is_set():
+                            return
+                    if stop.is_set():
+                        return
+                    future = self.executor.submit(contextvars.copy_context().run, self.tts.synthesize_audio,
+                                                  sentence, self.voice, self.model_service)
+                    jobs.put((index, sentence, future))
+            except Exception as e:
+                jobs.put(e)
+            finally:
+                if stop.is_set() and hasattr(sentences, "close"):
+                    sentences.close()
+                jobs.put(_DONE)
+
+        producer = threading.Thread(target=contextvars.copy_context().run, args=(produce,),
+                                    name="tts-pipeline-producer", daemon=True)
+        producer.start()
+        try:
+            while True:
+                job = jobs.get()
+                if job is _DONE:
+                    return
+                if isinstance(job, Exception):
+                    raise job
+                index, sentence, future = job
+                result, audio = future.result()
+                slots.release()
+                yield {"index": index, "text": sentence, "audio": audio, "result": result,
+                       "ready_at": time.perf_counter()}
+        finally:
+            stop.set()
+            # Sentences queued but not delivered won't be played: skip the ones not started
+            while True:
+                try:
+                    job = jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(job, tuple):
+                    job[2].cancel()